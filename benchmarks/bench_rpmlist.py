@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of rpmList() on a synthetic repository.
+
+A repository is generated with synthrepo.py (or an existing directory is
+used) and rpmList() is run on it ``--repeat`` times, each time in a fresh
+process so the peak resident set size of the run can be measured. The
+best time of each phase (walk, read, sort, write and index, see
+rpm2json.stats) is reported along with the throughput and peak RSS.
+
+With ``--save-baseline FILE`` the results are stored and with
+``--baseline FILE`` they are compared against stored results; the exit
+status is 1 if the total time, any phase or the peak RSS is more than
+``--tolerance`` worse than the baseline.
+
+Usage:
+
+    PYTHONPATH=src python3 benchmarks/bench_rpmlist.py [--packages 2000]
+        [--files 20] [--changelog 10] [--noise 200] [--jobs 1]
+        [--reader native] [--stream] [--layout flat] [--repeat 3]
+        [--baseline FILE] [--save-baseline FILE] [--tolerance 0.2]
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from rpm2json import rpmList
+from rpm2json.stats import PHASES
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthrepo import makeRepo
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+# Differences smaller than this many seconds are never regressions (timer
+# noise on very small runs)
+_MIN_DELTA = 0.05
+
+
+def _runOnce(repoDir, outDir, options):
+    """Runs rpmList() (in a fresh worker process) and returns its statistics
+    along with the peak RSS in KiB of the process and its children."""
+    start = time.perf_counter()
+    stats = rpmList(repoDir, outDir, **options)
+    wall = time.perf_counter() - start
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    result = stats.asDict()
+    result["wall"] = wall
+    result["peakRssKb"] = rss
+    return result
+
+
+def runBenchmark(repoDir, workDir, options, repeat=3):
+    """Runs rpmList() several times and keeps the best times.
+
+    Args:
+      repoDir (str): Repository to process.
+      workDir (str): Directory for the output of each run.
+      options ({}): Keyword arguments for rpmList().
+      repeat (int): Number of runs.
+
+    Returns:
+      :{}: Best "wall" and "total" time, best time for each phase, the
+      largest "peakRssKb" and the "files" and "rpms" counts.
+    """
+    best = None
+    ctx = multiprocessing.get_context("spawn")
+    for i in range(repeat):
+        outDir = os.path.join(workDir, "out{i}".format(i=i))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            result = pool.submit(_runOnce, repoDir, outDir, options).result()
+        shutil.rmtree(outDir, ignore_errors=True)
+        if best == None:
+            best = result
+            continue
+        best["wall"] = min(best["wall"], result["wall"])
+        best["total"] = min(best["total"], result["total"])
+        best["peakRssKb"] = max(best["peakRssKb"], result["peakRssKb"])
+        for name, secs in result["phases"].items():
+            best["phases"][name] = min(best["phases"][name], secs)
+    return best
+
+
+def report(config, result, inputBytes):
+    """Prints the results of a benchmark."""
+    print("Configuration: {cfg}".format(cfg=json.dumps(config, sort_keys=True)))
+    print("{rpms} RPMs in {files} files, {mb:.1f} MB".format(
+        rpms=result["rpms"], files=result["files"], mb=inputBytes / 1e6))
+    for name in PHASES:
+        print("  {name:<6} {secs:8.3f}s".format(name=name, secs=result["phases"][name]))
+    print("  {name:<6} {secs:8.3f}s ({rate:.0f} RPMs/s, {mbs:.1f} MB/s)".format(
+        name="total", secs=result["wall"], rate=result["rpms"] / max(result["wall"], 1e-9),
+        mbs=inputBytes / 1e6 / max(result["wall"], 1e-9)))
+    print("  peak RSS {rss:.1f} MiB".format(rss=result["peakRssKb"] / 1024))
+
+
+def compareBaseline(baseline, config, result, tolerance):
+    """Compares results against a stored baseline.
+
+    Args:
+      baseline ({}): Stored {"config": ..., "result": ...} dictionary.
+      config ({}): Configuration of this run.
+      result ({}): Results of this run (see runBenchmark()).
+      tolerance (float): Allowed slowdown (0.2 allows 20% slower).
+
+    Returns:
+      :[str]: Descriptions of the regressions found (empty if none).
+    """
+    if baseline["config"] != config:
+        print("Warning: baseline was recorded with a different configuration: {cfg}".format(
+            cfg=json.dumps(baseline["config"], sort_keys=True)))
+    base = baseline["result"]
+    checks = [("wall", base["wall"], result["wall"])]
+    checks += [(name, base["phases"].get(name, 0.0), result["phases"][name]) for name in PHASES]
+    regressions = []
+    for name, old, new in checks:
+        if new > old * (1 + tolerance) and new - old > _MIN_DELTA:
+            regressions.append("{name}: {new:.3f}s vs {old:.3f}s baseline".format(name=name, new=new, old=old))
+    if result["peakRssKb"] > base["peakRssKb"] * (1 + tolerance):
+        regressions.append("peak RSS: {new} KiB vs {old} KiB baseline".format(
+            new=result["peakRssKb"], old=base["peakRssKb"]))
+    return regressions
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Benchmarks rpmList() on a synthetic repository")
+    parser.add_argument("--repo", help="Use (or keep the generated repository in) this directory")
+    parser.add_argument("--packages", type=int, default=2000, help="Number of packages to generate")
+    parser.add_argument("--files", type=int, default=20, help="Files per package")
+    parser.add_argument("--changelog", type=int, default=10, help="Changelog entries per package")
+    parser.add_argument("--noise", type=int, default=200, help="Number of non-RPM files")
+    parser.add_argument("--seed", type=int, default=0, help="Random number seed")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="rpmList() jobs")
+    parser.add_argument("--reader", default="native", help="rpmList() header reader")
+    parser.add_argument("--stream", action="store_true", help="Use rpmList() stream mode")
+    parser.add_argument("--layout", default="flat", help="rpmList() output layout")
+    parser.add_argument("--compact", action="store_true", help="Write compact JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs (best time is kept)")
+    parser.add_argument("--baseline", help="Compare against results stored in this file")
+    parser.add_argument("--save-baseline", help="Store the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown versus the baseline")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args()
+    config = {
+        "packages": args.packages, "files": args.files, "changelog": args.changelog,
+        "noise": args.noise, "seed": args.seed, "jobs": args.jobs, "reader": args.reader,
+        "stream": args.stream, "layout": args.layout, "compact": args.compact,
+    }
+    options = { "jobs": args.jobs, "reader": args.reader, "stream": args.stream,
+                "layout": args.layout, "compact": args.compact }
+
+    workDir = tempfile.mkdtemp(prefix="rpm2json-bench-")
+    try:
+        repoDir = args.repo or os.path.join(workDir, "repo")
+        if not os.path.isdir(repoDir):
+            start = time.perf_counter()
+            makeRepo(repoDir, args.packages, args.files, args.changelog, args.noise, seed=args.seed)
+            print("Generated repository in {secs:.1f}s".format(secs=time.perf_counter() - start))
+        inputBytes = 0
+        for dirPath, dirNames, fileNames in os.walk(repoDir):
+            inputBytes += sum(os.path.getsize(os.path.join(dirPath, f)) for f in fileNames)
+
+        result = runBenchmark(repoDir, workDir, options, args.repeat)
+        report(config, result, inputBytes)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({ "config": config, "result": result }, f, indent=2, sort_keys=True)
+        print("Saved baseline to {file}".format(file=args.save_baseline))
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compareBaseline(baseline, config, result, args.tolerance)
+        for r in regressions:
+            print("REGRESSION " + r)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against {file}".format(file=args.baseline))
+
+
+if __name__ == "__main__":
+    main()
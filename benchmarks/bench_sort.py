@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the package sort used by rpmList().
+
+Generates synthetic (name, src, epoch, version, release) sort keys and
+compares sorting them with the precomputed key used by rpmList() against
+the comparison function approach (cmp_to_key) it replaced. When the rpm
+bindings are installed the comparison using rpm.labelCompare() is timed
+as well (and its order checked against the precomputed key).
+
+Usage:
+
+    PYTHONPATH=src python3 benchmarks/bench_sort.py [--count 100000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from functools import cmp_to_key
+
+try:
+    import rpm
+except ImportError:
+    rpm = None
+
+from rpm2json.sinks import _entrySortKey
+from rpm2json.vercmp import rpmvercmp
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_SUFFIXES = ["", "-devel", "-libs", "-doc", "-common", "-tools"]
+_PRE = ["", "", "", "~rc1", "~beta2", "^git20200101"]
+_DIST = ["fc38", "fc39", "el9", "nst32"]
+
+
+def makeEntries(count, seed=0):
+    """Generates synthetic entries with realistic looking NEVRAs.
+
+    Args:
+      count (int): Number of entries to generate.
+      seed (int): Random number seed (so runs are repeatable).
+
+    Returns:
+      :[]: List of {"f": path, "key": [name, src, epoch, version, release]}
+      entries (paths increase with the position, so ties keep their order).
+    """
+    rnd = random.Random(seed)
+    entries = []
+    for i in range(count):
+        name = "pkg{num}{suffix}".format(num=rnd.randrange(count // 8 + 1), suffix=rnd.choice(_SUFFIXES))
+        version = ".".join(str(rnd.randrange(20)) for _ in range(rnd.randint(1, 4))) + rnd.choice(_PRE)
+        release = "{rel}.{dist}".format(rel=rnd.randrange(1, 30), dist=rnd.choice(_DIST))
+        epoch = rnd.choice([0, 0, 0, 0, 1, 2])
+        entries.append({"f": "{num:08d}.rpm".format(num=i), "key": [name, rnd.randint(0, 1), epoch, version, release]})
+    return entries
+
+
+def _compareEntries(a, b):
+    ka = a["key"]
+    kb = b["key"]
+    for i in range(3):
+        if ka[i] < kb[i]:
+            return -1
+        if ka[i] > kb[i]:
+            return 1
+    return rpmvercmp(ka[3], kb[3]) or rpmvercmp(ka[4], kb[4])
+
+
+def _compareEntriesRpm(a, b):
+    ka = a["key"]
+    kb = b["key"]
+    for i in range(2):
+        if ka[i] < kb[i]:
+            return -1
+        if ka[i] > kb[i]:
+            return 1
+    return rpm.labelCompare((str(ka[2]), ka[3], ka[4]), (str(kb[2]), kb[3], kb[4]))
+
+
+def _time(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print("{label:<40} {secs:8.3f} s".format(label=label, secs=elapsed))
+    return result
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Benchmark package sorting")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic packages")
+    parser.add_argument("--seed", type=int, default=0, help="Random number seed")
+    args = parser.parse_args(args)
+
+    entries = makeEntries(args.count, args.seed)
+    print("Sorting {cnt} synthetic NEVRAs".format(cnt=len(entries)))
+    byKey = _time("sorted(key=_entrySortKey)", lambda: sorted(entries, key=_entrySortKey))
+    byCmp = _time("sorted(key=cmp_to_key(rpmvercmp))", lambda: sorted(entries, key=cmp_to_key(_compareEntries)))
+    if byKey != byCmp:
+        print("ERROR: sort orders differ")
+        return 1
+    if rpm != None:
+        byRpm = _time("sorted(key=cmp_to_key(rpm.labelCompare))", lambda: sorted(entries, key=cmp_to_key(_compareEntriesRpm)))
+        if byKey != byRpm:
+            print("ERROR: sort orders differ from rpm.labelCompare")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Generator of synthetic RPM repositories for benchmarking.
+
+The packages are built by writing the RPM lead, signature header and main
+header structures directly (no rpmbuild, network access or real payload
+is needed). The headers carry the tags rpm2json reads (names, versions,
+dependencies, changelogs and file lists) in the same layout rpmbuild uses
+(immutable regions, an i18n table and header digests in the signature) so
+both the rpm bindings and the native reader can read them.
+
+Usage:
+
+    PYTHONPATH=src python3 benchmarks/synthrepo.py DIR [--packages 1000]
+        [--files 20] [--changelog 10] [--noise 100] [--seed 0]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import struct
+
+from rpm2json import rpmheader as rh
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_HEADER_I18NTABLE = 100
+_HEADER_SIGNATURES = 62
+_HEADER_IMMUTABLE = 63
+_SIGTAG_SIZE = 1000
+_SIGTAG_MD5 = 1004
+
+_ALIGN = {rh.RPM_INT16_TYPE: 2, rh.RPM_INT32_TYPE: 4, rh.RPM_INT64_TYPE: 8}
+_INT_FORMATS = {rh.RPM_INT8_TYPE: "B", rh.RPM_INT16_TYPE: "H", rh.RPM_INT32_TYPE: "I", rh.RPM_INT64_TYPE: "Q"}
+
+_ARCHES = ["x86_64", "x86_64", "x86_64", "noarch", "aarch64", "i686"]
+_SUFFIXES = ["", "-devel", "-libs", "-doc", "-common", "-tools"]
+_DIRS = ["/usr/bin/", "/usr/lib64/", "/usr/share/doc/", "/usr/share/man/man1/", "/etc/", "/usr/include/"]
+_WORDS = ("fix update build rebuild bump version release patch security upstream "
+          "spec cleanup license test drop add remove package").split()
+_NOISE = [".txt", ".xml", ".html", ".sig", ".rpm", ".gz", ""]
+
+
+def _encodeValue(kind, value):
+    if kind in _INT_FORMATS:
+        return struct.pack(">{cnt}{fmt}".format(cnt=len(value), fmt=_INT_FORMATS[kind]), *value)
+    if kind == rh.RPM_BIN_TYPE:
+        return bytes(value)
+    if kind == rh.RPM_STRING_TYPE:
+        return value.encode() + b"\0"
+    return b"".join(v.encode() + b"\0" for v in value)
+
+
+def _count(kind, value):
+    # Binary data is counted in bytes, arrays in items
+    return 1 if kind == rh.RPM_STRING_TYPE else len(value)
+
+
+def buildHeader(tags, regionTag):
+    """Builds a header structure.
+
+    Args:
+      tags ([]): List of (tag, type, value) tuples. Values are lists for
+        the integer and array types, str for strings and bytes for binary.
+      regionTag (int): Tag of the immutable region entry (62 for the
+        signature header, 63 for the main header).
+
+    Returns:
+      bytes: Header starting with the header magic.
+    """
+    entryCnt = len(tags) + 1
+    index = []
+    store = bytearray()
+    for tag, kind, value in sorted(tags):
+        align = _ALIGN.get(kind, 1)
+        store.extend(b"\0" * ((align - len(store) % align) % align))
+        index.append(struct.pack(">IIiI", tag, kind, len(store), _count(kind, value)))
+        store.extend(_encodeValue(kind, value))
+    # The region trailer (a copy of the region entry with a negative
+    # offset covering all the entries) goes at the end of the data store
+    region = struct.pack(">IIiI", regionTag, rh.RPM_BIN_TYPE, len(store), 16)
+    store.extend(struct.pack(">IIiI", regionTag, rh.RPM_BIN_TYPE, -entryCnt * 16, 16))
+    intro = rh.HEADER_MAGIC + b"\0\0\0\0" + struct.pack(">II", entryCnt, len(store))
+    return intro + region + b"".join(index) + bytes(store)
+
+
+def buildLead(name, source=False):
+    """Builds the 96 byte RPM lead."""
+    return (rh.LEAD_MAGIC + struct.pack(">BBhh", 3, 0, 1 if source else 0, 1) +
+            name.encode()[:65].ljust(66, b"\0") + struct.pack(">hh", 1, 5) + b"\0" * 16)
+
+
+def buildRpm(pkg, payload=b""):
+    """Builds the content of a RPM file.
+
+    Args:
+      pkg ({}): Package description (see makePackage()).
+      payload (bytes): Bytes to use as the (fake) payload.
+
+    Returns:
+      bytes: Content of the RPM file.
+    """
+    S = rh.RPM_STRING_TYPE
+    A = rh.RPM_STRING_ARRAY_TYPE
+    I18N = rh.RPM_I18NSTRING_TYPE
+    I32 = rh.RPM_INT32_TYPE
+    tags = [
+        (_HEADER_I18NTABLE, A, ["C"]),
+        (rh.RPMTAG_NAME, S, pkg["name"]),
+        (rh.RPMTAG_VERSION, S, pkg["version"]),
+        (rh.RPMTAG_RELEASE, S, pkg["release"]),
+        (rh.RPMTAG_SUMMARY, I18N, [pkg["summary"]]),
+        (rh.RPMTAG_DESCRIPTION, I18N, [pkg["description"]]),
+        (rh.RPMTAG_BUILDTIME, I32, [pkg["buildTime"]]),
+        (rh.RPMTAG_BUILDHOST, S, "build.example.com"),
+        (rh.RPMTAG_SIZE, I32, [sum(f[2] for f in pkg["files"])]),
+        (rh.RPMTAG_LICENSE, S, "MIT"),
+        (rh.RPMTAG_GROUP, I18N, ["Unspecified"]),
+        (rh.RPMTAG_URL, S, "https://example.com/" + pkg["name"]),
+        (rh.RPMTAG_OS, S, "linux"),
+        (rh.RPMTAG_ARCH, S, pkg["arch"]),
+        (rh.RPMTAG_RPMVERSION, S, "4.16.1"),
+        (rh.RPMTAG_PAYLOADFORMAT, S, "cpio"),
+        (rh.RPMTAG_PAYLOADCOMPRESSOR, S, "zstd"),
+    ]
+    if pkg["epoch"]:
+        tags.append((rh.RPMTAG_EPOCH, I32, [pkg["epoch"]]))
+    if pkg["sourceRpm"] != None:
+        tags.append((rh.RPMTAG_SOURCERPM, S, pkg["sourceRpm"]))
+    else:
+        tags.append((rh.RPMTAG_SOURCEPACKAGE, I32, [1]))
+    for nameTag, flagsTag, versionTag, deps in (
+            (rh.RPMTAG_PROVIDENAME, rh.RPMTAG_PROVIDEFLAGS, rh.RPMTAG_PROVIDEVERSION, pkg["provides"]),
+            (rh.RPMTAG_REQUIRENAME, rh.RPMTAG_REQUIREFLAGS, rh.RPMTAG_REQUIREVERSION, pkg["requires"])):
+        if deps:
+            tags.append((nameTag, A, [d[0] for d in deps]))
+            tags.append((flagsTag, I32, [8 if d[1] else 0 for d in deps]))
+            tags.append((versionTag, A, [d[1] for d in deps]))
+    if pkg["changelog"]:
+        tags.append((rh.RPMTAG_CHANGELOGTIME, I32, [c[0] for c in pkg["changelog"]]))
+        tags.append((rh.RPMTAG_CHANGELOGNAME, A, [c[1] for c in pkg["changelog"]]))
+        tags.append((rh.RPMTAG_CHANGELOGTEXT, A, [c[2] for c in pkg["changelog"]]))
+    if pkg["files"]:
+        dirNames = sorted(set(f[0] for f in pkg["files"]))
+        dirIndex = dict((d, i) for i, d in enumerate(dirNames))
+        tags.append((rh.RPMTAG_DIRNAMES, A, dirNames))
+        tags.append((rh.RPMTAG_BASENAMES, A, [f[1] for f in pkg["files"]]))
+        tags.append((rh.RPMTAG_DIRINDEXES, I32, [dirIndex[f[0]] for f in pkg["files"]]))
+        tags.append((rh.RPMTAG_FILESIZES, I32, [f[2] for f in pkg["files"]]))
+        tags.append((rh.RPMTAG_FILEMODES, rh.RPM_INT16_TYPE, [f[3] for f in pkg["files"]]))
+    if pkg["postIn"] != None:
+        tags.append((rh.RPMTAG_POSTIN, S, pkg["postIn"]))
+        tags.append((rh.RPMTAG_POSTINPROG, A, ["/bin/sh"]))
+    main = buildHeader(tags, _HEADER_IMMUTABLE)
+
+    sigTags = [
+        (_SIGTAG_SIZE, I32, [len(main) + len(payload)]),
+        (_SIGTAG_MD5, rh.RPM_BIN_TYPE, hashlib.md5(main + payload).digest()),
+        (rh.RPMTAG_SHA1HEADER, S, hashlib.sha1(main).hexdigest()),
+        (rh.RPMTAG_SHA256HEADER, S, hashlib.sha256(main).hexdigest()),
+    ]
+    sig = buildHeader(sigTags, _HEADER_SIGNATURES)
+    sig += b"\0" * ((8 - len(sig) % 8) % 8)
+    nevr = "{name}-{version}-{release}".format(**pkg)
+    return buildLead(nevr, pkg["sourceRpm"] == None) + sig + main + payload
+
+
+def _sentence(rnd, words):
+    return " ".join(rnd.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+def makePackage(rnd, num, files=20, changelog=10, source=False):
+    """Generates a random package description.
+
+    Args:
+      rnd (random.Random): Random number generator.
+      num (int): Package number (used to build a unique name).
+      files (int): Number of files in the package.
+      changelog (int): Number of changelog entries.
+      source (bool): Describe a source package.
+
+    Returns:
+      :{}: Package description for buildRpm().
+    """
+    base = "pkg{num}".format(num=num // len(_SUFFIXES))
+    name = base + ("" if source else _SUFFIXES[num % len(_SUFFIXES)])
+    version = ".".join(str(rnd.randrange(20)) for _ in range(rnd.randint(1, 3)))
+    release = "{rel}.fc{dist}".format(rel=rnd.randrange(1, 30), dist=rnd.randint(30, 40))
+    arch = "src" if source else rnd.choice(_ARCHES)
+    buildTime = 1500000000 + rnd.randrange(200000000)
+    pkg = {
+        "name": name, "epoch": rnd.choice([0, 0, 0, 0, 1]), "version": version, "release": release,
+        "arch": arch, "buildTime": buildTime,
+        "summary": _sentence(rnd, 6), "description": _sentence(rnd, 60),
+        "sourceRpm": None if source else "{base}-{v}-{r}.src.rpm".format(base=base, v=version, r=release),
+        "provides": [(name, version + "-" + release)] + [("lib{n}.so.{i}()(64bit)".format(n=name, i=i), "")
+                                                         for i in range(rnd.randrange(3))],
+        "requires": [("pkg{n}".format(n=rnd.randrange(num + 1)), "") for _ in range(rnd.randrange(8))] +
+                    [("rpmlib(CompressedFileNames)", "3.0.4-1")],
+        "changelog": [(buildTime - i * 86400 * 7, "Packager <packager@example.com> - {v}-{r}".format(
+                           v=version, r=max(1, 30 - i)), "- " + _sentence(rnd, rnd.randint(4, 20)))
+                      for i in range(changelog)],
+        "files": [],
+        "postIn": "/sbin/ldconfig" if rnd.random() < 0.2 else None,
+    }
+    for i in range(files):
+        pkg["files"].append((rnd.choice(_DIRS), "{name}-file{i}".format(name=name, i=i),
+                             rnd.randrange(1 << 20), 0o100644))
+    return pkg
+
+
+def makeRepo(topdir, packages=1000, files=20, changelog=10, noise=0, sourceRatio=0.1, payload=0, seed=0):
+    """Writes a synthetic repository.
+
+    Binary packages are spread over per arch directories (source packages
+    go to SRPMS) and the noise files (some with a .rpm extension but no RPM
+    content) go to a repodata directory and next to the packages.
+
+    Args:
+      topdir (str): Directory to create the repository in.
+      packages (int): Number of RPM files to write.
+      files (int): Number of files in each package.
+      changelog (int): Number of changelog entries in each package.
+      noise (int): Number of non-RPM files to write.
+      sourceRatio (float): Fraction of the packages that are source RPMs.
+      payload (int): Size in bytes of the (random) payload of each package.
+      seed (int): Random number seed (so runs are repeatable).
+
+    Returns:
+      :{}: Counts of the "rpms" and "noise" files and total "bytes" written.
+    """
+    rnd = random.Random(seed)
+    dirs = set()
+    written = 0
+    for num in range(packages):
+        source = rnd.random() < sourceRatio
+        pkg = makePackage(rnd, num, files, changelog, source)
+        data = buildRpm(pkg, rnd.getrandbits(payload * 8).to_bytes(payload, "little") if payload else b"")
+        subdir = os.path.join(topdir, "SRPMS" if source else pkg["arch"])
+        if subdir not in dirs:
+            os.makedirs(subdir, exist_ok=True)
+            dirs.add(subdir)
+        fileName = "{name}-{version}-{release}.{arch}.rpm".format(**pkg)
+        with open(os.path.join(subdir, fileName), "wb") as f:
+            f.write(data)
+        written += len(data)
+    noiseDir = os.path.join(topdir, "repodata")
+    os.makedirs(noiseDir, exist_ok=True)
+    for num in range(noise):
+        subdir = noiseDir if num % 2 == 0 else os.path.join(topdir, rnd.choice(sorted(dirs) or ["repodata"]))
+        os.makedirs(subdir, exist_ok=True)
+        data = bytes(rnd.getrandbits(8) for _ in range(rnd.randrange(16, 4096)))
+        with open(os.path.join(subdir, "noise{num}{ext}".format(num=num, ext=rnd.choice(_NOISE))), "wb") as f:
+            f.write(data)
+        written += len(data)
+    return { "rpms": packages, "noise": noise, "bytes": written }
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Generates a synthetic RPM repository")
+    parser.add_argument("dir", help="Directory to create the repository in")
+    parser.add_argument("--packages", type=int, default=1000, help="Number of packages")
+    parser.add_argument("--files", type=int, default=20, help="Files per package")
+    parser.add_argument("--changelog", type=int, default=10, help="Changelog entries per package")
+    parser.add_argument("--noise", type=int, default=100, help="Number of non-RPM files")
+    parser.add_argument("--source-ratio", type=float, default=0.1, help="Fraction of source packages")
+    parser.add_argument("--payload", type=int, default=0, help="Payload bytes per package")
+    parser.add_argument("--seed", type=int, default=0, help="Random number seed")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args()
+    counts = makeRepo(args.dir, args.packages, args.files, args.changelog, args.noise,
+                      args.source_ratio, args.payload, args.seed)
+    print("Wrote {rpms} RPM files and {noise} other files ({bytes} bytes) to {dir}".format(dir=args.dir, **counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,34 @@
 # -*- coding: utf-8 -*-
-import rpm
-import json
+import concurrent.futures
+import fnmatch
 import os
+import shutil
+import struct
+import tempfile
 import time
 import logging
-from functools import cmp_to_key
+
+from rpm2json import rpmheader
+from rpm2json.aio import aiterPackages, arpmList
+from rpm2json.cache import DEFAULT_CACHE_FILE, HeaderCache
+from rpm2json.columnar import encodeFiles
+from rpm2json.repodata import RepodataSource
+from rpm2json.scan import scanTree
+from rpm2json.serialize import TEXT_ERRORS
+from rpm2json.sinks import DEFAULT_RUN_SIZE, CallbackSink, JsonDirSink, NdjsonSink, writeEntries
+from rpm2json.stats import RunStats, clock
+
+try:
+    import rpm
+    HAVE_RPM = True
+except ImportError:
+    # No rpm bindings, the pure Python reader provides the RPMTAG_* values
+    rpm = rpmheader
+    HAVE_RPM = False
+
+#: Header readers that can be passed to rpmList(), "rpm" uses the rpm
+#: bindings and "native" the pure Python reader in rpm2json.rpmheader.
+READERS = ("rpm", "native")
 
 try:
     from importlib.metadata import version, PackageNotFoundError
@@ -50,80 +74,161 @@ def _safeDecode(val):
     else:
         return val
 
-def createRpmInfo(h):
+def _strField(h, tag):
+    return _safeDecode(h[tag])
+
+def _listField(h, tag):
+    return _encodeList(h[tag])
+
+def _valueField(h, tag):
+    return h[tag]
+
+# From http://yum.baseurl.org/download/misc/checksig.py
+_SIGINFO_QUERY = '%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{%|SIGGPG?{%{SIGGPG:pgpsig}}:{%|SIGPGP?{%{SIGPGP:pgpsig}}:{(none)}|}|}|}|'
+
+def _sigInfoField(h, tag):
+    return h.sprintf(_SIGINFO_QUERY)
+
+# Information fields that can be extracted from a RPM header: (key, tag,
+# extraction function, in the default field set). The information
+# dictionaries hold the selected fields in this order.
+_INFO_FIELDS = (
+    ("arch", rpm.RPMTAG_ARCH, _strField, True),
+    ("archiveSize", rpm.RPMTAG_ARCHIVESIZE, _valueField, True),
+    ("buildHost", rpm.RPMTAG_BUILDHOST, _strField, True),
+    ("buildTime", rpm.RPMTAG_BUILDTIME, _valueField, True),
+    ("changeLogName", rpm.RPMTAG_CHANGELOGNAME, _listField, True),
+    ("changeLogText", rpm.RPMTAG_CHANGELOGTEXT, _listField, True),
+    ("changeLogTime", rpm.RPMTAG_CHANGELOGTIME, _valueField, True),
+    ("conflicts", rpm.RPMTAG_CONFLICTS, _listField, True),
+    ("description", rpm.RPMTAG_DESCRIPTION, _strField, True),
+    ("epochNum", rpm.RPMTAG_EPOCHNUM, _valueField, True),
+    ("fileModes", rpm.RPMTAG_FILEMODES, _listField, True),
+    ("fileNames", rpm.RPMTAG_FILENAMES, _listField, True),
+    ("fileSizes", rpm.RPMTAG_FILESIZES, _listField, True),
+    ("group", rpm.RPMTAG_GROUP, _strField, True),
+    ("installTime", rpm.RPMTAG_INSTALLTIME, _valueField, True),
+    ("installPrefixes", rpm.RPMTAG_INSTPREFIXES, _listField, True),
+    ("license", rpm.RPMTAG_LICENSE, _strField, True),
+    ("longSize", rpm.RPMTAG_LONGSIZE, _valueField, True),
+    ("name", rpm.RPMTAG_NAME, _strField, True),
+    ("obsoletes", rpm.RPMTAG_OBSOLETES, _listField, True),
+    ("os", rpm.RPMTAG_OS, _strField, True),
+    ("packager", rpm.RPMTAG_PACKAGER, _strField, True),
+    ("platform", rpm.RPMTAG_PLATFORM, _strField, True),
+    ("postIn", rpm.RPMTAG_POSTIN, _strField, True),
+    ("postInProg", rpm.RPMTAG_POSTINPROG, _listField, True),
+    ("postTrans", rpm.RPMTAG_POSTTRANS, _strField, True),
+    ("postTransProg", rpm.RPMTAG_POSTTRANSPROG, _listField, True),
+    ("postUn", rpm.RPMTAG_POSTUN, _strField, True),
+    ("postUnProg", rpm.RPMTAG_POSTUNPROG, _listField, True),
+    ("preIn", rpm.RPMTAG_PREIN, _strField, True),
+    ("preInProg", rpm.RPMTAG_PREINPROG, _listField, True),
+    ("preTrans", rpm.RPMTAG_PRETRANS, _strField, True),
+    ("preTransProg", rpm.RPMTAG_PRETRANSPROG, _listField, True),
+    ("preUn", rpm.RPMTAG_PREUN, _strField, True),
+    ("preUnProg", rpm.RPMTAG_PREUNPROG, _listField, True),
+    ("provides", rpm.RPMTAG_PROVIDES, _listField, True),
+    ("release", rpm.RPMTAG_RELEASE, _strField, True),
+    ("requires", rpm.RPMTAG_REQUIRES, _listField, True),
+    ("sigInfo", None, _sigInfoField, True),
+    ("size", rpm.RPMTAG_SIZE, _valueField, True),
+    ("sourceRpm", rpm.RPMTAG_SOURCERPM, _strField, True),
+    ("summary", rpm.RPMTAG_SUMMARY, _strField, True),
+    ("url", rpm.RPMTAG_URL, _strField, True),
+    ("triggerScripts", rpm.RPMTAG_TRIGGERSCRIPTS, _listField, True),
+    ("triggerScriptsConds", rpm.RPMTAG_TRIGGERCONDS, _listField, True),
+    ("triggerScriptsFlags", rpm.RPMTAG_TRIGGERFLAGS, _listField, True),
+    ("triggerScriptsIndex", rpm.RPMTAG_TRIGGERINDEX, _listField, True),
+    ("triggerScriptsName", rpm.RPMTAG_TRIGGERNAME, _listField, True),
+    ("triggerScriptsProg", rpm.RPMTAG_TRIGGERSCRIPTPROG, _listField, True),
+    ("triggerScriptsScriptFlags", rpm.RPMTAG_TRIGGERSCRIPTFLAGS, _listField, True),
+    ("triggerScriptsType", rpm.RPMTAG_TRIGGERTYPE, _listField, True),
+    ("triggerScriptsVersion", rpm.RPMTAG_TRIGGERVERSION, _listField, True),
+    ("vendor", rpm.RPMTAG_VENDOR, _strField, True),
+    ("verifyScript", rpm.RPMTAG_VERIFYSCRIPT, _strField, True), # NoneType
+    ("verifyScriptProg", rpm.RPMTAG_VERIFYSCRIPTPROG, _listField, True),
+    ("version", rpm.RPMTAG_VERSION, _strField, True),
+    # Only in the "full" field set
+    ("bugUrl", rpm.RPMTAG_BUGURL, _strField, False),
+    ("conflictFlags", rpm.RPMTAG_CONFLICTFLAGS, _listField, False),
+    ("conflictVersions", rpm.RPMTAG_CONFLICTVERSION, _listField, False),
+    ("distribution", rpm.RPMTAG_DISTRIBUTION, _strField, False),
+    ("distUrl", rpm.RPMTAG_DISTURL, _strField, False),
+    ("fileDigests", rpm.RPMTAG_FILEDIGESTS, _listField, False),
+    ("fileFlags", rpm.RPMTAG_FILEFLAGS, _listField, False),
+    ("fileGroupNames", rpm.RPMTAG_FILEGROUPNAME, _listField, False),
+    ("fileLinkTos", rpm.RPMTAG_FILELINKTOS, _listField, False),
+    ("fileMTimes", rpm.RPMTAG_FILEMTIMES, _listField, False),
+    ("fileUserNames", rpm.RPMTAG_FILEUSERNAME, _listField, False),
+    ("obsoleteFlags", rpm.RPMTAG_OBSOLETEFLAGS, _listField, False),
+    ("obsoleteVersions", rpm.RPMTAG_OBSOLETEVERSION, _listField, False),
+    ("optFlags", rpm.RPMTAG_OPTFLAGS, _strField, False),
+    ("payloadCompressor", rpm.RPMTAG_PAYLOADCOMPRESSOR, _strField, False),
+    ("provideFlags", rpm.RPMTAG_PROVIDEFLAGS, _listField, False),
+    ("provideVersions", rpm.RPMTAG_PROVIDEVERSION, _listField, False),
+    ("requireFlags", rpm.RPMTAG_REQUIREFLAGS, _listField, False),
+    ("requireVersions", rpm.RPMTAG_REQUIREVERSION, _listField, False),
+    ("rpmVersion", rpm.RPMTAG_RPMVERSION, _strField, False),
+)
+
+#: Named sets of information fields that can be passed to createRpmInfo().
+FIELD_PRESETS = {
+    "minimal": ("arch", "buildTime", "epochNum", "group", "license", "name", "release", "size",
+                "sourceRpm", "summary", "url", "version"),
+    "default": tuple(f[0] for f in _INFO_FIELDS if f[3]),
+    "full": tuple(f[0] for f in _INFO_FIELDS),
+}
+
+_fieldsByKey = dict((f[0], f) for f in _INFO_FIELDS)
+
+def resolveFields(fields=None):
+    """Converts a field selection into the list of field names to extract.
+
+    Args:
+      fields: None for the default fields, the name of one of the
+        FIELD_PRESETS, a comma separated string or a list of field names
+        (entries of the list may also be preset names).
+
+    Returns:
+      :(str): Selected field names (in the order they are written).
+
+    Raises:
+      ValueError: If a field or preset name is unknown.
+    """
+    if fields == None:
+        return FIELD_PRESETS["default"]
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    selected = set()
+    for f in fields:
+        if f in FIELD_PRESETS:
+            selected.update(FIELD_PRESETS[f])
+        elif f in _fieldsByKey:
+            selected.add(f)
+        else:
+            raise ValueError("Unknown RPM information field: {field}".format(field=f))
+    return tuple(f[0] for f in _INFO_FIELDS if f[0] in selected)
+
+def createRpmInfo(h, fields=None):
     """Creates dictionary from handle to RPM object.
     
+    Only the tags needed by the selected fields are fetched from the header
+    (the signature information query is only run if "sigInfo" is selected).
+
     Args:
       h (rpm.hdr): An RPM header object.
+      fields: Fields to extract (see resolveFields(), defaults to the
+        "default" preset).
 
     Returns:
       :{}: Hetrogeneous dictionary with information pulled out
       of RPM header (all keys will be strings, but not all values).
     """
-
-    # From http://yum.baseurl.org/download/misc/checksig.py
-    string = '%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{%|SIGGPG?{%{SIGGPG:pgpsig}}:{%|SIGPGP?{%{SIGPGP:pgpsig}}:{(none)}|}|}|}|'
-    siginfo = h.sprintf(string)
-    
-    info = {
-        "arch" : _safeDecode(h[rpm.RPMTAG_ARCH]),
-        "archiveSize" : h[rpm.RPMTAG_ARCHIVESIZE],
-        "buildHost" : _safeDecode(h[rpm.RPMTAG_BUILDHOST]),
-        "buildTime" : h[rpm.RPMTAG_BUILDTIME],
-        "changeLogName" : _encodeList(h[rpm.RPMTAG_CHANGELOGNAME]),
-        "changeLogText" : _encodeList(h[rpm.RPMTAG_CHANGELOGTEXT]),
-        "changeLogTime" : h[rpm.RPMTAG_CHANGELOGTIME],
-        "conflicts" : _encodeList(h[rpm.RPMTAG_CONFLICTS]),
-        "description" : _safeDecode(h[rpm.RPMTAG_DESCRIPTION]),
-        "epochNum" : h[rpm.RPMTAG_EPOCHNUM],
-        "fileModes" : _encodeList(h[rpm.RPMTAG_FILEMODES]),
-        "fileNames" : _encodeList(h[rpm.RPMTAG_FILENAMES]),
-        "fileSizes" : _encodeList(h[rpm.RPMTAG_FILESIZES]),
-        "group" : _safeDecode(h[rpm.RPMTAG_GROUP]),
-        "installTime" : h[rpm.RPMTAG_INSTALLTIME],
-        "installPrefixes" : _encodeList(h[rpm.RPMTAG_INSTPREFIXES]),
-        "license" : _safeDecode(h[rpm.RPMTAG_LICENSE]),
-        "longSize" : h[rpm.RPMTAG_LONGSIZE],
-        "name" : _safeDecode(h[rpm.RPMTAG_NAME]),
-        "obsoletes" : _encodeList(h[rpm.RPMTAG_OBSOLETES]),
-        "os" : _safeDecode(h[rpm.RPMTAG_OS]),
-        "packager" : _safeDecode(h[rpm.RPMTAG_PACKAGER]),
-        "platform" : _safeDecode(h[rpm.RPMTAG_PLATFORM]),
-        "postIn" : _safeDecode(h[rpm.RPMTAG_POSTIN]),
-        "postInProg" : _encodeList(h[rpm.RPMTAG_POSTINPROG]),
-        "postTrans" : _safeDecode(h[rpm.RPMTAG_POSTTRANS]),
-        "postTransProg" : _encodeList(h[rpm.RPMTAG_POSTTRANSPROG]),
-        "postUn" : _safeDecode(h[rpm.RPMTAG_POSTUN]),
-        "postUnProg" : _encodeList(h[rpm.RPMTAG_POSTUNPROG]),
-        "preIn" : _safeDecode(h[rpm.RPMTAG_PREIN]),
-        "preInProg" : _encodeList(h[rpm.RPMTAG_PREINPROG]),
-        "preTrans" : _safeDecode(h[rpm.RPMTAG_PRETRANS]),
-        "preTransProg" : _encodeList(h[rpm.RPMTAG_PRETRANSPROG]),
-        "preUn" : _safeDecode(h[rpm.RPMTAG_PREUN]),
-        "preUnProg" : _encodeList(h[rpm.RPMTAG_PREUNPROG]),
-        "provides" : _encodeList(h[rpm.RPMTAG_PROVIDES]),
-        "release" : _safeDecode(h[rpm.RPMTAG_RELEASE]),
-        "requires" : _encodeList(h[rpm.RPMTAG_REQUIRES]),
-        "sigInfo" : siginfo,
-        "size" : h[rpm.RPMTAG_SIZE],
-        "sourceRpm" : _safeDecode(h[rpm.RPMTAG_SOURCERPM]),
-        "summary" : _safeDecode(h[rpm.RPMTAG_SUMMARY]),
-        "url" : _safeDecode(h[rpm.RPMTAG_URL]),
-        "triggerScripts" : _encodeList(h[rpm.RPMTAG_TRIGGERSCRIPTS]),
-        "triggerScriptsConds" : _encodeList(h[rpm.RPMTAG_TRIGGERCONDS]),
-        "triggerScriptsFlags" : _encodeList(h[rpm.RPMTAG_TRIGGERFLAGS]),
-        "triggerScriptsIndex" : _encodeList(h[rpm.RPMTAG_TRIGGERINDEX]),
-        "triggerScriptsName" : _encodeList(h[rpm.RPMTAG_TRIGGERNAME]),
-        "triggerScriptsProg" : _encodeList(h[rpm.RPMTAG_TRIGGERSCRIPTPROG]),
-        "triggerScriptsScriptFlags" : _encodeList(h[rpm.RPMTAG_TRIGGERSCRIPTFLAGS]),
-        "triggerScriptsType" : _encodeList(h[rpm.RPMTAG_TRIGGERTYPE]),
-        "triggerScriptsVersion" : _encodeList(h[rpm.RPMTAG_TRIGGERVERSION]),
-        "vendor" : _safeDecode(h[rpm.RPMTAG_VENDOR]),
-        "verifyScript" : _safeDecode(h[rpm.RPMTAG_VERIFYSCRIPT]), # NoneType
-        "verifyScriptProg" : _encodeList(h[rpm.RPMTAG_VERIFYSCRIPTPROG]),
-        "version" : _safeDecode(h[rpm.RPMTAG_VERSION]),
-        #          rpm.RPMTAG_ : _safeDecode(h[rpm.RPMTAG_]),
-    }
+    info = { }
+    for key in resolveFields(fields):
+        (key, tag, extract, default) = _fieldsByKey[key]
+        info[key] = extract(h, tag)
     return info
 
 def compareVersion(ha, hb):
@@ -219,17 +324,294 @@ def compareNameVersion(a, b):
     # Otherwise, use epoch, version, release
     return compareVersion(a, b)
 
-def _compareListEntries(a, b):
-    (fa, ha) = a
-    (fb, hb) = b
-    return compareNameVersion(ha, hb)
+def _getSortKey(h):
+    """Extracts the values used to order packages from an RPM header.
+
+    Args:
+      h (rpm.hdr): RPM header object.
+
+    Returns:
+      :[]: [name, isSourceRpm(h), epoch, version, release]
+    """
+    return [_safeDecode(h[rpm.RPMTAG_NAME]), isSourceRpm(h), _getEpoch(h),
+            _safeDecode(h[rpm.RPMTAG_VERSION]), _safeDecode(h[rpm.RPMTAG_RELEASE])]
+
+def _indexFields(relPath, h):
+    """Builds the rpmlist.json fields (all but the id) for an RPM header."""
+    return {
+        "name": _safeDecode(h[rpm.RPMTAG_NAME]),
+        "e": h[rpm.RPMTAG_EPOCHNUM],
+        "v": _safeDecode(h[rpm.RPMTAG_VERSION]),
+        "r": _safeDecode(h[rpm.RPMTAG_RELEASE]),
+        "arch": _safeDecode(h[rpm.RPMTAG_ARCH]),
+        "src": (_safeDecode(h[rpm.RPMTAG_SOURCERPM]) == None),
+        "buildTime": h[rpm.RPMTAG_BUILDTIME],
+        "f": relPath
+    }
+
+def _headerDigest(h):
+    """Returns the hex SHA256 (or SHA1 for older RPMs) digest of the main
+    header recorded in the signature header (None if neither is present)."""
+    for tag in (getattr(rpm, "RPMTAG_SHA256HEADER", rpmheader.RPMTAG_SHA256HEADER),
+                getattr(rpm, "RPMTAG_SHA1HEADER", rpmheader.RPMTAG_SHA1HEADER)):
+        digest = _safeDecode(h[tag])
+        if digest:
+            return digest
+    return None
+
+def _createEntry(relPath, h, fields=None):
+    """Extracts everything needed from an RPM header to produce the output files.
+
+    Args:
+      relPath (str): Path to RPM file relative to the repository directory.
+      h (rpm.hdr): RPM header object.
+      fields: Information fields to extract (see resolveFields()).
+
+    Returns:
+      :{}: Dictionary with the relative path ("f"), sort key ("key"),
+      rpmlist.json fields ("index"), information dictionary ("info") and
+      header digest ("digest", used by the digest id scheme) for the RPM.
+    """
+    index = _indexFields(relPath, h)
+    info = createRpmInfo(h, fields)
+    # Hmmm, seems like there should be a better way
+    info["src"] = index["src"]
+    return { "f": relPath, "key": _getSortKey(h), "index": index, "info": info, "digest": _headerDigest(h) }
+
+def _readHeader(ts, path):
+    """Reads the header of a RPM file.
+
+    Returns:
+      :obj:`tuple`: (h, bytesRead) where h is the header (None if not a
+      readable RPM) and bytesRead the offset the reader left the file at
+      (the size of the lead and headers).
+    """
+    fd = None
+    bytesRead = 0
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        h = ts.hdrFromFdno(fd)
+        bytesRead = os.lseek(fd, 0, os.SEEK_CUR)
+    except Exception:
+        return (None, bytesRead)
+    finally:
+        if fd != None:
+            os.close(fd)
+    return (h, bytesRead)
+
+def _readRpmEntry(ts, path, relPath, fields=None):
+    """Reads the header of a RPM file and builds its entry.
+
+    Returns:
+      :obj:`tuple`: (entry, bytesRead) where entry is the entry produced by
+      _createEntry() (None if not a readable RPM) and bytesRead the offset
+      the reader left the file at (the size of the lead and headers).
+    """
+    (h, bytesRead) = _readHeader(ts, path)
+    if h == None:
+        return (None, bytesRead)
+    try:
+        return (_createEntry(relPath, h, fields), bytesRead)
+    except (rpmheader.RpmHeaderError, ValueError, IndexError, TypeError, struct.error) as msg:
+        # The native reader only decodes the tags used here
+        _logger.debug("Unable to read header of {file}: {msg}".format(file=path, msg=msg))
+        return (None, bytesRead)
+
+def _defaultReader():
+    return "rpm" if HAVE_RPM else "native"
+
+def _newTransactionSet(reader):
+    """Creates the object used to read RPM headers.
+
+    Args:
+      reader (str): One of READERS.
+
+    Returns:
+      Object with a hdrFromFdno(fd) method.
+    """
+    if reader == "native":
+        return rpmheader.TransactionSet()
+    if reader == "rpm":
+        if not HAVE_RPM:
+            raise ValueError("The rpm Python bindings are not installed (use the native reader)")
+        return rpm.TransactionSet()
+    raise ValueError("Unknown RPM header reader: {reader}".format(reader=reader))
+
+#: Number of files iterPackageRecords() hands to a worker process at a time.
+_READ_BATCH = 32
+
+# TransactionSets used by _readRpmFile() keyed by reader (each worker
+# process gets its own)
+_workerTs = { }
+
+def _initWorker():
+    global _workerTs
+    _workerTs = { }
+
+def _readRpmFile(path, relPath, reader, fields=None):
+    """Reads a RPM file using the TransactionSet owned by the current process.
+
+    Returns:
+      :obj:`tuple`: (entry, seconds, bytesRead) where entry is the entry
+      produced by _createEntry() (None if not a readable RPM) and seconds the
+      time taken to read it.
+    """
+    ts = _workerTs.get(reader)
+    if ts == None:
+        ts = _workerTs[reader] = _newTransactionSet(reader)
+    start = time.perf_counter()
+    (entry, bytesRead) = _readRpmEntry(ts, path, relPath, fields)
+    return (entry, time.perf_counter() - start, bytesRead)
+
+def _readRpmBatch(paths, relPaths, reader, fields=None):
+    """Reads a batch of RPM files in a worker process.
+
+    Returns:
+      :[]: (entry, seconds, bytesRead) for each file (see _readRpmFile()).
+    """
+    return [_readRpmFile(p, r, reader, fields) for p, r in zip(paths, relPaths)]
+
+def createWorkerPool(jobs):
+    """Creates a pool of worker processes that read RPM headers (see the
+    pool argument of rpmList()).
+
+    Args:
+      jobs (int): Number of worker processes (0 to use one per CPU).
+
+    Returns:
+      concurrent.futures.ProcessPoolExecutor: The pool (shut it down when
+      done).
+    """
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    return concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_initWorker)
+
+def _readRpmFiles(paths, relPaths, jobs=1, reader="rpm", fields=None, pool=None):
+    """Reads the headers of a list of files.
+
+    Args:
+      paths ([str]): Paths to files to read.
+      relPaths ([str]): Paths relative to the repository directory.
+      jobs (int): Number of worker processes to spread the work across (the
+        files are read in this process if 1 or less).
+      reader (str): Header reader to use (one of READERS).
+      fields: Information fields to extract (see resolveFields()).
+      pool (concurrent.futures.Executor): Worker pool created by
+        createWorkerPool() to use instead of starting jobs processes.
+
+    Returns:
+      Generator yielding (entry, seconds, bytesRead) tuples (see
+      _readRpmFile(), entry is None for files that were not RPMs) in the
+      same order as the paths passed in.
+    """
+    if pool == None and (jobs <= 1 or len(paths) <= 1):
+        for p, r in zip(paths, relPaths):
+            yield _readRpmFile(p, r, reader, fields)
+        return
 
-def _rpmBuildList(list, topdir):
-    _logger.debug("Looking for RPMs under {topdir}".format(topdir=topdir))
-    for root, subdirs, files in os.walk(topdir):
-        for f in files:
-            _logger.debug("Adding file {file}".format(file=f))
-            list.append(os.path.join(root, f))
+    chunkSize = max(1, min(64, len(paths) // (max(1, jobs) * 4)))
+    if pool != None:
+        _logger.debug("Reading {cnt} files using the shared worker pool".format(cnt=len(paths)))
+        for result in pool.map(_readRpmFile, paths, relPaths, [reader] * len(paths), [fields] * len(paths),
+                               chunksize=chunkSize):
+            yield result
+        return
+
+    _logger.debug("Reading {cnt} files using {jobs} worker processes".format(cnt=len(paths), jobs=jobs))
+    with createWorkerPool(jobs) as pool:
+        for result in pool.map(_readRpmFile, paths, relPaths, [reader] * len(paths), [fields] * len(paths),
+                               chunksize=chunkSize):
+            yield result
+
+class _InfoStager(object):
+    """Writes the information of each RPM to a staging file as soon as it
+    has been read so only the (small) index fields need to be kept in
+    memory until the final ids are known.
+
+    The staged text is the JSON for the information minus the closing
+    brace so the id can be appended once the packages have been sorted.
+    """
+
+    def __init__(self, jsonDir, encoder):
+        self.dir = tempfile.mkdtemp(prefix=".staging-", dir=jsonDir)
+        self.encoder = encoder
+        self.count = 0
+
+    def stage(self, entry):
+        """Writes the information of an entry to a staging file.
+
+        Returns:
+          :{}: Compact entry holding the relative path ("f"), sort key
+          ("key"), index fields ("index"), header digest ("digest") and
+          staging file ("staged").
+        """
+        staged = os.path.join(self.dir, str(self.count))
+        self.count = self.count + 1
+        f = open(staged, "w", encoding="utf-8", errors=TEXT_ERRORS)
+        f.write(self.encoder.dumps(entry["info"])[:-1])
+        f.close()
+        return { "f": entry["f"], "key": entry["key"], "index": entry["index"], "digest": entry.get("digest"),
+                 "staged": staged }
+
+    def finish(self, entry, layout, id):
+        """Completes a staged information file by adding the id and hands
+        it to the output layout.
+
+        Returns:
+          :{}: Fields to add to the rpmlist.json record (see FlatLayout.write()).
+        """
+        tail = "{sep}\"id\"{kv}{id}}}".format(sep=self.encoder.itemSeparator,
+                                                kv=self.encoder.keySeparator, id=self.encoder.dumps(id))
+        return layout.writeStaged(id, entry["staged"], tail)
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+class _FileFilter(object):
+    """Decides which files found under the repository directory are worth
+    handing to the RPM header reader."""
+
+    def __init__(self, include=None, exclude=None):
+        """
+        Args:
+          include ([str]): Glob patterns (matched against the path relative
+            to the repository directory), if set only matching files are
+            considered.
+          exclude ([str]): Glob patterns of files to ignore.
+        """
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.excluded = 0
+        self.badMagic = 0
+        self.bytesRead = 0
+
+    def accepts(self, relPath):
+        """Checks a path against the include and exclude patterns."""
+        if self.include and not any(fnmatch.fnmatch(relPath, p) for p in self.include):
+            self.excluded += 1
+            return False
+        if any(fnmatch.fnmatch(relPath, p) for p in self.exclude):
+            self.excluded += 1
+            return False
+        return True
+
+    def hasRpmMagic(self, path):
+        """Checks if a file starts with the RPM lead magic bytes (a single
+        4 byte read that avoids a full parse attempt on non-RPM files)."""
+        fd = None
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            magic = os.read(fd, len(rpmheader.LEAD_MAGIC))
+            self.bytesRead += len(magic)
+            if magic == rpmheader.LEAD_MAGIC:
+                return True
+        except OSError:
+            pass
+        finally:
+            if fd != None:
+                os.close(fd)
+        self.badMagic += 1
+        return False
 
 def _makeDir(dir):
     if not os.path.isdir(dir):
@@ -243,85 +625,450 @@ def _getEpoch(h):
         epoch = 0
     return epoch
 
-def rpmList(topdir, jsonDir):
+def _collectEntry(entry, stager, search, database, blobs, columnar):
+    """Hands a freshly read or cached entry to the search index builder,
+    database, file list encoder, blob store and stager (the entry returned
+    replaces the one passed in)."""
+    if search != None:
+        search.add(entry)
+    if database != None:
+        database.add(entry)
+    if columnar or blobs != None:
+        # Copy as the cache must keep the complete information
+        entry = dict(entry)
+        if columnar:
+            entry["info"] = encodeFiles(entry["info"])
+        if blobs != None:
+            entry["info"] = blobs.dedup(entry["info"])
+    if stager != None:
+        entry = stager.stage(entry)
+    return entry
+
+def iterRpmFiles(topdir, include=None, exclude=None, scanThreads=8, skipDirs=(), stats=None):
+    """Finds the candidate RPM files under a directory (first stage of the
+    pipeline, see rpm2json.sinks).
+
+    Args:
+      topdir (str): Directory to recursively search for RPM files.
+      include ([str]): If set, only files whose path (relative to topdir)
+        matches one of these glob patterns are yielded.
+      exclude ([str]): Glob patterns of files (relative to topdir) to skip.
+      scanThreads (int): Number of directories scanned concurrently.
+      skipDirs ([str]): Directories not to search.
+      stats (rpm2json.stats.RunStats): Statistics to add the walk phase and
+        the file counts to.
+
+    Yields:
+      rpm2json.scan.FileRecord for each file in path order (the files are
+      not checked for the RPM magic bytes yet).
+    """
+    if stats == None:
+        stats = RunStats()
+    fileFilter = _FileFilter(include, exclude)
+    _logger.debug("Recursively searching for files under {dir}".format(dir=topdir))
+    with stats.phase("walk"):
+        fileList = scanTree(topdir, scanThreads, list(skipDirs))
+    stats.files += len(fileList)
+    try:
+        for rec in fileList:
+            if fileFilter.accepts(rec.relPath):
+                yield rec
+    finally:
+        stats.excluded += fileFilter.excluded
+
+def iterHeaders(files, reader=None):
+    """Reads the headers of files in this process.
+
+    Args:
+      files: Iterable of rpm2json.scan.FileRecord (see iterRpmFiles()).
+      reader (str): Header reader to use (one of READERS).
+
+    Yields:
+      :obj:`tuple`: (rec, h) for each file that is a readable RPM where h
+      is the header (as returned by rpm.TransactionSet.hdrFromFdno()).
+    """
+    if reader == None:
+        reader = _defaultReader()
+    ts = _newTransactionSet(reader)
+    fileFilter = _FileFilter()
+    for rec in files:
+        if not fileFilter.hasRpmMagic(rec.path):
+            continue
+        h = _readHeader(ts, rec.path)[0]
+        if h != None:
+            yield (rec, h)
+
+def iterPackageRecords(files, fields=None, jobs=1, reader=None, pool=None, cache=None, shared=None, stats=None):
+    """Produces the entry of each RPM file (reading its header or taking the
+    entry from a cache).
+
+    Args:
+      files: Iterable of rpm2json.scan.FileRecord (see iterRpmFiles()).
+      fields: Information fields to extract (see resolveFields()).
+      jobs (int): Number of worker processes used to read RPM headers (the
+        files are read one at a time as the entries are consumed if 1 or
+        less and no pool is given).
+      reader (str): Header reader to use (one of READERS).
+      pool (concurrent.futures.Executor): Worker pool created by
+        createWorkerPool() to use instead of starting jobs processes.
+      cache (rpm2json.cache.HeaderCache): Entries of unchanged files from
+        a previous run (updated with the entries read).
+      shared (rpm2json.cache.SharedEntryCache): Entries already read for
+        another repository of a batch.
+      stats (rpm2json.stats.RunStats): Statistics to add the counts and
+        header reads to.
+
+    Yields:
+      Entry for each RPM (see _createEntry()) as soon as it is available:
+      entries taken from a cache right away and, when reading in worker
+      processes, the others as their batch completes (so not in file
+      order).
+    """
+    if reader == None:
+        reader = _defaultReader()
+    _newTransactionSet(reader)
+    fields = resolveFields(fields)
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    if stats == None:
+        stats = RunStats()
+    fileFilter = _FileFilter()
+    inline = (pool == None and jobs <= 1)
+    # Batches of files handed to the worker processes (future: records)
+    running = { }
+    maxRunning = jobs * 4
+
+    def readDone(rec, entry, seconds, bytesRead):
+        stats.addRead(rec.relPath, seconds, bytesRead)
+        if cache != None:
+            cache.store(rec.relPath, rec, entry)
+        if shared != None:
+            shared.store(rec, fields, entry)
+        if entry == None:
+            stats.unreadable += 1
+        else:
+            stats.rpms += 1
+        return entry
+
+    def takeDone(block):
+        """Entries of the finished batches (waiting for one if block)."""
+        if block:
+            concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        entries = [ ]
+        for future in [f for f in running if f.done()]:
+            recs = running.pop(future)
+            for rec, result in zip(recs, future.result()):
+                entry = readDone(rec, *result)
+                if entry != None:
+                    entries.append(entry)
+        return entries
+
+    ownPool = None
+    if not inline and pool == None:
+        _logger.debug("Reading files using {jobs} worker processes".format(jobs=jobs))
+        pool = ownPool = createWorkerPool(jobs)
+    pending = [ ]
+    try:
+        for rec in files:
+            relPath = rec.relPath
+            if cache != None:
+                (hit, entry) = cache.lookup(relPath, rec)
+                if hit:
+                    stats.cached += 1
+                    if entry != None:
+                        stats.rpms += 1
+                        yield entry
+                    continue
+            if shared != None:
+                # Same physical file already read for another repository of a batch
+                (hit, entry) = shared.lookup(relPath, rec, fields)
+                if hit:
+                    stats.cached += 1
+                    if cache != None:
+                        cache.store(relPath, rec, entry)
+                    if entry != None:
+                        stats.rpms += 1
+                        yield entry
+                    continue
+            if not fileFilter.hasRpmMagic(rec.path):
+                if cache != None:
+                    cache.store(relPath, rec, None)
+                continue
+            if inline:
+                entry = readDone(rec, *_readRpmFile(rec.path, relPath, reader, fields))
+                if entry != None:
+                    yield entry
+                continue
+            pending.append(rec)
+            if len(pending) >= _READ_BATCH:
+                running[pool.submit(_readRpmBatch, [r.path for r in pending], [r.relPath for r in pending],
+                                    reader, fields)] = pending
+                pending = [ ]
+                for entry in takeDone(len(running) >= maxRunning):
+                    yield entry
+
+        if pending:
+            running[pool.submit(_readRpmBatch, [r.path for r in pending], [r.relPath for r in pending],
+                                reader, fields)] = pending
+        while running:
+            for entry in takeDone(True):
+                yield entry
+    finally:
+        for future in running:
+            future.cancel()
+        if ownPool != None:
+            ownPool.shutdown()
+        stats.badMagic += fileFilter.badMagic
+        stats.bytesRead += fileFilter.bytesRead
+
+def _iterRepodata(source, jobs, reader, fileFilter, stats, ids, pool):
+    """Produces the entries of the packages listed in the repodata, reading
+    the headers of those that need fields repodata does not have.
+
+    Yields:
+      Entries of the RPMs, those needing no header read first.
+    """
+    _logger.debug("Reading {files}".format(files=", ".join(source.files)))
+    # Packages needing header reads grouped by the fields read
+    pending = { }
+    for entry in source.entries():
+        stats.files += 1
+        if not fileFilter.accepts(entry["f"]):
+            continue
+        headerFields = source.headerFields(entry, ids == "digest")
+        if headerFields == None:
+            stats.rpms += 1
+            yield entry
+            continue
+        pending.setdefault(headerFields, []).append(entry)
+    stats.bytesRead += source.bytesRead
+    stats.excluded = fileFilter.excluded
+
+    for headerFields, group in pending.items():
+        _logger.debug("Reading {fields} from the headers of {cnt} RPMs".format(
+            fields=", ".join(headerFields) or "the digest", cnt=len(group)))
+        relPaths = [entry["f"] for entry in group]
+        headerEntries = _readRpmFiles([os.path.join(source.topdir, r) for r in relPaths], relPaths, jobs, reader,
+                                      headerFields, pool)
+        for entry, (headerEntry, seconds, bytesRead) in zip(group, headerEntries):
+            stats.addRead(entry["f"], seconds, bytesRead)
+            if headerEntry == None:
+                _logger.warning("Unable to read the header of {file} listed in the repodata".format(file=entry["f"]))
+                stats.unreadable += 1
+                continue
+            stats.rpms += 1
+            yield source.merge(entry, headerEntry)
+
+def rpmList(topdir, jsonDir, incremental=False, cacheFile=None, jobs=1, stream=False, reader=None,
+            include=None, exclude=None, scanThreads=8, layout="flat", compress=None,
+            bundleSize=1000, compact=False, encoder=None, fields=None, cache=None, ids="sequential",
+            fsync=False, pageSize=0, search=None, sqlite=None, dedup=False, fileEncoding="expanded",
+            pool=None, shared=None, fromRepodata=False):
     """Generates JSON files that can be used to build a repository browser.
 
     Args:
       topdir (str): Directory to recursively search for RPM files.
       jsonDir (str): Directory to write JSON output files to.
+      incremental (bool): Reuse the header information cached by a previous
+        run for files whose size, modification time and inode have not
+        changed.
+      cacheFile (str): Cache file used in incremental mode (defaults to
+        .rpm2json-cache.json in jsonDir).
+      jobs (int): Number of worker processes used to read RPM headers (0
+        to use one per CPU).
+      stream (bool): Write the information for each RPM out as soon as it
+        is read and only keep the index fields in memory (peak memory use
+        no longer grows with the size of the RPM headers).
+      reader (str): How RPM headers are read, "rpm" to use the rpm bindings
+        or "native" to use the pure Python reader which only maps the
+        header portion of each file (defaults to "rpm" if the bindings are
+        installed).
+      include ([str]): If set, only files whose path (relative to topdir)
+        matches one of these glob patterns are considered.
+      exclude ([str]): Glob patterns of files (relative to topdir) to skip.
+      scanThreads (int): Number of directories scanned concurrently when
+        searching topdir (helps on network file systems).
+      layout (str): How the per RPM information files are arranged under
+        jsonDir/info, "flat", "sharded" or "bundled" (see rpm2json.layout).
+      compress ([str]): Also write precompressed copies of each JSON file
+        ("gz" and/or "br").
+      bundleSize (int): Number of RPMs packed into each file by the
+        "bundled" layout.
+      compact (bool): Write JSON without any optional whitespace (allows
+        the faster orjson or ujson encoders to be used).
+      encoder (str): JSON encoder, "json", "orjson", "ujson" or "auto" (the
+        default) to pick the fastest one installed (see rpm2json.serialize).
+      fields: Information fields written for each RPM, the name of one of
+        the FIELD_PRESETS ("minimal", "default" or "full"), a comma
+        separated string or a list of field names (see resolveFields()).
+        Tags that are not selected are never read from the headers.
+      cache (rpm2json.cache.HeaderCache): Header cache to use instead of
+        loading cacheFile (implies incremental, lets a long running process
+        keep the cache in memory between runs, see rpm2json.watch).
+      ids (str): How the id of each RPM (which names its information file)
+        is chosen, "sequential" numbers the RPMs in sort order, "nevra" and
+        "digest" derive a stable id from the package name, epoch, version,
+        release and arch or from the header digest (see rpm2json.ids).
+      fsync (bool): Sync the output files to disk before they are renamed
+        into place (done in one batch at the end of the run).
+      pageSize (int): If set, rpmlist.json is also split into pages of
+        pageSize records and shards by first letter and arch under
+        jsonDir/index along with a manifest (see rpm2json.pages).
+      search: Search indexes to write under jsonDir/search, "all", a comma
+        separated string or a list of names from SEARCH_INDEXES ("names",
+        "provides", "requires" and "files", see rpm2json.search).
+      sqlite (str): Also store the packages in this SQLite database
+        (updated incrementally if it exists, see rpm2json.sqlite).
+      dedup (bool): Store the change logs and file lists of the RPMs in
+        shared, content addressed blobs under jsonDir/blobs that the
+        information files refer to (see rpm2json.dedup).
+      fileEncoding (str): "expanded" writes the fileNames, fileModes and
+        fileSizes arrays, "columnar" replaces them with a much smaller
+        "files" object (directory and base names, delta encoded integers,
+        see rpm2json.columnar, can not be used with dedup).
+      pool (concurrent.futures.Executor): Worker pool (see
+        createWorkerPool()) used to read the RPM headers instead of starting
+        jobs worker processes for the run (lets a batch share one pool).
+      shared (rpm2json.cache.SharedEntryCache): Entries already read from
+        the same physical files (hardlinks) by other runs of a batch (see
+        rpm2json.batch).
+      fromRepodata (bool): Take the package information from the
+        repository's repodata (repodata/repomd.xml) instead of searching
+        topdir for RPM files. Only the fields repodata lacks are read from
+        the RPM headers (see rpm2json.repodata), and the header cache is
+        not used.
+
+    Every output file is written to a temporary file and renamed into
+    place, files whose content is unchanged are not rewritten and
+    information files left over from RPMs that are gone are removed (see
+    rpm2json.output).
+
+    Files that do not start with the RPM lead magic bytes are skipped
+    without attempting to read them and jsonDir is never searched when it
+    lives under topdir.
+
+    Returns:
+      rpm2json.stats.RunStats: Time spent in each phase of the run and the
+      number of files and RPMs found.
     """
-    ts = rpm.TransactionSet()
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    if reader == None:
+        reader = _defaultReader()
+    # Fail early on a bad reader rather than treating every file as a non-RPM
+    _newTransactionSet(reader)
+    fields = resolveFields(fields)
 
-    # Make sure that output directories exist
-    jsonDir = _makeDir(jsonDir)
-    jsonRpmDir = _makeDir(os.path.join(jsonDir, 'info'))
+    repodata = None
+    if fromRepodata:
+        repodata = RepodataSource(topdir, fields)
+        if repodata.missing:
+            _logger.info("Reading {fields} from the RPM headers as repodata does not have them".format(
+                fields=", ".join(repodata.missing)))
+        # Nothing to cache, the metadata is always parsed in full
+        incremental = False
+        cache = None
+        shared = None
 
-    _logger.debug("Recursively searching for files under {dir}".format(dir=topdir))
-    fileList = [ ]
-    _rpmBuildList(fileList, topdir)
-    rootLen = len(topdir) + 1
-    rpmHeaders = [ ]
-    fileList = sorted(fileList)
-    
-    _logger.debug("Checking to see how many of the {fileCnt} files are readable RPMs".format(fileCnt=len(fileList)))
-    
-    for f in fileList:
-        fd = None
-        try:
-          fd = os.open(f, os.O_RDONLY)
-          h = ts.hdrFromFdno(fd)
-          relPath = f[rootLen:]
-          rpmHeaders.append((relPath, h))
-          _logger.debug("Processed RPM file {file}".format(file=relPath))
-        except Exception:
-          pass
-        finally:
-            if fd != None:
-                os.close(fd)
+    if cache != None:
+        if cache.fields != list(fields):
+            raise ValueError("The header cache holds different information fields")
+        incremental = True
+        cache.rollover()
 
-    _logger.info("{rpmCnt} of the {fileCnt} files under {dir} were valid RPM files".format(
-        rpmCnt=len(rpmHeaders), fileCnt = len(fileList), dir=topdir))
+    stats = RunStats()
+    # Validates the remaining options and makes sure the output directories exist
+    sink = JsonDirSink(jsonDir, layout, compress, bundleSize, compact, encoder, fields, ids, fsync, pageSize,
+                       search, sqlite, dedup, fileEncoding, stream, stats)
 
-    sortedList = sorted(rpmHeaders, key=cmp_to_key(_compareListEntries), reverse=False)
+    if incremental and cache == None:
+        if cacheFile == None:
+            cacheFile = os.path.join(jsonDir, DEFAULT_CACHE_FILE)
+        cache = HeaderCache(cacheFile, fields)
+        cache.load()
 
-    jsonObj = []
-    id = 100000
-    
-    for f, h in sortedList:
-        name = str(h[rpm.RPMTAG_NAME])
-        epoch = _getEpoch(h)
-        version = str(h[rpm.RPMTAG_VERSION])
-        release = str(h[rpm.RPMTAG_RELEASE])
-        arch = str(h[rpm.RPMTAG_ARCH])
-        # Hmmm, seems like there should be a better way
-        isSrc = (_safeDecode(h[rpm.RPMTAG_SOURCERPM]) == None)
-        
-        jsonObj.append({
-            "id": id,
-            "name": name,
-            "e": epoch,
-            "v": version,
-            "r": release,
-            "arch": arch,
-            "src": isSrc,
-            "buildTime": h[rpm.RPMTAG_BUILDTIME],
-            "f": f            
-        })
-        ofile = os.path.join(jsonRpmDir, str(id) + ".json")
-        _logger.debug("Writing JSON info file {file} for {name}-{epoch}:{version}-{release}.{arch}".format(
-            file=ofile, name=name, epoch=epoch, version=version, release=release, arch=arch))
-        f = open(ofile, "w")
-        info = createRpmInfo(h)
-        info["src"] = isSrc
-        info["id"] = id
-        f.write(json.dumps(info))
-        f.close()
-        id = id + 1
-
-    # Write out main index file
-    ofile = os.path.join(jsonDir, "rpmlist.json")
-    _logger.debug("Writing JSON file with list of all {rpmCnt} RPMs to {outFile}".format(
-        rpmCnt=len(jsonObj), outFile=ofile))
-    f = open(ofile, "w");
-    f.write(json.dumps(jsonObj))
-    f.close()
+    try:
+        if repodata != None:
+            readStart = clock()
+            fileFilter = _FileFilter(include, exclude)
+            entries = _iterRepodata(repodata, jobs, reader, fileFilter, stats, ids, pool)
+        else:
+            files = list(iterRpmFiles(topdir, include, exclude, scanThreads, [jsonDir], stats))
+            readStart = clock()
+            _logger.debug("Checking to see how many of the {fileCnt} files are readable RPMs".format(
+                fileCnt=stats.files))
+            entries = iterPackageRecords(files, fields, jobs, reader, pool, cache, shared, stats)
+        for entry in entries:
+            _logger.debug("Processed RPM file {file}".format(file=entry["f"]))
+            sink.add(entry)
+    except BaseException:
+        sink.abort()
+        raise
+
+    if repodata != None:
+        _logger.info("{rpmCnt} of the {pkgCnt} packages in the repodata under {dir} were used "
+                     "({excluded} excluded by pattern, {read} headers read)".format(
+            rpmCnt=stats.rpms, pkgCnt=stats.files, dir=topdir, excluded=stats.excluded, read=stats.latency.count))
+    else:
+        cacheMsg = ""
+        if cache != None or shared != None:
+            cacheMsg = ", {hits} unchanged since last run or already read".format(hits=stats.cached)
+        _logger.info("{rpmCnt} of the {fileCnt} files under {dir} were valid RPM files "
+                     "({excluded} excluded by pattern, {notRpm} not RPMs{cacheMsg})".format(
+            rpmCnt=stats.rpms, fileCnt=stats.files, dir=topdir, excluded=stats.excluded,
+            notRpm=stats.badMagic + stats.unreadable, cacheMsg=cacheMsg))
+    stats.addSince("read", readStart)
+
+    sink.close()
+
+    if cache != None:
+        cache.save()
+
+    return stats
+
+def rpmNdjson(topdir, out, sort=False, jobs=1, reader=None, include=None, exclude=None, scanThreads=8,
+              encoder=None, fields=None, fromRepodata=False, runSize=DEFAULT_RUN_SIZE):
+    """Writes the information of each RPM (see createRpmInfo()) as one line
+    of JSON to a text stream instead of generating the JSON files.
+
+    The directory tree is scanned before the first line is written, as the
+    files are read in path order (see iterRpmFiles()), so the first line
+    comes after the scan of a large tree rather than right away.
+
+    Args:
+      topdir (str): Directory to recursively search for RPM files.
+      out: Text stream to write to (for example sys.stdout).
+      sort (bool): Write the packages in rpmlist.json order (sorted in
+        runs of runSize packages spilled to temporary files) instead of as
+        they are read (see iterPackageRecords()).
+      runSize (int): Number of packages sorted in memory when sorting.
+      Others: See the arguments of the same name of rpmList().
+
+    Returns:
+      rpm2json.stats.RunStats: Time spent in each phase of the run and the
+      number of files and RPMs found.
+    """
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    if reader == None:
+        reader = _defaultReader()
+    _newTransactionSet(reader)
+    fields = resolveFields(fields)
+    stats = RunStats()
+    sink = NdjsonSink(out, encoder, True, sort, runSize)
+
+    if fromRepodata:
+        source = RepodataSource(topdir, fields)
+        readStart = clock()
+        entries = _iterRepodata(source, jobs, reader, _FileFilter(include, exclude), stats, "sequential", None)
+    else:
+        # scanTree() returns the sorted file list of the whole tree, so the
+        # scan completes here and the read phase only times the reading
+        files = list(iterRpmFiles(topdir, include, exclude, scanThreads, (), stats))
+        readStart = clock()
+        entries = iterPackageRecords(files, fields, jobs, reader, None, None, None, stats)
+    count = writeEntries(entries, sink)
+    _logger.info("Wrote {rpmCnt} of the {fileCnt} files under {dir} as JSON lines".format(
+        rpmCnt=count, fileCnt=stats.files, dir=topdir))
+    stats.addSince("read", readStart)
+    return stats
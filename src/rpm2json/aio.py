@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio API for services that run rpm2json inside an event loop.
+
+Nothing here blocks the event loop:
+
+- arpmList() runs rpmList() in an executor and returns the same result (the
+  output files are identical).
+- aiterPackages() scans the repository in an executor and yields the
+  entry of each RPM as soon as its header has been read. At most
+  maxPending headers are read ahead of the consumer, so a slow consumer
+  holds back the reading.
+
+For example::
+
+    async for entry in rpm2json.aiterPackages(topdir, fields="minimal"):
+        await index(entry["index"], entry["info"])
+
+    stats = await rpm2json.arpmList(topdir, jsonDir, jobs=4)
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import logging
+import sys
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Default number of headers aiterPackages() reads ahead of its consumer.
+DEFAULT_MAX_PENDING = 64
+
+
+async def arpmList(topdir, jsonDir, executor=None, **options):
+    """Generates the JSON files without blocking the event loop.
+
+    Args:
+      topdir (str): Directory to recursively search for RPM files.
+      jsonDir (str): Directory to write JSON output files to.
+      executor (concurrent.futures.Executor): Executor to run rpmList() in
+        (the event loop's default executor if None). Use the jobs option
+        to spread the header reading across worker processes.
+      options: Other keyword arguments for rpm2json.rpmList().
+
+    Returns:
+      rpm2json.stats.RunStats: Statistics returned by rpmList().
+    """
+    # Deferred import, rpm2json imports this module
+    from rpm2json import rpmList
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(rpmList, topdir, jsonDir, **options))
+
+
+def _readCandidate(path, relPath, reader, fields):
+    """Reads the header of a file found by the scan (in an executor).
+
+    Returns:
+      :{}: Entry built from the header (None if not a readable RPM).
+    """
+    from rpm2json import _FileFilter, _readRpmFile
+
+    if not _FileFilter().hasRpmMagic(path):
+        return None
+    return _readRpmFile(path, relPath, reader, fields)[0]
+
+
+async def aiterPackages(topdir, fields=None, reader=None, include=None, exclude=None, jobs=1, scanThreads=8,
+                        skipDirs=(), maxPending=DEFAULT_MAX_PENDING):
+    """Reads the RPMs under a directory without blocking the event loop.
+
+    Args:
+      topdir (str): Directory to recursively search for RPM files.
+      fields: Information fields to extract (see rpm2json.resolveFields()).
+      reader (str): Header reader to use (see rpm2json.READERS).
+      include ([str]): If set, only files whose path (relative to topdir)
+        matches one of these glob patterns are considered.
+      exclude ([str]): Glob patterns of files (relative to topdir) to skip.
+      jobs (int): Number of worker processes reading headers (0 to use one
+        per CPU, headers are read in a single worker thread if 1).
+      scanThreads (int): Number of directories scanned concurrently.
+      skipDirs ([str]): Directories not to search.
+      maxPending (int): Maximum number of headers read ahead of the
+        consumer.
+
+    Yields:
+      Entry for each RPM in the order the files were found (see
+      rpm2json._createEntry(), with the relative path "f", the
+      rpmlist.json fields "index", the information "info" and the header
+      "digest").
+    """
+    # Deferred import, rpm2json imports this module
+    from rpm2json import _FileFilter, _defaultReader, _newTransactionSet, createWorkerPool, resolveFields
+    from rpm2json.scan import scanTree
+
+    if reader == None:
+        reader = _defaultReader()
+    _newTransactionSet(reader)
+    fields = resolveFields(fields)
+    fileFilter = _FileFilter(include, exclude)
+    loop = asyncio.get_running_loop()
+    fileList = await loop.run_in_executor(None, scanTree, topdir, scanThreads, list(skipDirs))
+    if jobs == 1:
+        # A single thread as header readers are not shared between threads
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    else:
+        pool = createWorkerPool(jobs)
+    window = collections.deque()
+    try:
+        records = (rec for rec in fileList if fileFilter.accepts(rec.relPath))
+        while True:
+            while len(window) < max(1, maxPending):
+                rec = next(records, None)
+                if rec == None:
+                    break
+                window.append(loop.run_in_executor(pool, _readCandidate, rec.path, rec.relPath, reader, fields))
+            if not window:
+                break
+            entry = await window.popleft()
+            if entry != None:
+                yield entry
+    finally:
+        for future in window:
+            future.cancel()
+        if jobs != 1 and sys.version_info >= (3, 9):
+            # Also drop the reads queued in the process pool (not just
+            # the asyncio futures waiting on them)
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            pool.shutdown(wait=False)
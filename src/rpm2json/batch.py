@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Batch mode: generates the JSON for many repositories in one process.
+
+The repositories are listed in a JSON configuration file::
+
+    {
+      "defaults": {"incremental": true, "compact": true, "jobs": 8},
+      "repos": [
+        {"dir": "/srv/repos/40/x86_64", "outdir": "/srv/json/40/x86_64"},
+        {"dir": "/srv/repos/40/aarch64", "outdir": "/srv/json/40/aarch64", "layout": "sharded"}
+      ]
+    }
+
+Each repository names its directory (``dir``) and optionally its output
+directory (``outdir``, defaults to ``<dir>/json``). Any other keys, like
+those of ``defaults``, are rpmList() keyword arguments (``jobs`` may only
+be set in ``defaults`` as it sizes the worker pool of the whole batch).
+
+The repositories are processed one after another, but they share a single
+pool of worker processes (each keeping its header reader from one
+repository to the next) and a SharedEntryCache, so an RPM hardlinked into
+several repositories has its header read only once.
+"""
+
+import inspect
+import json
+import logging
+import os
+
+from rpm2json.cache import SharedEntryCache
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+# rpmList() arguments that can not be set in a configuration file
+_RESERVED = ("topdir", "jsonDir", "cache", "pool", "shared")
+
+
+def loadBatchConfig(path):
+    """Reads a batch configuration file.
+
+    Args:
+      path (str): JSON configuration file.
+
+    Returns:
+      :obj:`tuple`: (defaults, repos) where defaults is a dictionary of
+      rpmList() keyword arguments (and "jobs" for runBatch()) and repos a
+      list of dictionaries holding the "dir", "outdir" and rpmList()
+      keyword arguments of each repository.
+
+    Raises:
+      ValueError: If the configuration is not valid.
+    """
+    # Deferred import, rpm2json imports this module
+    from rpm2json import rpmList
+
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict) or not isinstance(config.get("repos"), list):
+        raise ValueError("{file} does not hold a \"repos\" list".format(file=path))
+    names = set(inspect.signature(rpmList).parameters) - set(_RESERVED)
+    defaults = dict(config.get("defaults") or { })
+    unknown = set(defaults) - names
+    if unknown:
+        raise ValueError("Unknown batch defaults in {file}: {keys}".format(file=path, keys=", ".join(sorted(unknown))))
+    repos = []
+    for repo in config["repos"]:
+        if not isinstance(repo, dict) or not repo.get("dir"):
+            raise ValueError("Each repository in {file} needs a \"dir\"".format(file=path))
+        unknown = set(repo) - names - set(["dir", "outdir"])
+        if unknown:
+            raise ValueError("Unknown settings for {dir} in {file}: {keys}".format(
+                dir=repo["dir"], file=path, keys=", ".join(sorted(unknown))))
+        if "jobs" in repo:
+            raise ValueError("jobs can only be set in the defaults of {file}".format(file=path))
+        repos.append(dict(repo))
+    return (defaults, repos)
+
+
+def runBatch(repos, jobs=1, onRun=None, **options):
+    """Generates the JSON files of several repositories with one worker
+    pool.
+
+    Args:
+      repos ([{}]): Repositories to process, each a dictionary holding the
+        repository directory ("dir"), optionally the output directory
+        ("outdir", defaults to dir/json) and rpmList() keyword arguments
+        overriding options.
+      jobs (int): Number of worker processes shared by all repositories
+        (0 to use one per CPU, headers are read in this process if 1).
+      onRun (callable): Called with the repository dictionary and the
+        rpm2json.stats.RunStats of each repository once it is done.
+      options: rpmList() keyword arguments used for every repository.
+
+    Returns:
+      :[rpm2json.stats.RunStats]: Statistics of each repository.
+
+    Raises:
+      ValueError: If two repositories would write the same output directory,
+        cache file or database.
+    """
+    # Deferred import, rpm2json imports this module
+    from rpm2json import createWorkerPool, rpmList
+
+    runs = []
+    claimed = { }
+    for repo in repos:
+        settings = dict(options)
+        settings.update((k, v) for k, v in repo.items() if k not in ("dir", "outdir"))
+        outdir = repo.get("outdir") or os.path.join(repo["dir"], "json")
+        for what, path in (("output directory", outdir), ("cache file", settings.get("cacheFile")),
+                           ("SQLite database", settings.get("sqlite"))):
+            if path == None:
+                continue
+            path = os.path.abspath(path)
+            if path in claimed:
+                raise ValueError("{dir} and {other} would both use the {what} {path}".format(
+                    dir=repo["dir"], other=claimed[path], what=what, path=path))
+            claimed[path] = repo["dir"]
+        runs.append((repo, outdir, settings))
+
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    pool = None
+    if jobs > 1:
+        pool = createWorkerPool(jobs)
+    shared = SharedEntryCache()
+    results = []
+    try:
+        for repo, outdir, settings in runs:
+            _logger.info("Generating JSON for {dir} in {outdir}".format(dir=repo["dir"], outdir=outdir))
+            stats = rpmList(repo["dir"], outdir, jobs=jobs, pool=pool, shared=shared, **settings)
+            results.append(stats)
+            if onRun != None:
+                onRun(repo, stats)
+    finally:
+        if pool != None:
+            pool.shutdown()
+    _logger.info("Processed {repos} repositories ({hits} RPMs read once for several repositories)".format(
+        repos=len(results), hits=shared.hits))
+    return results
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of the information extracted from RPM headers.
+
+The cache maps the path of each file (relative to the repository directory)
+to the file's size, modification time and inode along with the entry that
+was built from the RPM header. As long as those stat values are unchanged
+the cached entry is reused and the file does not need to be opened again.
+The cache also records which information fields the entries hold, a run
+selecting different fields starts with an empty cache.
+"""
+
+import json
+import logging
+import os
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Default name of the cache file (written to the JSON output directory).
+DEFAULT_CACHE_FILE = ".rpm2json-cache.json"
+
+# Bump whenever the layout of the cached entries changes
+_CACHE_FORMAT = 3
+
+
+def _statKey(rec):
+    return [rec.size, rec.mtime, rec.ino]
+
+
+class HeaderCache(object):
+    """On disk cache of RPM header entries keyed on file path and stat info.
+
+    Only the entries looked up or stored since the cache was loaded are
+    written back by :meth:`save` so files removed from the repository drop
+    out of the cache automatically.
+    """
+
+    def __init__(self, path, fields=()):
+        """Creates an empty cache.
+
+        Args:
+          path (str): File used to persist the cache.
+          fields ([str]): Information fields extracted for each entry.
+        """
+        self.path = path
+        self.fields = list(fields)
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._current = {}
+
+    def load(self):
+        """Loads previously saved entries (a missing or unreadable cache
+        file simply results in an empty cache).
+        """
+        self._entries = {}
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == _CACHE_FORMAT and data.get("fields") == self.fields:
+                self._entries = data["entries"]
+        except Exception as msg:
+            _logger.warning("Ignoring unreadable cache file {file}: {msg}".format(file=self.path, msg=msg))
+        _logger.debug("Loaded {cnt} entries from cache {file}".format(cnt=len(self._entries), file=self.path))
+
+    def rollover(self):
+        """Starts a new run using the entries from the previous run held in
+        memory (lets a long running process skip reloading the cache file).
+        """
+        if self._current:
+            self._entries = self._current
+        self._current = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, relPath, rec):
+        """Looks up the cached entry for a file.
+
+        Args:
+          relPath (str): Path of file relative to the repository directory.
+          rec (rpm2json.scan.FileRecord): Current size, modification time
+            and inode of the file.
+
+        Returns:
+          :obj:`tuple`: (hit, entry) where hit is True if the file is
+          unchanged since it was cached and entry is the cached entry (None
+          if the file was not a valid RPM).
+        """
+        cached = self._entries.get(relPath)
+        if cached != None and cached["st"] == _statKey(rec):
+            self.hits += 1
+            self._current[relPath] = cached
+            return (True, cached["entry"])
+        self.misses += 1
+        return (False, None)
+
+    def store(self, relPath, rec, entry):
+        """Adds (or replaces) the entry for a file.
+
+        Args:
+          relPath (str): Path of file relative to the repository directory.
+          rec (rpm2json.scan.FileRecord): Size, modification time and inode
+            of the file when read.
+          entry ({}): Entry built from the RPM header (None if the file was
+            not a valid RPM).
+        """
+        self._current[relPath] = {"st": _statKey(rec), "entry": entry}
+
+    def save(self):
+        """Writes the entries used during this run back to the cache file."""
+        tmpFile = self.path + ".tmp"
+        with open(tmpFile, "w") as f:
+            json.dump({"format": _CACHE_FORMAT, "fields": self.fields, "entries": self._current}, f)
+        os.replace(tmpFile, self.path)
+        _logger.debug("Saved {cnt} entries to cache {file}".format(cnt=len(self._current), file=self.path))
+
+
+class SharedEntryCache(object):
+    """In memory map of the entries read from each physical file, shared by
+    the runs of a batch (see rpm2json.batch).
+
+    Entries are keyed on the device, inode, size and modification time of
+    the file, so an RPM hardlinked into several repositories (or several
+    directories of one repository) has its header read only once. The
+    entries handed out carry the relative path they were looked up with.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self._entries = {}
+
+    def lookup(self, relPath, rec, fields):
+        """Looks up the entry already read from the same physical file.
+
+        Args:
+          relPath (str): Path of file relative to the repository directory.
+          rec (rpm2json.scan.FileRecord): Stat information of the file.
+          fields ([str]): Information fields the entry must hold.
+
+        Returns:
+          :obj:`tuple`: (hit, entry) where hit is True if the file was
+          already read and entry is a copy of its entry for relPath (None
+          if the file was not a valid RPM).
+        """
+        key = (tuple(fields), rec.dev, rec.ino, rec.size, rec.mtime)
+        if key not in self._entries:
+            return (False, None)
+        self.hits += 1
+        entry = self._entries[key]
+        if entry != None and entry["f"] != relPath:
+            entry = dict(entry)
+            entry["f"] = relPath
+            entry["index"] = dict(entry["index"])
+            entry["index"]["f"] = relPath
+        return (True, entry)
+
+    def store(self, rec, fields, entry):
+        """Records the entry read from a file.
+
+        Args:
+          rec (rpm2json.scan.FileRecord): Stat information of the file when
+            read.
+          fields ([str]): Information fields the entry holds.
+          entry ({}): Entry built from the RPM header (None if the file was
+            not a valid RPM).
+        """
+        self._entries[(tuple(fields), rec.dev, rec.ino, rec.size, rec.mtime)] = entry
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Compact columnar encoding of the file lists.
+
+By default the information file of each RPM holds the ``fileNames``,
+``fileModes`` and ``fileSizes`` arrays with the full path of every file.
+The columnar encoding replaces them with a single ``files`` object that
+mirrors the way RPM itself stores file names (each directory is stored
+once) and delta encodes the integer arrays that change little from one
+file to the next::
+
+    "files": {
+      "dirNames": ["/usr/share/", "/usr/share/foo/", "/usr/share/foo/class/"],
+      "baseNames": ["foo", "class", "Foo.class"],
+      "dirIndexes": [0, 1, 1],
+      "modes": [16877, 0, 16311],
+      "sizes": [0, 0, 726]
+    }
+
+- ``dirIndexes`` and ``modes`` are delta encoded: each value is the
+  difference from the previous one (the first one from 0).
+- The name of file i is ``dirNames[dirIndex] + baseNames[i]`` where
+  dirIndex is the sum of the first i + 1 dirIndexes.
+- ``sizes`` are stored as they are.
+
+Decoding in JavaScript::
+
+    function decodeFiles(files) {
+      var names = [], modes = [], dirIndex = 0, mode = 0;
+      for (var i = 0; i < files.baseNames.length; i++) {
+        dirIndex += files.dirIndexes[i];
+        mode += files.modes[i];
+        names.push(files.dirNames[dirIndex] + files.baseNames[i]);
+        modes.push(mode);
+      }
+      return { fileNames: names, fileModes: modes, fileSizes: files.sizes };
+    }
+
+decodeFiles() does the same in Python.
+"""
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+#: File list encodings accepted by rpm2json.rpmList().
+FILE_ENCODINGS = ("expanded", "columnar")
+
+
+def deltaEncode(values):
+    """Returns the differences between consecutive values (the first
+    value is kept as it is)."""
+    result = []
+    prev = 0
+    for v in values:
+        result.append(v - prev)
+        prev = v
+    return result
+
+
+def deltaDecode(deltas):
+    """Reverses deltaEncode()."""
+    result = []
+    value = 0
+    for d in deltas:
+        value += d
+        result.append(value)
+    return result
+
+
+def encodeFiles(info):
+    """Replaces the file arrays of an information record with the columnar
+    ``files`` object.
+
+    Args:
+      info ({}): Information record (not modified).
+
+    Returns:
+      :{}: New information record (the record itself if it has no
+      fileNames).
+    """
+    if "fileNames" not in info:
+        return info
+    info = dict(info)
+    dirs = { }
+    dirNames = []
+    baseNames = []
+    dirIndexes = []
+    for name in info.pop("fileNames") or ():
+        (dirName, sep, baseName) = name.rpartition("/")
+        dirName += sep
+        index = dirs.get(dirName)
+        if index == None:
+            index = len(dirNames)
+            dirs[dirName] = index
+            dirNames.append(dirName)
+        baseNames.append(baseName)
+        dirIndexes.append(index)
+    files = { "dirNames": dirNames, "baseNames": baseNames, "dirIndexes": deltaEncode(dirIndexes) }
+    if "fileModes" in info:
+        files["modes"] = deltaEncode(info.pop("fileModes") or ())
+    if "fileSizes" in info:
+        files["sizes"] = info.pop("fileSizes") or []
+    info["files"] = files
+    return info
+
+
+def decodeFiles(info):
+    """Restores the fileNames, fileModes and fileSizes arrays of an
+    information record written with the columnar encoding.
+
+    Args:
+      info ({}): Information record (not modified).
+
+    Returns:
+      :{}: Information record as it would have been written without the
+      columnar encoding.
+    """
+    if "files" not in info:
+        return info
+    info = dict(info)
+    files = info.pop("files")
+    dirNames = files["dirNames"]
+    info["fileNames"] = [dirNames[d] + b for d, b in zip(deltaDecode(files["dirIndexes"]), files["baseNames"])]
+    if "modes" in files:
+        info["fileModes"] = deltaDecode(files["modes"])
+    if "sizes" in files:
+        info["fileSizes"] = files["sizes"]
+    return info
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Deduplicated storage of change logs and file lists.
+
+Repositories that keep many releases of a package repeat nearly the same
+change log and file list in the information file of every release. In
+dedup mode those arrays are cut into chunks that are stored once, in
+content addressed ``<jsonDir>/blobs/<xx>/<hash>.json`` files, and the
+information record lists the chunks instead::
+
+    "blobs": {"changeLog": [{...}, "3f0c...", "9a61..."], "files": ["b7d2..."]}
+
+Each blob is a JSON object holding a slice of every array of the group
+(for example ``{"fileNames": [...], "fileSizes": [...], "fileModes":
+[...]}``); concatenating the slices of the listed blobs in order gives the
+original arrays back (see expandInfo()). The newest change log entries
+(up to the first chunk boundary) are different for every release so that
+slice is kept in the record (an object in place of a blob hash).
+
+Chunk boundaries are content defined: a chunk ends after any element
+whose key (the file name or change log entry) hashes to a multiple of
+CHUNK_SPREAD. Adding change log entries or files therefore only changes
+the chunks around the change and the other chunks are shared with the
+other releases.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Name of the directory (under the JSON output directory) holding the blobs.
+BLOB_DIR = "blobs"
+
+#: Average number of elements in each chunk.
+CHUNK_SPREAD = 16
+
+#: Arrays stored in blobs: group name, key array (which sets the chunk
+#: boundaries), the arrays (in parallel with the key array) in the group and
+#: whether the first chunk is kept in the record.
+BLOB_GROUPS = (
+    ("changeLog", "changeLogText", ("changeLogTime", "changeLogName", "changeLogText"), True),
+    ("files", "fileNames", ("fileNames", "fileSizes", "fileModes", "fileDigests", "fileFlags",
+                            "fileGroupNames", "fileLinkTos", "fileMTimes", "fileUserNames"), False),
+)
+
+# Length of the hex digest naming each blob
+_HASH_LENGTH = 32
+
+
+def _chunkEnds(keys):
+    """Returns the index after the last element of each chunk."""
+    ends = []
+    for i, key in enumerate(keys):
+        digest = hashlib.sha1(str(key).encode("utf-8", "surrogateescape")).digest()
+        if int.from_bytes(digest[:4], "big") % CHUNK_SPREAD == 0:
+            ends.append(i + 1)
+    if not ends or ends[-1] != len(keys):
+        ends.append(len(keys))
+    return ends
+
+
+def blobPath(blobDir, blobHash):
+    """Returns the path of a blob file."""
+    return os.path.join(blobDir, blobHash[:2], blobHash + ".json")
+
+
+class BlobStore(object):
+    """Moves change logs and file lists out of information records into
+    shared blobs."""
+
+    def __init__(self, blobDir, writer, encoder):
+        """
+        Args:
+          blobDir (str): Directory to write the blobs to.
+          writer (rpm2json.output.OutputWriter): Writes the blob files.
+          encoder (rpm2json.serialize.JsonEncoder): Encoder for the blobs.
+        """
+        self.blobDir = blobDir
+        self.writer = writer
+        self.encoder = encoder
+        #: Number of chunks referenced.
+        self.chunks = 0
+        self._stored = set()
+        self._dirs = set()
+
+    @property
+    def blobs(self):
+        """Number of distinct blobs stored."""
+        return len(self._stored)
+
+    def dedup(self, info):
+        """Replaces the change log and file arrays of an information record
+        with references to blobs (writing any blobs not yet stored).
+
+        Args:
+          info ({}): Information record (not modified).
+
+        Returns:
+          :{}: New information record.
+        """
+        info = dict(info)
+        refs = { }
+        for group, keyField, fields, inlineHead in BLOB_GROUPS:
+            keys = info.get(keyField)
+            if not keys:
+                # Nothing to share, empty arrays stay in the record
+                continue
+            present = [f for f in fields if f in info]
+            arrays = [info.pop(f) or [] for f in present]
+            chunks = []
+            start = 0
+            for end in _chunkEnds(keys):
+                chunk = dict((f, a[start:end]) for f, a in zip(present, arrays))
+                chunks.append(chunk if inlineHead and start == 0 else self._store(chunk))
+                start = end
+            refs[group] = chunks
+        if refs:
+            info["blobs"] = refs
+        return info
+
+    def _store(self, chunk):
+        text = json.dumps(chunk, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        blobHash = hashlib.sha256(text.encode("utf-8", "surrogateescape")).hexdigest()[:_HASH_LENGTH]
+        self.chunks += 1
+        if blobHash not in self._stored:
+            self._stored.add(blobHash)
+            path = blobPath(self.blobDir, blobHash)
+            shardDir = os.path.dirname(path)
+            if shardDir not in self._dirs:
+                os.makedirs(shardDir, exist_ok=True)
+                self._dirs.add(shardDir)
+            self.writer.writeOnce(path, self.encoder.dumps(chunk))
+        return blobHash
+
+
+def expandInfo(info, loadBlob):
+    """Restores the arrays of an information record written in dedup mode.
+
+    Args:
+      info ({}): Information record with a "blobs" field.
+      loadBlob (callable): Called with a blob hash, returns the decoded
+        blob (for example by reading blobPath(blobDir, hash)).
+
+    Returns:
+      :{}: Information record as it would have been written without dedup.
+    """
+    info = dict(info)
+    refs = info.pop("blobs", None) or { }
+    for group, keyField, fields, inlineHead in BLOB_GROUPS:
+        if group not in refs:
+            continue
+        arrays = { }
+        for ref in refs[group]:
+            chunk = ref if isinstance(ref, dict) else loadBlob(ref)
+            for f, values in chunk.items():
+                arrays.setdefault(f, []).extend(values)
+        for f in fields:
+            if f in arrays:
+                info[f] = arrays[f]
+    return info
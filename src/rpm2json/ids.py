@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Assignment of the ids used to name the information file of each RPM.
+
+The original scheme numbers the packages from 100000 in sort order, so
+adding a package shifts the id (and information file) of every package
+sorted after it. The other schemes derive the id from the package itself
+so a package keeps its id (and URL) from one run to the next:
+
+- ``sequential``: 100000, 100001, ... in sort order (the default).
+- ``nevra``: hash of the name, epoch, version, release, architecture and
+  source flag of the package.
+- ``digest``: the SHA256 digest of the RPM header (the same package
+  rebuilt gets a new id), falling back to the NEVRA hash for RPMs whose
+  header has no digest.
+
+Derived ids are the first ID_LENGTH hex digits of the hash. Packages that
+end up with the same id (normally copies of the same RPM under different
+paths) are ordered by path, the first keeps the id and the others get an
+id derived from their path as well.
+"""
+
+import hashlib
+import logging
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Id schemes accepted by assignIds().
+ID_SCHEMES = ("sequential", "nevra", "digest")
+
+#: Id of the first package in the sequential scheme.
+FIRST_ID = 100000
+
+#: Number of hex digits in derived ids.
+ID_LENGTH = 16
+
+
+def nevraIdentity(index):
+    """Builds the string identifying a package from its rpmlist.json fields.
+
+    Args:
+      index ({}): Index fields of the package (see rpm2json._indexFields()).
+
+    Returns:
+      str: name-epoch:version-release.arch (with ".src" appended for
+      source RPMs as their arch is the build architecture).
+    """
+    identity = "{name}-{e}:{v}-{r}.{arch}".format(name=index["name"], e=index["e"] or 0, v=index["v"],
+                                                  r=index["r"], arch=index["arch"])
+    if index["src"]:
+        identity += ".src"
+    return identity
+
+
+def _hashId(*parts):
+    return hashlib.sha256("\0".join(parts).encode("utf-8", "surrogateescape")).hexdigest()[:ID_LENGTH]
+
+
+def _baseId(entry, scheme):
+    if scheme == "digest":
+        digest = entry.get("digest")
+        if digest:
+            return digest[:ID_LENGTH]
+        _logger.debug("No header digest in {file}, using its NEVRA for the id".format(file=entry["f"]))
+    return _hashId(nevraIdentity(entry["index"]))
+
+
+def assignIds(entries, scheme="sequential"):
+    """Assigns an id to each package.
+
+    Args:
+      entries ([{}]): Sorted entries (each holding at least the relative
+        path "f", the index fields "index" and, for the digest scheme, the
+        header digest "digest").
+      scheme (str): One of ID_SCHEMES (None for "sequential").
+
+    Returns:
+      :[]: Id for each entry (int for the sequential scheme, str otherwise).
+    """
+    if scheme == None or scheme == "sequential":
+        return list(range(FIRST_ID, FIRST_ID + len(entries)))
+    if scheme not in ID_SCHEMES:
+        raise ValueError("Unknown id scheme: {name}".format(name=scheme))
+
+    ids = [_baseId(entry, scheme) for entry in entries]
+    byId = { }
+    for i, id in enumerate(ids):
+        byId.setdefault(id, []).append(i)
+    taken = set(ids)
+    for id, slots in byId.items():
+        if len(slots) == 1:
+            continue
+        slots.sort(key=lambda i: entries[i]["f"])
+        _logger.debug("{cnt} packages share id {id} ({files})".format(
+            cnt=len(slots), id=id, files=", ".join(entries[i]["f"] for i in slots)))
+        for i in slots[1:]:
+            newId = _hashId(id, entries[i]["f"])
+            # Only possible for a truncated hash collision, keep it unique
+            n = 1
+            while newId in taken:
+                newId = _hashId(id, entries[i]["f"], str(n))
+                n += 1
+            taken.add(newId)
+            ids[i] = newId
+    return ids
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Layouts controlling where the per RPM information JSON is written.
+
+- ``flat``: one ``info/<id>.json`` file per RPM (the original layout).
+- ``sharded``: one file per RPM in 256 hash prefix subdirectories
+  (``info/<xx>/<id>.json``) so no single directory gets huge.
+- ``bundled``: the information for many RPMs is packed into each
+  ``info/bundle-<n>.ndjson`` file (one JSON document per line) and an
+  offset map (``info/bundles.json``) records where each RPM lives.
+
+For the sharded and bundled layouts the rpmlist.json records get a "p"
+field with the path of the file (relative to the info directory) and, for
+bundles, the byte offset ("o") and length ("l") of the RPM's JSON.
+
+Any of the layouts can also write precompressed ``.gz`` (and ``.br`` if
+the brotli module is installed) siblings that web servers can serve
+directly. The files are written through a rpm2json.output.OutputWriter
+(atomic renames, unchanged files are not rewritten).
+"""
+
+import hashlib
+import logging
+import os
+
+# The file writing helpers used to live here and are still importable from here
+from rpm2json.output import OutputWriter
+from rpm2json.serialize import TEXT_ERRORS, JsonEncoder, encodeText
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Names of the available layouts.
+LAYOUTS = ("flat", "sharded", "bundled")
+
+
+class FlatLayout(object):
+    """Writes each RPM's information to ``<infoDir>/<id>.json``."""
+
+    def __init__(self, infoDir, writer=None, encoder=None):
+        """
+        Args:
+          infoDir (str): Directory to write information files to.
+          writer (rpm2json.output.OutputWriter): Writes the files (defaults
+            to a writer skipping unchanged files).
+          encoder (rpm2json.serialize.JsonEncoder): Encoder for any JSON the
+            layout writes itself (defaults to the standard library encoder).
+        """
+        self.infoDir = infoDir
+        self.writer = writer or OutputWriter()
+        self.encoder = encoder or JsonEncoder()
+
+    def relPath(self, id):
+        """Path (relative to the info directory) of the file for an id."""
+        return "{id}.json".format(id=id)
+
+    def pointer(self, id):
+        """Fields to add to the rpmlist.json record to locate the file."""
+        return { }
+
+    def _fullPath(self, id):
+        return os.path.join(self.infoDir, self.relPath(id))
+
+    def write(self, id, text):
+        """Writes the information JSON for a RPM.
+
+        Args:
+          id (int): Id assigned to the RPM.
+          text (str): JSON text to write.
+
+        Returns:
+          :{}: Fields to add to the rpmlist.json record for the RPM.
+        """
+        self._writeFile(self._fullPath(id), text)
+        return self.pointer(id)
+
+    def _writeFile(self, ofile, text):
+        self.writer.write(ofile, text)
+
+    def writeStaged(self, id, staged, tail):
+        """Writes the information JSON for a RPM from a staging file.
+
+        Args:
+          id (int): Id assigned to the RPM.
+          staged (str): Staging file holding the start of the JSON text
+            (the file is consumed).
+          tail (str): Text to append to the staged text.
+
+        Returns:
+          :{}: Fields to add to the rpmlist.json record for the RPM.
+        """
+        with open(staged, "a", encoding="utf-8", errors=TEXT_ERRORS) as f:
+            f.write(tail)
+        self.writer.commit(staged, self._fullPath(id))
+        return self.pointer(id)
+
+    def close(self):
+        """Writes any pending data once all RPMs have been written."""
+        pass
+
+
+class ShardedLayout(FlatLayout):
+    """Writes each RPM's information to ``<infoDir>/<xx>/<id>.json`` where
+    xx is taken from a hash of the id (256 subdirectories)."""
+
+    def __init__(self, infoDir, writer=None, encoder=None):
+        FlatLayout.__init__(self, infoDir, writer, encoder)
+        self._dirs = set()
+
+    def relPath(self, id):
+        shard = hashlib.md5(str(id).encode()).hexdigest()[:2]
+        return "{shard}/{id}.json".format(shard=shard, id=id)
+
+    def pointer(self, id):
+        return { "p": self.relPath(id) }
+
+    def _fullPath(self, id):
+        path = os.path.join(self.infoDir, self.relPath(id))
+        shardDir = os.path.dirname(path)
+        if shardDir not in self._dirs:
+            os.makedirs(shardDir, exist_ok=True)
+            self._dirs.add(shardDir)
+        return path
+
+
+class BundledLayout(FlatLayout):
+    """Packs the information for up to bundleSize RPMs into each
+    ``<infoDir>/bundle-<n>.ndjson`` file and writes an offset map to
+    ``<infoDir>/bundles.json``."""
+
+    def __init__(self, infoDir, writer=None, bundleSize=1000, encoder=None):
+        FlatLayout.__init__(self, infoDir, writer, encoder)
+        self.bundleSize = max(1, bundleSize)
+        self.bundleCnt = 0
+        self._parts = []
+        self._offset = 0
+        self._offsets = { }
+
+    def _bundleName(self, n):
+        return "bundle-{n:06d}.ndjson".format(n=n)
+
+    def relPath(self, id):
+        return self._bundleName(self.bundleCnt)
+
+    def write(self, id, text):
+        data = encodeText(text) + b"\n"
+        name = self._bundleName(self.bundleCnt)
+        pointer = { "p": name, "o": self._offset, "l": len(data) - 1 }
+        self._offsets[str(id)] = [name, self._offset, len(data) - 1]
+        self._parts.append(data)
+        self._offset += len(data)
+        if len(self._parts) >= self.bundleSize:
+            self._flush()
+        return pointer
+
+    def writeStaged(self, id, staged, tail):
+        with open(staged, "r", encoding="utf-8") as f:
+            text = f.read() + tail
+        os.remove(staged)
+        return self.write(id, text)
+
+    def _flush(self):
+        if not self._parts:
+            return
+        ofile = os.path.join(self.infoDir, self._bundleName(self.bundleCnt))
+        _logger.debug("Writing JSON bundle file {file}".format(file=ofile))
+        self._writeFile(ofile, b"".join(self._parts))
+        self.bundleCnt += 1
+        self._parts = []
+        self._offset = 0
+
+    def close(self):
+        self._flush()
+        offsetMap = { "bundleSize": self.bundleSize, "bundles": self.bundleCnt, "offsets": self._offsets }
+        self._writeFile(os.path.join(self.infoDir, "bundles.json"), self.encoder.dumps(offsetMap))
+
+
+def createLayout(name, infoDir, writer=None, bundleSize=1000, encoder=None):
+    """Creates the object used to write the information JSON for each RPM.
+
+    Args:
+      name (str): Layout name (one of LAYOUTS, None for "flat").
+      infoDir (str): Directory to write information files to.
+      writer (rpm2json.output.OutputWriter): Writes the files (controls
+        skipping unchanged files and compressed siblings).
+      bundleSize (int): Number of RPMs per bundle for the bundled layout.
+      encoder (rpm2json.serialize.JsonEncoder): Encoder for the JSON files
+        the layout writes itself.
+
+    Returns:
+      FlatLayout: Layout object.
+    """
+    if name == None or name == "flat":
+        return FlatLayout(infoDir, writer, encoder)
+    if name == "sharded":
+        return ShardedLayout(infoDir, writer, encoder)
+    if name == "bundled":
+        return BundledLayout(infoDir, writer, bundleSize, encoder)
+    raise ValueError("Unknown output layout: {name}".format(name=name))
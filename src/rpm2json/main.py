@@ -12,12 +12,24 @@ inside your current environment.
 
 import argparse
 import os
-import rpm
+import signal
 import sys
+import threading
 import logging
 
 from rpm2json import __version__
-from rpm2json import rpmList
+from rpm2json import FIELD_PRESETS, READERS, resolveFields
+from rpm2json.columnar import FILE_ENCODINGS
+from rpm2json.ids import ID_SCHEMES
+from rpm2json import rpmList, rpmNdjson
+from rpm2json.batch import loadBatchConfig, runBatch
+from rpm2json.layout import LAYOUTS
+from rpm2json.output import COMPRESSIONS
+from rpm2json.pages import DEFAULT_PAGE_SIZE
+from rpm2json.search import SEARCH_INDEXES, checkIndexFields, resolveIndexes
+from rpm2json.serialize import ENCODERS, TEXT_ERRORS
+from rpm2json.stats import STATS_FORMATS, formatStats, writeStats
+from rpm2json.watch import watch
 
 __author__ = "Paul Blankenbaker"
 __copyright__ = "Paul Blankenbaker"
@@ -25,6 +37,10 @@ __license__ = "mit"
 
 _logger = logging.getLogger(__name__)
 
+# Options that only affect the JSON files (not --format ndjson)
+_JSON_DIR_OPTIONS = ("incremental", "cache", "stream", "layout", "compress", "bundle_size", "compact", "ids",
+                     "page_size", "search", "sqlite", "file_encoding", "dedup", "fsync")
+
 def parse_args(args):
     """Parse command line parameters
 
@@ -42,11 +58,171 @@ def parse_args(args):
         version="rpm2json {ver}".format(ver=__version__))
     parser.add_argument(
         "--dir",
-        required=True,
         help="Directory where the RPM repository lives")
+    parser.add_argument(
+        "--batch",
+        metavar="CONFIG",
+        help="Process all of the repositories listed in the JSON file CONFIG with one shared "
+             "worker pool (see rpm2json.batch, the other options apply to every repository)")
     parser.add_argument(
         "--outdir",
         help="If you want the JSON files written to a different directory")
+    parser.add_argument(
+        "--format",
+        choices=("json", "ndjson"),
+        default="json",
+        help="Generate the JSON files under OUTDIR (json) or write the information of each RPM "
+             "as one line of JSON to --output (ndjson) (default: json)")
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="File written by --format ndjson, - for stdout (default: -)")
+    parser.add_argument(
+        "--sorted",
+        action="store_true",
+        help="With --format ndjson, write the RPMs in rpmlist.json order instead of as they are "
+             "read (with --jobs, as each worker finishes a small batch of files)")
+    parser.add_argument(
+        "--from-repodata",
+        action="store_true",
+        help="Take the package information from DIR/repodata (createrepo_c metadata) instead of "
+             "reading every RPM (fields the repodata lacks are still read from the RPM headers)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse information cached by the previous run for unchanged RPM files")
+    parser.add_argument(
+        "--cache",
+        help="Cache file used by --incremental (defaults to OUTDIR/.rpm2json-cache.json)")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to read RPM headers (0 for one per CPU)")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write RPM information out as it is read to keep memory use low on huge repositories")
+    parser.add_argument(
+        "--reader",
+        choices=READERS,
+        help="How RPM headers are read: rpm bindings or native (pure Python) reader")
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="Only consider files (relative to DIR) matching the pattern (may be repeated)")
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip files (relative to DIR) matching the pattern (may be repeated)")
+    parser.add_argument(
+        "--scan-threads",
+        type=int,
+        default=8,
+        help="Number of directories scanned concurrently when searching DIR")
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS,
+        default="flat",
+        help="Arrangement of the per RPM JSON files under OUTDIR/info")
+    parser.add_argument(
+        "--compress",
+        action="append",
+        choices=COMPRESSIONS,
+        help="Also write precompressed copies of the JSON files (may be repeated)")
+    parser.add_argument(
+        "--bundle-size",
+        type=int,
+        default=1000,
+        help="Number of RPMs per file with --layout bundled")
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON without optional whitespace (uses orjson or ujson if installed)")
+    parser.add_argument(
+        "--json-encoder",
+        choices=ENCODERS,
+        default="auto",
+        help="JSON encoder to use (orjson and ujson require --compact)")
+    parser.add_argument(
+        "--fields",
+        metavar="FIELDS",
+        help="Information written for each RPM: a preset ({presets}) or a comma separated "
+             "list of fields and presets (default: default)".format(presets=", ".join(sorted(FIELD_PRESETS))))
+    parser.add_argument(
+        "--ids",
+        choices=ID_SCHEMES,
+        default="sequential",
+        help="How the id naming each RPM's information file is chosen: numbered in sort order "
+             "(sequential) or derived from the package NEVRA or header digest so it does not "
+             "change between runs (default: sequential)")
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also split rpmlist.json into pages of N records, by first letter and by arch "
+             "shards and a manifest under OUTDIR/index (default: 0, disabled; {size} is a "
+             "reasonable size)".format(size=DEFAULT_PAGE_SIZE))
+    parser.add_argument(
+        "--search",
+        nargs="?",
+        const="all",
+        metavar="INDEXES",
+        help="Also write search indexes under OUTDIR/search, all of them or a comma separated "
+             "list of: {names}".format(names=", ".join(SEARCH_INDEXES)))
+    parser.add_argument(
+        "--sqlite",
+        metavar="FILE",
+        help="Also store the packages in the SQLite database FILE (updated incrementally if it exists)")
+    parser.add_argument(
+        "--file-encoding",
+        choices=FILE_ENCODINGS,
+        default="expanded",
+        help="How the file list of each RPM is written: full path, mode and size arrays "
+             "(expanded) or directory/base names with delta encoded integers (columnar, "
+             "see rpm2json.columnar for the decoder) (default: expanded)")
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store change logs and file lists once in shared blobs under OUTDIR/blobs that the "
+             "information files refer to (saves space when many releases are kept)")
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Sync the output files to disk (in one batch at the end of each run) before "
+             "renaming them into place")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and update the JSON files as RPMs are added, changed or removed")
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="With --watch, wait until there have been no changes for SECONDS before updating")
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="With --watch, detect changes by rescanning instead of using inotify")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=5.0,
+        metavar="SECONDS",
+        help="Seconds between rescans when polling for changes")
+    parser.add_argument(
+        "--stats",
+        choices=STATS_FORMATS,
+        help="Report timings and counts for the run in this format")
+    parser.add_argument(
+        "--stats-file",
+        metavar="FILE",
+        help="Write the --stats report to FILE (replaced atomically) instead of stdout")
     parser.add_argument(
         "-v",
         "--verbose",
@@ -61,17 +237,44 @@ def parse_args(args):
         help="set loglevel to DEBUG",
         action="store_const",
         const=logging.DEBUG)
-    return parser.parse_args(args)
+    args = parser.parse_args(args)
+    if (args.dir == None) == (args.batch == None):
+        parser.error("either --dir or --batch is required")
+    if args.batch != None and (args.outdir != None or args.watch or args.stats_file != None):
+        parser.error("--outdir, --watch and --stats-file can not be used with --batch")
+    if args.from_repodata and args.dir != None and \
+            not os.path.isfile(os.path.join(args.dir, "repodata", "repomd.xml")):
+        parser.error("{dir} has no repodata/repomd.xml".format(dir=args.dir))
+    if args.search:
+        try:
+            checkIndexFields(resolveIndexes(args.search), resolveFields(args.fields))
+        except ValueError as msg:
+            parser.error(str(msg))
+    if args.file_encoding == "columnar" and args.dedup:
+        parser.error("--file-encoding columnar can not be used with --dedup")
+    if args.format == "ndjson":
+        if args.batch != None or args.watch or args.outdir != None:
+            parser.error("--batch, --watch and --outdir can not be used with --format ndjson")
+        ignored = [name for name in _JSON_DIR_OPTIONS if getattr(args, name) != parser.get_default(name)]
+        if ignored:
+            parser.error("{options} can not be used with --format ndjson".format(
+                options=", ".join("--" + name.replace("_", "-") for name in ignored)))
+        if args.output == None:
+            args.output = "-"
+    elif args.output != None or args.sorted:
+        parser.error("--output and --sorted require --format ndjson")
+    return args
 
 
-def setup_logging(loglevel):
+def setup_logging(loglevel, stream=sys.stdout):
     """Setup basic logging
 
     Args:
       loglevel (int): minimum loglevel for emitting messages
+      stream: stream the messages are written to
     """
     logformat = "[%(asctime)s] %(levelname)s:%(name)s:%(message)s"
-    logging.basicConfig(level=loglevel, stream=sys.stdout,
+    logging.basicConfig(level=loglevel, stream=stream,
                         format=logformat, datefmt="%Y-%m-%d %H:%M:%S")
 
 
@@ -82,14 +285,60 @@ def main(args):
       args ([str]): command line parameter list
     """
     args = parse_args(args)
-    setup_logging(args.loglevel)
+    # Keep stdout clean when the records are written to it
+    report = sys.stderr if args.output == "-" else sys.stdout
+    setup_logging(args.loglevel, report)
     #_logger.debug("Starting crazy calculations...")
-    if (args.dir != None):
+    if (args.dir != None or args.batch != None):
         #rpm.addMacro('_dpath', args.dir)
+        options = dict(cacheFile=args.cache, jobs=args.jobs, stream=args.stream,
+                       reader=args.reader, include=args.include, exclude=args.exclude,
+                       scanThreads=args.scan_threads, layout=args.layout,
+                       compress=args.compress, bundleSize=args.bundle_size,
+                       compact=args.compact, encoder=args.json_encoder, fields=args.fields,
+                       ids=args.ids, fsync=args.fsync, pageSize=args.page_size,
+                       search=args.search, sqlite=args.sqlite,
+                       dedup=args.dedup, fileEncoding=args.file_encoding,
+                       fromRepodata=args.from_repodata)
+
+        def reportStats(stats):
+            if args.stats != None:
+                if args.stats_file != None:
+                    writeStats(stats, args.stats, args.stats_file)
+                else:
+                    report.write(formatStats(stats, args.stats))
+                    report.flush()
+
+        if args.batch != None:
+            (defaults, repos) = loadBatchConfig(args.batch)
+            options["incremental"] = args.incremental
+            options.update(defaults)
+            runBatch(repos, onRun=lambda repo, stats: reportStats(stats), **options)
+            return
+
+        if args.format == "ndjson":
+            ndjsonOptions = dict((k, options[k]) for k in ("jobs", "reader", "include", "exclude", "scanThreads",
+                                                          "encoder", "fields", "fromRepodata"))
+            if args.output == "-":
+                reportStats(rpmNdjson(args.dir, sys.stdout, sort=args.sorted, **ndjsonOptions))
+            else:
+                with open(args.output, "w", encoding="utf-8", errors=TEXT_ERRORS) as out:
+                    reportStats(rpmNdjson(args.dir, out, sort=args.sorted, **ndjsonOptions))
+            return
+
         outdir = args.outdir
         if outdir == None:
             outdir = os.path.join(args.dir, "json")
-        rpmList(args.dir, outdir)
+        if args.watch:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+            try:
+                watch(args.dir, outdir, debounce=args.debounce, poll=args.poll,
+                      pollInterval=args.poll_interval, stop=stop, onRun=reportStats, **options)
+            except KeyboardInterrupt:
+                pass
+        else:
+            reportStats(rpmList(args.dir, outdir, incremental=args.incremental, **options))
 
 
 def run():
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Writing of the output files.
+
+Every file is written under a temporary name (``<file>.tmp``) and renamed
+into place so a web client fetching files during a run sees either the
+old or the new content, never a truncated file. Files whose content has
+not changed are left alone (the size is compared first and the content
+only if the sizes match) so their modification times stay put and rsync
+quick checks and HTTP caches keep working.
+
+An OutputWriter also remembers every file that belongs to the current
+run so files left behind by packages that have since been removed can be
+deleted afterwards, and can make the output durable with fsync. Rather
+than syncing each file as it is written (which stalls large runs) the
+renames are held back until close(), the temporary files are synced
+together, renamed into place in the order they were written and each
+directory is synced once.
+"""
+
+import concurrent.futures
+import filecmp
+import gzip
+import logging
+import os
+import shutil
+
+from rpm2json.serialize import encodeText
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#: Precompressed sibling formats that can be requested.
+COMPRESSIONS = ("gz", "br")
+
+# Extensions of the files an OutputWriter may remove as orphans
+_OUTPUT_EXTENSIONS = (".json", ".ndjson")
+
+# Number of files synced concurrently by OutputWriter.close()
+_FSYNC_THREADS = 8
+
+
+def _compressGz(data):
+    # Fixed mtime so unchanged content produces identical files
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compressBr(data):
+    return brotli.compress(data)
+
+
+def _compressFileGz(src, dst):
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=fout, mtime=0) as gz:
+            shutil.copyfileobj(fin, gz)
+
+
+def _compressFileBr(src, dst):
+    compressor = brotli.Compressor()
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        for chunk in iter(lambda: fin.read(1 << 20), b""):
+            fout.write(compressor.process(chunk))
+        fout.write(compressor.finish())
+
+
+_COMPRESSORS = {
+    "gz": _compressGz,
+    "br": _compressBr,
+}
+
+_FILE_COMPRESSORS = {
+    "gz": _compressFileGz,
+    "br": _compressFileBr,
+}
+
+
+def checkCompress(compress):
+    """Validates a list of requested compressed sibling formats.
+
+    Args:
+      compress ([str]): Formats from COMPRESSIONS (may be None).
+
+    Returns:
+      :[str]: The validated list.
+
+    Raises:
+      ValueError: If a format is unknown or its module is not installed.
+    """
+    compress = list(compress or [])
+    for c in compress:
+        if c not in _COMPRESSORS:
+            raise ValueError("Unknown compression format: {fmt}".format(fmt=c))
+        if c == "br" and brotli == None:
+            raise ValueError("The brotli module is required for .br output")
+    return compress
+
+
+def _sameContent(ofile, data):
+    try:
+        if os.path.getsize(ofile) != len(data):
+            return False
+        with open(ofile, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def _sameFile(tmpFile, ofile):
+    try:
+        # Compares the sizes before reading any content
+        return filecmp.cmp(tmpFile, ofile, shallow=False)
+    except OSError:
+        return False
+
+
+def _fsyncFile(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class OutputWriter(object):
+    """Writes output files atomically, skipping unchanged files."""
+
+    def __init__(self, skipUnchanged=True, compress=(), fsync=False):
+        """
+        Args:
+          skipUnchanged (bool): Leave files that already hold the exact same
+            content (and have all requested compressed siblings) untouched.
+          compress ([str]): Compressed sibling formats (see COMPRESSIONS) to
+            write next to each file (for example ``ofile + ".gz"``).
+          fsync (bool): Make the output durable when close() is called.
+        """
+        self.skipUnchanged = skipUnchanged
+        self.compress = checkCompress(compress)
+        self.fsync = fsync
+        #: Number of files written (not counting compressed siblings).
+        self.written = 0
+        #: Number of files left untouched as their content was unchanged.
+        self.skipped = 0
+        #: Number of bytes written (not counting compressed siblings).
+        self.bytesWritten = 0
+        #: Number of orphaned files removed by removeOrphans().
+        self.removed = 0
+        self._outputs = set()
+        self._pending = []
+
+    def _claim(self, ofile):
+        self._outputs.add(os.path.abspath(ofile))
+        for c in self.compress:
+            self._outputs.add(os.path.abspath(ofile + "." + c))
+
+    def _haveSiblings(self, ofile):
+        return all(os.path.isfile(ofile + "." + c) for c in self.compress)
+
+    def _install(self, tmpFile, ofile):
+        if self.fsync:
+            self._pending.append((tmpFile, ofile))
+        else:
+            os.replace(tmpFile, ofile)
+
+    def write(self, ofile, data):
+        """Writes a file (and any compressed siblings).
+
+        Args:
+          ofile (str): Path to file to write.
+          data (bytes): Content to write (str is encoded as UTF-8, see
+            rpm2json.serialize.encodeText()).
+
+        Returns:
+          True if the file was written, False if skipped.
+        """
+        if not isinstance(data, bytes):
+            data = encodeText(data)
+        self._claim(ofile)
+        if self.skipUnchanged and _sameContent(ofile, data) and self._haveSiblings(ofile):
+            self.skipped += 1
+            return False
+        # Compressed siblings first so they are never older than the file
+        for c in self.compress:
+            self._writeTmp(ofile + "." + c, _COMPRESSORS[c](data))
+        self._writeTmp(ofile, data)
+        self.written += 1
+        self.bytesWritten += len(data)
+        return True
+
+    def writeOnce(self, ofile, data):
+        """Writes a content addressed file (one whose name is derived from
+        its content) unless it already exists, in which case it must hold
+        the same content so it is not compared.
+
+        Returns:
+          True if the file was written, False if it already existed.
+        """
+        if self.skipUnchanged and os.path.isfile(ofile) and self._haveSiblings(ofile):
+            self._claim(ofile)
+            self.skipped += 1
+            return False
+        return self.write(ofile, data)
+
+    def _writeTmp(self, ofile, data):
+        tmpFile = ofile + ".tmp"
+        with open(tmpFile, "wb") as f:
+            f.write(data)
+        self._install(tmpFile, ofile)
+
+    def commit(self, tmpFile, ofile):
+        """Moves a completely written temporary file into place (the
+        streaming counterpart of write() for output too large to build in
+        memory).
+
+        Args:
+          tmpFile (str): File holding the new content (consumed, must be on
+            the same file system as ofile).
+          ofile (str): Path of the file to replace.
+
+        Returns:
+          True if the file was written, False if skipped.
+        """
+        self._claim(ofile)
+        # Compressed copies no longer requested would serve stale content
+        for c in COMPRESSIONS:
+            if c not in self.compress and os.path.isfile(ofile + "." + c):
+                os.remove(ofile + "." + c)
+        if self.skipUnchanged and _sameFile(tmpFile, ofile) and self._haveSiblings(ofile):
+            os.remove(tmpFile)
+            self.skipped += 1
+            return False
+        for c in self.compress:
+            _FILE_COMPRESSORS[c](tmpFile, ofile + "." + c + ".tmp")
+            self._install(ofile + "." + c + ".tmp", ofile + "." + c)
+        self.bytesWritten += os.path.getsize(tmpFile)
+        self._install(tmpFile, ofile)
+        self.written += 1
+        return True
+
+    def close(self):
+        """Completes any held back renames (only used with fsync)."""
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        _logger.debug("Syncing {cnt} output files".format(cnt=len(pending)))
+        with concurrent.futures.ThreadPoolExecutor(_FSYNC_THREADS) as executor:
+            list(executor.map(_fsyncFile, [tmpFile for tmpFile, ofile in pending]))
+        dirs = set()
+        for tmpFile, ofile in pending:
+            os.replace(tmpFile, ofile)
+            dirs.add(os.path.dirname(os.path.abspath(ofile)))
+        for d in sorted(dirs):
+            _fsyncFile(d)
+
+    def removeOrphans(self, topdir):
+        """Removes output files under a directory that were not produced by
+        this writer (left behind by RPMs that are gone, an earlier layout or
+        compression setting, or an interrupted run).
+
+        Only ``.json`` and ``.ndjson`` files (with any compressed or
+        temporary suffix) are considered and directories left empty are
+        removed.
+
+        Args:
+          topdir (str): Directory to clean up (normally the info directory).
+
+        Returns:
+          int: Number of files removed.
+        """
+        topdir = os.path.abspath(topdir)
+        removed = 0
+        for dirPath, dirNames, fileNames in os.walk(topdir, topdown=False):
+            for name in fileNames:
+                path = os.path.join(dirPath, name)
+                if path in self._outputs or not self._isOutputName(name):
+                    continue
+                _logger.debug("Removing orphaned file {file}".format(file=path))
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as msg:
+                    _logger.warning("Unable to remove {file}: {msg}".format(file=path, msg=msg))
+            if dirPath != topdir:
+                try:
+                    os.rmdir(dirPath)
+                except OSError:
+                    pass
+        self.removed += removed
+        return removed
+
+    def _isOutputName(self, name):
+        if name.endswith(".tmp"):
+            name = name[:-4]
+        for c in COMPRESSIONS:
+            if name.endswith("." + c):
+                name = name[:-len(c) - 1]
+                break
+        return name.endswith(_OUTPUT_EXTENSIONS)
+
+
+def writeFile(ofile, text, skipUnchanged=False, compress=()):
+    """Writes text to a file (and any requested compressed siblings) by
+    writing a temporary file and renaming it into place.
+
+    Args:
+      ofile (str): Path to file to write.
+      text (str): Content to write (str or bytes).
+      skipUnchanged (bool): If True and the file already holds the exact
+        same content, it is left untouched (as are its compressed siblings
+        if they exist).
+      compress ([str]): Compressed sibling formats (see COMPRESSIONS) to
+        write next to the file (for example ``ofile + ".gz"``).
+
+    Returns:
+      True if the file was written, False if skipped.
+    """
+    return OutputWriter(skipUnchanged, compress).write(ofile, text)
+
+
+def commitFile(tmpFile, ofile, skipUnchanged=False, compress=()):
+    """Moves a completely written temporary file into place (see
+    OutputWriter.commit()).
+
+    Args:
+      tmpFile (str): Temporary file holding the new content (consumed).
+      ofile (str): Path of the file to replace.
+      skipUnchanged (bool): If True and ofile already holds the exact same
+        content, it is left untouched (as are its compressed siblings if
+        they exist).
+      compress ([str]): Compressed sibling formats (see COMPRESSIONS) to
+        write next to the file.
+
+    Returns:
+      True if the file was written, False if skipped.
+    """
+    return OutputWriter(skipUnchanged, compress).commit(tmpFile, ofile)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Paginated copies of rpmlist.json so a browser only fetches what it shows.
+
+The records of rpmlist.json (in the same order) are split into files
+under ``<jsonDir>/index``:
+
+- ``page-<n>.json``: fixed size pages of pageSize records.
+- ``letter/<c>.json``: records of the packages whose name starts with c
+  (lower case letter or digit, ``_`` for anything else).
+- ``arch/<arch>.json``: records by architecture (``src`` for source RPMs
+  as their arch is the one they were built on).
+- ``manifest.json``: the number of records, the pages (with the first
+  and last name on each so the page holding a name can be found) and the
+  letter and arch shards along with the number of records and an ETag
+  (a digest of the content) for each file and for rpmlist.json itself.
+
+rpmlist.json is still written so existing clients keep working.
+"""
+
+import hashlib
+import logging
+import os
+import re
+
+from rpm2json.serialize import JsonArrayWriter
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Default number of records on each index page.
+DEFAULT_PAGE_SIZE = 500
+
+#: Name of the directory (under the JSON output directory) holding the pages.
+INDEX_DIR = "index"
+
+# Characters that can not appear in a shard file name
+_UNSAFE_KEY = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def fileEtag(path):
+    """Returns the ETag of a file (the first 16 hex digits of its SHA256)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def letterKey(name):
+    """Returns the letter shard a package name belongs to."""
+    c = name[:1].lower()
+    if c.isascii() and c.isalnum():
+        return c
+    return "_"
+
+
+def archKey(record):
+    """Returns the arch shard an index record belongs to.
+
+    The arch comes from the package header and is used as a file name, so
+    characters outside [A-Za-z0-9_.-] are mapped to "_" and a bare "." or
+    ".." (or no arch at all) goes in the "_" shard.
+    """
+    if record["src"]:
+        return "src"
+    arch = _UNSAFE_KEY.sub("_", record["arch"] or "")
+    if arch in ("", ".", ".."):
+        return "_"
+    return arch
+
+
+class _Shard(object):
+    """One index file being written."""
+
+    def __init__(self, indexDir, relPath, encoder):
+        self.relPath = relPath
+        self.ofile = os.path.join(indexDir, relPath)
+        self.out = JsonArrayWriter(self.ofile + ".tmp", encoder)
+        self.first = None
+        self.last = None
+
+    def append(self, record):
+        if self.first == None:
+            self.first = record["name"]
+        self.last = record["name"]
+        self.out.append(record)
+
+    def commit(self, writer):
+        """Finishes the file and hands it to the writer.
+
+        Returns:
+          :{}: Manifest entry for the file.
+        """
+        self.out.close()
+        entry = { "file": self.relPath, "count": self.out.count, "etag": fileEtag(self.out.path) }
+        writer.commit(self.out.path, self.ofile)
+        return entry
+
+
+class IndexPager(object):
+    """Writes the paginated index as the rpmlist.json records are produced."""
+
+    def __init__(self, indexDir, writer, encoder, pageSize=DEFAULT_PAGE_SIZE):
+        """
+        Args:
+          indexDir (str): Directory to write the index files to.
+          writer (rpm2json.output.OutputWriter): Writes the files.
+          encoder (rpm2json.serialize.JsonEncoder): Encoder for the records.
+          pageSize (int): Number of records on each page.
+        """
+        self.indexDir = indexDir
+        self.writer = writer
+        self.encoder = encoder
+        self.pageSize = max(1, pageSize)
+        self.count = 0
+        for d in ("letter", "arch"):
+            os.makedirs(os.path.join(indexDir, d), exist_ok=True)
+        self._page = None
+        self._pages = []
+        self._letters = { }
+        self._arches = { }
+
+    def append(self, record):
+        """Adds the next rpmlist.json record (in rpmlist.json order)."""
+        if self._page == None:
+            self._page = _Shard(self.indexDir, "page-{n:06d}.json".format(n=len(self._pages)), self.encoder)
+        self._page.append(record)
+        if self._page.out.count >= self.pageSize:
+            self._finishPage()
+        self._shard(self._letters, "letter", letterKey(record["name"])).append(record)
+        self._shard(self._arches, "arch", archKey(record)).append(record)
+        self.count += 1
+
+    def _shard(self, shards, kind, key):
+        shard = shards.get(key)
+        if shard == None:
+            shard = _Shard(self.indexDir, "{kind}/{key}.json".format(kind=kind, key=key), self.encoder)
+            shards[key] = shard
+        return shard
+
+    def _finishPage(self):
+        page = self._page
+        entry = page.commit(self.writer)
+        entry["first"] = page.first
+        entry["last"] = page.last
+        self._pages.append(entry)
+        self._page = None
+
+    def close(self, rpmlistEtag):
+        """Writes the remaining files and the manifest.
+
+        Args:
+          rpmlistEtag (str): ETag of the rpmlist.json written along with
+            the pages.
+
+        Returns:
+          :{}: The manifest.
+        """
+        if self._page != None:
+            self._finishPage()
+        manifest = {
+            "count": self.count,
+            "pageSize": self.pageSize,
+            "rpmlist": { "file": "../rpmlist.json", "count": self.count, "etag": rpmlistEtag },
+            "pages": self._pages,
+            "letters": dict((k, self._letters[k].commit(self.writer)) for k in sorted(self._letters)),
+            "arches": dict((k, self._arches[k].commit(self.writer)) for k in sorted(self._arches)),
+        }
+        _logger.debug("Writing index manifest for {pages} pages, {letters} letters and {arches} arches".format(
+            pages=len(self._pages), letters=len(self._letters), arches=len(self._arches)))
+        self.writer.write(os.path.join(self.indexDir, "manifest.json"), self.encoder.dumps(manifest))
+        return manifest
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Reads the package information from a repository's repodata (as produced by
+createrepo_c) instead of from every RPM file.
+
+``repodata/repomd.xml`` gives the location of the ``primary``,
+``filelists`` and ``other`` metadata files (gzip, bzip2, xz or, if the
+zstandard module is installed, zstd compressed). They are parsed
+incrementally, one package at a time, and matched up on the package
+checksum. Only the files holding selected fields are read.
+
+Repodata provides the fields in REPODATA_FIELDS. Any other selected
+field (scripts, triggers, file modes and sizes, dependency flags and
+versions, or requires, which createrepo_c filters) is read from the RPM
+headers, but only that field. Source packages are always read from their
+headers because repodata records their arch as "src". The header digest
+is not in the repodata, so the digest id scheme also needs the headers.
+"""
+
+import bz2
+import gzip
+import logging
+import lzma
+import os
+import xml.etree.ElementTree as ElementTree
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#: Information fields (see rpm2json.FIELD_PRESETS) that repodata provides.
+REPODATA_FIELDS = ("arch", "archiveSize", "buildHost", "buildTime", "changeLogName", "changeLogText",
+                   "changeLogTime", "conflicts", "description", "epochNum", "fileNames", "group",
+                   "installTime", "license", "longSize", "name", "obsoletes", "packager", "provides",
+                   "release", "size", "sourceRpm", "summary", "url", "vendor", "version")
+
+_REPO_NS = "{http://linux.duke.edu/metadata/repo}"
+_COMMON_NS = "{http://linux.duke.edu/metadata/common}"
+_RPM_NS = "{http://linux.duke.edu/metadata/rpm}"
+_FILELISTS_NS = "{http://linux.duke.edu/metadata/filelists}"
+_OTHER_NS = "{http://linux.duke.edu/metadata/other}"
+
+# Fields that come from the filelists and other metadata files
+_FILELISTS_FIELDS = ("fileNames",)
+_OTHER_FIELDS = ("changeLogName", "changeLogText", "changeLogTime")
+
+
+def findMetadata(topdir):
+    """Lists the metadata files of a repository.
+
+    Args:
+      topdir (str): Repository directory (holding repodata/repomd.xml).
+
+    Returns:
+      :{}: Path of each metadata file keyed by type ("primary",
+      "filelists", "other", ...).
+
+    Raises:
+      OSError: If repomd.xml can not be read.
+      ValueError: If there is no repomd.xml or it does not list the primary
+        metadata.
+    """
+    repomd = os.path.join(topdir, "repodata", "repomd.xml")
+    if not os.path.isfile(repomd):
+        raise ValueError("{dir} has no repodata/repomd.xml".format(dir=topdir))
+    files = { }
+    for data in ElementTree.parse(repomd).getroot().iter(_REPO_NS + "data"):
+        location = data.find(_REPO_NS + "location")
+        if location != None and location.get("href"):
+            files[data.get("type")] = os.path.join(topdir, location.get("href"))
+    if "primary" not in files:
+        raise ValueError("{file} does not list the primary metadata".format(file=repomd))
+    return files
+
+
+def _openMetadata(path):
+    """Opens a (possibly compressed) metadata file for binary reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".xz"):
+        return lzma.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard == None:
+            raise ValueError("The zstandard module is required to read {file}".format(file=path))
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def _iterPackages(path, tag):
+    """Parses a metadata file incrementally.
+
+    Yields:
+      Each <package> element (cleared once the next one is requested so
+      memory use does not grow with the size of the file).
+    """
+    with _openMetadata(path) as f:
+        root = None
+        for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if root == None:
+                    root = elem
+                continue
+            if elem.tag == tag:
+                yield elem
+                root.clear()
+
+
+def _text(elem, tag):
+    """Returns the text of a child element (None if missing or empty, as
+    rpm returns for tags a header does not have)."""
+    child = elem.find(tag)
+    if child == None or not child.text:
+        return None
+    return child.text
+
+
+def _int(elem, attr):
+    if elem == None or elem.get(attr) == None:
+        return None
+    return int(elem.get(attr))
+
+
+def _entryNames(fmt, tag):
+    deps = fmt.find(_RPM_NS + tag) if fmt != None else None
+    if deps == None:
+        return []
+    return [e.get("name") for e in deps.iter(_RPM_NS + "entry")]
+
+
+def _primaryValues(pkg):
+    """Extracts the values held by a primary <package> element.
+
+    Returns:
+      :obj:`tuple`: (pkgid, location, values) where values maps field names
+      to values.
+    """
+    version = pkg.find(_COMMON_NS + "version")
+    times = pkg.find(_COMMON_NS + "time")
+    sizes = pkg.find(_COMMON_NS + "size")
+    fmt = pkg.find(_COMMON_NS + "format")
+    location = pkg.find(_COMMON_NS + "location")
+    values = {
+        "name": _text(pkg, _COMMON_NS + "name"),
+        "arch": _text(pkg, _COMMON_NS + "arch"),
+        "epochNum": _int(version, "epoch") or 0,
+        "version": version.get("ver"),
+        "release": version.get("rel"),
+        "summary": _text(pkg, _COMMON_NS + "summary"),
+        "description": _text(pkg, _COMMON_NS + "description"),
+        "packager": _text(pkg, _COMMON_NS + "packager"),
+        "url": _text(pkg, _COMMON_NS + "url"),
+        "buildTime": _int(times, "build"),
+        "size": _int(sizes, "installed"),
+        "longSize": _int(sizes, "installed"),
+        "archiveSize": _int(sizes, "archive"),
+        # Only set once a package is installed
+        "installTime": None,
+        "conflicts": _entryNames(fmt, "conflicts"),
+        "obsoletes": _entryNames(fmt, "obsoletes"),
+        "provides": _entryNames(fmt, "provides"),
+    }
+    if fmt != None:
+        values["license"] = _text(fmt, _RPM_NS + "license")
+        values["vendor"] = _text(fmt, _RPM_NS + "vendor")
+        values["group"] = _text(fmt, _RPM_NS + "group")
+        values["buildHost"] = _text(fmt, _RPM_NS + "buildhost")
+        values["sourceRpm"] = _text(fmt, _RPM_NS + "sourcerpm")
+    pkgid = _text(pkg, _COMMON_NS + "checksum")
+    return (pkgid, location.get("href"), values)
+
+
+def _filelistValues(pkg):
+    return (pkg.get("pkgid"), { "fileNames": [f.text for f in pkg.iter(_FILELISTS_NS + "file")] })
+
+
+def _otherValues(pkg):
+    changes = list(pkg.iter(_OTHER_NS + "changelog"))
+    # Listed oldest first, headers hold the newest first
+    changes.reverse()
+    return (pkg.get("pkgid"), {
+        "changeLogName": [c.get("author") for c in changes],
+        "changeLogText": [c.text or "" for c in changes],
+        "changeLogTime": [int(c.get("date")) for c in changes],
+    })
+
+
+def _matchPackages(values, pkgid):
+    """Finds the values for a package in a metadata file listing the
+    packages in the same order as the primary metadata (anything out of
+    order is held until its package comes up)."""
+    (it, held) = values
+    found = held.pop(pkgid, None)
+    while found == None:
+        item = next(it, None)
+        if item == None:
+            return { }
+        if item[0] == pkgid:
+            found = item[1]
+        else:
+            held[item[0]] = item[1]
+    return found
+
+
+class RepodataSource(object):
+    """Produces the entries of the packages listed in a repository's
+    repodata."""
+
+    def __init__(self, topdir, fields):
+        """
+        Args:
+          topdir (str): Repository directory (holding repodata/repomd.xml).
+          fields ([str]): Information fields to produce (see
+            rpm2json.resolveFields()).
+
+        Raises:
+          OSError: If repomd.xml can not be read.
+          ValueError: If there is no repomd.xml or it does not list the
+            metadata needed.
+        """
+        self.topdir = topdir
+        self.fields = tuple(fields)
+        #: Selected fields that have to be read from the RPM headers.
+        self.missing = tuple(f for f in self.fields if f not in REPODATA_FIELDS)
+        metadata = findMetadata(topdir)
+        #: Metadata files read.
+        self.files = [metadata["primary"]]
+        self._others = []
+        for kind, kindFields, tag, extract in (("filelists", _FILELISTS_FIELDS, _FILELISTS_NS, _filelistValues),
+                                               ("other", _OTHER_FIELDS, _OTHER_NS, _otherValues)):
+            if any(f in self.fields for f in kindFields):
+                if kind not in metadata:
+                    raise ValueError("The repodata under {dir} has no {kind} metadata".format(dir=topdir, kind=kind))
+                self.files.append(metadata[kind])
+                self._others.append((metadata[kind], tag + "package", extract))
+
+    @property
+    def bytesRead(self):
+        """Size of the (compressed) metadata files read."""
+        return sum(os.path.getsize(f) for f in self.files)
+
+    def entries(self):
+        """Parses the metadata.
+
+        Yields:
+          Entry for each package (see rpm2json._createEntry()) whose
+          information holds the selected fields repodata provides and whose
+          "digest" is None.
+        """
+        others = [(map(extract, _iterPackages(path, tag)), { }) for path, tag, extract in self._others]
+        for pkg in _iterPackages(self.files[0], _COMMON_NS + "package"):
+            (pkgid, relPath, values) = _primaryValues(pkg)
+            for other in others:
+                values.update(_matchPackages(other, pkgid))
+            info = dict((f, values.get(f)) for f in self.fields if f in REPODATA_FIELDS)
+            src = (values.get("sourceRpm") == None)
+            info["src"] = src
+            index = {
+                "name": values["name"],
+                "e": values["epochNum"],
+                "v": values["version"],
+                "r": values["release"],
+                "arch": values["arch"],
+                "src": src,
+                "buildTime": values["buildTime"],
+                "f": relPath
+            }
+            # Same order as rpm2json._getSortKey(), source packages first
+            key = [values["name"], 0 if src else 1, values["epochNum"], values["version"], values["release"]]
+            yield { "f": relPath, "key": key, "index": index, "info": info, "digest": None }
+
+    def headerFields(self, entry, digest=False):
+        """Returns the fields that have to be read from the header of a
+        package.
+
+        Args:
+          entry ({}): Entry produced by entries().
+          digest (bool): True if the header digest is needed.
+
+        Returns:
+          :(str): Fields to read (all of them for source packages whose
+          arch is only in the header), None if the header is not needed.
+        """
+        if entry["index"]["src"]:
+            return self.fields
+        if self.missing or digest:
+            return self.missing
+        return None
+
+    def merge(self, entry, headerEntry):
+        """Completes an entry with the fields read from the package header.
+
+        Args:
+          entry ({}): Entry produced by entries().
+          headerEntry ({}): Entry read from the header with the fields
+            returned by headerFields().
+
+        Returns:
+          :{}: Entry as it would have been read from the header alone.
+        """
+        if entry["index"]["src"]:
+            return headerEntry
+        info = dict((f, headerEntry["info"][f] if f in self.missing else entry["info"][f]) for f in self.fields)
+        info["src"] = entry["info"]["src"]
+        merged = dict(entry)
+        merged["info"] = info
+        merged["digest"] = headerEntry.get("digest")
+        return merged
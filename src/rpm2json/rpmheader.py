@@ -0,0 +1,640 @@
+# -*- coding: utf-8 -*-
+"""
+Pure Python reader for the header portion of RPM package files.
+
+Only the lead, the signature header and the main header of a package are
+parsed (the files are memory mapped so the compressed payload is never
+read). The :class:`Header` objects returned mimic the subset of the
+``rpm.hdr`` API used by :func:`rpm2json.createRpmInfo` (``h[rpm.RPMTAG_*]``
+and ``h.sprintf()`` of the signature query) and the module provides the
+``RPMTAG_*`` constants and a :class:`TransactionSet` so it can stand in
+for the ``rpm`` bindings on hosts where they are not installed.
+"""
+
+import mmap
+import os
+import struct
+import time
+
+from rpm2json.vercmp import labelCompare
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+#: Magic bytes found at the start of every RPM package (the lead).
+LEAD_MAGIC = b"\xed\xab\xee\xdb"
+#: Magic bytes found at the start of the signature and main headers.
+HEADER_MAGIC = b"\x8e\xad\xe8\x01"
+
+_LEAD_SIZE = 96
+_INTRO_SIZE = 16
+_ENTRY_SIZE = 16
+
+RPM_NULL_TYPE = 0
+RPM_CHAR_TYPE = 1
+RPM_INT8_TYPE = 2
+RPM_INT16_TYPE = 3
+RPM_INT32_TYPE = 4
+RPM_INT64_TYPE = 5
+RPM_STRING_TYPE = 6
+RPM_BIN_TYPE = 7
+RPM_STRING_ARRAY_TYPE = 8
+RPM_I18NSTRING_TYPE = 9
+
+RPMTAG_SIGSIZE = 257
+RPMTAG_SIGPGP = 259
+RPMTAG_SIGMD5 = 261
+RPMTAG_SIGGPG = 262
+RPMTAG_PUBKEYS = 266
+RPMTAG_DSAHEADER = 267
+RPMTAG_RSAHEADER = 268
+RPMTAG_SHA1HEADER = 269
+RPMTAG_LONGSIGSIZE = 270
+RPMTAG_LONGARCHIVESIZE = 271
+RPMTAG_SHA256HEADER = 273
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_SUMMARY = 1004
+RPMTAG_DESCRIPTION = 1005
+RPMTAG_BUILDTIME = 1006
+RPMTAG_BUILDHOST = 1007
+RPMTAG_INSTALLTIME = 1008
+RPMTAG_SIZE = 1009
+RPMTAG_DISTRIBUTION = 1010
+RPMTAG_VENDOR = 1011
+RPMTAG_LICENSE = 1014
+RPMTAG_PACKAGER = 1015
+RPMTAG_GROUP = 1016
+RPMTAG_URL = 1020
+RPMTAG_OS = 1021
+RPMTAG_ARCH = 1022
+RPMTAG_PREIN = 1023
+RPMTAG_POSTIN = 1024
+RPMTAG_PREUN = 1025
+RPMTAG_POSTUN = 1026
+RPMTAG_OLDFILENAMES = 1027
+RPMTAG_FILESIZES = 1028
+RPMTAG_FILESTATES = 1029
+RPMTAG_FILEMODES = 1030
+RPMTAG_FILERDEVS = 1033
+RPMTAG_FILEMTIMES = 1034
+RPMTAG_FILEDIGESTS = 1035
+RPMTAG_FILELINKTOS = 1036
+RPMTAG_FILEFLAGS = 1037
+RPMTAG_FILEUSERNAME = 1039
+RPMTAG_FILEGROUPNAME = 1040
+RPMTAG_SOURCERPM = 1044
+RPMTAG_FILEVERIFYFLAGS = 1045
+RPMTAG_ARCHIVESIZE = 1046
+RPMTAG_PROVIDENAME = 1047
+RPMTAG_PROVIDES = RPMTAG_PROVIDENAME
+RPMTAG_REQUIREFLAGS = 1048
+RPMTAG_REQUIRENAME = 1049
+RPMTAG_REQUIRES = RPMTAG_REQUIRENAME
+RPMTAG_REQUIREVERSION = 1050
+RPMTAG_CONFLICTFLAGS = 1053
+RPMTAG_CONFLICTNAME = 1054
+RPMTAG_CONFLICTS = RPMTAG_CONFLICTNAME
+RPMTAG_CONFLICTVERSION = 1055
+RPMTAG_RPMVERSION = 1064
+RPMTAG_TRIGGERSCRIPTS = 1065
+RPMTAG_TRIGGERNAME = 1066
+RPMTAG_TRIGGERVERSION = 1067
+RPMTAG_TRIGGERFLAGS = 1068
+RPMTAG_TRIGGERINDEX = 1069
+RPMTAG_VERIFYSCRIPT = 1079
+RPMTAG_CHANGELOGTIME = 1080
+RPMTAG_CHANGELOGNAME = 1081
+RPMTAG_CHANGELOGTEXT = 1082
+RPMTAG_PREINPROG = 1085
+RPMTAG_POSTINPROG = 1086
+RPMTAG_PREUNPROG = 1087
+RPMTAG_POSTUNPROG = 1088
+RPMTAG_OBSOLETENAME = 1090
+RPMTAG_OBSOLETES = RPMTAG_OBSOLETENAME
+RPMTAG_VERIFYSCRIPTPROG = 1091
+RPMTAG_TRIGGERSCRIPTPROG = 1092
+RPMTAG_FILELANGS = 1097
+RPMTAG_PREFIXES = 1098
+RPMTAG_INSTPREFIXES = 1099
+RPMTAG_SOURCEPACKAGE = 1106
+RPMTAG_PROVIDEFLAGS = 1112
+RPMTAG_PROVIDEVERSION = 1113
+RPMTAG_OBSOLETEFLAGS = 1114
+RPMTAG_OBSOLETEVERSION = 1115
+RPMTAG_DIRINDEXES = 1116
+RPMTAG_BASENAMES = 1117
+RPMTAG_DIRNAMES = 1118
+RPMTAG_OPTFLAGS = 1122
+RPMTAG_DISTURL = 1123
+RPMTAG_PAYLOADFORMAT = 1124
+RPMTAG_PAYLOADCOMPRESSOR = 1125
+RPMTAG_PAYLOADFLAGS = 1126
+RPMTAG_PLATFORM = 1132
+RPMTAG_FILECOLORS = 1140
+RPMTAG_PRETRANS = 1151
+RPMTAG_POSTTRANS = 1152
+RPMTAG_PRETRANSPROG = 1153
+RPMTAG_POSTTRANSPROG = 1154
+RPMTAG_DISTTAG = 1155
+RPMTAG_FILENAMES = 5000
+RPMTAG_TRIGGERCONDS = 5005
+RPMTAG_TRIGGERTYPE = 5006
+RPMTAG_LONGFILESIZES = 5008
+RPMTAG_LONGSIZE = 5009
+RPMTAG_FILEDIGESTALGO = 5011
+RPMTAG_BUGURL = 5012
+RPMTAG_EPOCHNUM = 5019
+RPMTAG_TRIGGERSCRIPTFLAGS = 5027
+
+# Signature header tags that librpm copies into the main header (under a
+# different number) when a package is read.
+_SIGTAG_MAP = {
+    1000: RPMTAG_SIGSIZE,
+    1002: RPMTAG_SIGPGP,
+    1004: RPMTAG_SIGMD5,
+    1005: RPMTAG_SIGGPG,
+    1007: RPMTAG_ARCHIVESIZE,
+}
+
+# Tags that the rpm bindings always return as a list (rather than a single
+# value or None) even if the header holds one or no items.
+_ARRAY_TAGS = frozenset((
+    RPMTAG_OLDFILENAMES, RPMTAG_FILEDIGESTS, RPMTAG_FILELINKTOS,
+    RPMTAG_FILEUSERNAME, RPMTAG_FILEGROUPNAME, RPMTAG_FILELANGS,
+    RPMTAG_PROVIDENAME, RPMTAG_PROVIDEVERSION, RPMTAG_REQUIRENAME,
+    RPMTAG_REQUIREVERSION, RPMTAG_CONFLICTNAME, RPMTAG_CONFLICTVERSION,
+    RPMTAG_OBSOLETENAME, RPMTAG_OBSOLETEVERSION, RPMTAG_CHANGELOGNAME,
+    RPMTAG_CHANGELOGTEXT, RPMTAG_TRIGGERSCRIPTS, RPMTAG_TRIGGERNAME,
+    RPMTAG_TRIGGERVERSION, RPMTAG_DIRNAMES, RPMTAG_BASENAMES,
+    RPMTAG_PREFIXES, RPMTAG_INSTPREFIXES,
+    RPMTAG_FILESIZES, RPMTAG_FILESTATES, RPMTAG_FILEMODES, 1031, 1032,
+    RPMTAG_FILERDEVS, RPMTAG_FILEMTIMES, RPMTAG_FILEFLAGS,
+    RPMTAG_FILEVERIFYFLAGS, RPMTAG_REQUIREFLAGS, RPMTAG_CONFLICTFLAGS,
+    RPMTAG_TRIGGERFLAGS, RPMTAG_TRIGGERINDEX, RPMTAG_CHANGELOGTIME, 1095,
+    1096, RPMTAG_PROVIDEFLAGS, RPMTAG_OBSOLETEFLAGS, RPMTAG_DIRINDEXES,
+    RPMTAG_FILECOLORS, RPMTAG_LONGFILESIZES, RPMTAG_TRIGGERSCRIPTFLAGS,
+    RPMTAG_FILENAMES, RPMTAG_TRIGGERCONDS, RPMTAG_TRIGGERTYPE,
+    # Scriptlet interpreters used to be stored as plain strings
+    RPMTAG_PREINPROG, RPMTAG_POSTINPROG, RPMTAG_PREUNPROG,
+    RPMTAG_POSTUNPROG, RPMTAG_PRETRANSPROG, RPMTAG_POSTTRANSPROG,
+    RPMTAG_VERIFYSCRIPTPROG, RPMTAG_TRIGGERSCRIPTPROG,
+))
+
+_INT_FORMATS = {
+    RPM_CHAR_TYPE: ("B", 1),
+    RPM_INT8_TYPE: ("B", 1),
+    RPM_INT16_TYPE: ("H", 2),
+    RPM_INT32_TYPE: ("I", 4),
+    RPM_INT64_TYPE: ("Q", 8),
+}
+
+# Trigger flags (RPMSENSE_*) used to compute the TRIGGERTYPE extension
+_TRIGGER_TYPES = (
+    (1 << 25, "prein"),
+    (1 << 16, "in"),
+    (1 << 17, "un"),
+    (1 << 18, "postun"),
+)
+
+# Query used by createRpmInfo() which is the only format sprintf() knows
+SIGINFO_QUERY = '%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{%|SIGGPG?{%{SIGGPG:pgpsig}}:{%|SIGPGP?{%{SIGPGP:pgpsig}}:{(none)}|}|}|}|'
+
+_PUBKEY_ALGOS = {
+    1: "RSA", 2: "RSA(Encrypt-Only)", 3: "RSA(Sign-Only)",
+    16: "Elgamal(Encrypt-Only)", 17: "DSA", 18: "Elliptic Curve",
+    19: "ECDSA", 20: "Elgamal", 21: "Diffie-Hellman (X9.42)", 22: "EdDSA",
+}
+
+_HASH_ALGOS = {
+    1: "MD5", 2: "SHA1", 3: "RIPEMD160", 5: "MD2", 6: "TIGER192",
+    7: "HAVAL-5-160", 8: "SHA256", 9: "SHA384", 10: "SHA512", 11: "SHA224",
+}
+
+
+class RpmHeaderError(Exception):
+    """Raised when a file does not contain a valid RPM header."""
+    pass
+
+
+#: Alias matching the exception type exported by the rpm bindings.
+error = RpmHeaderError
+
+
+class _HeaderBlob(object):
+    """Index and data store of one header structure (signature or main)."""
+
+    def __init__(self, buf, offset):
+        if buf[offset:offset + 4] != HEADER_MAGIC:
+            raise RpmHeaderError("Bad header magic at offset {offset}".format(offset=offset))
+        (indexCnt, storeSize) = struct.unpack_from(">II", buf, offset + 8)
+        indexStart = offset + _INTRO_SIZE
+        storeStart = indexStart + indexCnt * _ENTRY_SIZE
+        self.size = _INTRO_SIZE + indexCnt * _ENTRY_SIZE + storeSize
+        if offset + self.size > len(buf):
+            raise RpmHeaderError("Truncated header at offset {offset}".format(offset=offset))
+        # Copy only the header bytes so the mapping can be closed
+        self.store = bytes(buf[storeStart:storeStart + storeSize])
+        self.entries = {}
+        for i in range(indexCnt):
+            (tag, kind, dataOffset, count) = struct.unpack_from(
+                ">IIiI", buf, indexStart + i * _ENTRY_SIZE)
+            # Check the data lies within the store as the tags are only
+            # decoded when they are accessed
+            end = dataOffset
+            if kind in (RPM_STRING_TYPE, RPM_STRING_ARRAY_TYPE, RPM_I18NSTRING_TYPE):
+                end = dataOffset + 1
+            elif kind in _INT_FORMATS:
+                end = dataOffset + count * _INT_FORMATS[kind][1]
+            elif kind == RPM_BIN_TYPE:
+                end = dataOffset + count
+            if dataOffset < 0 or end > storeSize:
+                raise RpmHeaderError("Tag {tag} data out of range in header at offset {offset}".format(
+                    tag=tag, offset=offset))
+            self.entries[tag] = (kind, dataOffset, count)
+
+    def get(self, tag):
+        """Decodes the raw data for a tag.
+
+        Args:
+          tag (int): Tag to decode.
+
+        Returns:
+          :obj:`tuple`: (type, values) where values is a list (or bytes for
+          binary data), or None if the tag is not present.
+
+        Raises:
+          RpmHeaderError: If a string is not NUL terminated.
+        """
+        entry = self.entries.get(tag)
+        if entry is None:
+            return None
+        (kind, offset, count) = entry
+        store = self.store
+        if kind in _INT_FORMATS:
+            (fmt, size) = _INT_FORMATS[kind]
+            return (kind, list(struct.unpack_from(">{cnt}{fmt}".format(cnt=count, fmt=fmt), store, offset)))
+        if kind == RPM_BIN_TYPE:
+            return (kind, store[offset:offset + count])
+        if kind in (RPM_STRING_TYPE, RPM_STRING_ARRAY_TYPE, RPM_I18NSTRING_TYPE):
+            if kind == RPM_STRING_TYPE:
+                count = 1
+            values = []
+            for i in range(count):
+                end = store.find(b"\0", offset)
+                if end < 0:
+                    raise RpmHeaderError("Unterminated string for tag {tag}".format(tag=tag))
+                values.append(store[offset:end].decode("utf-8", "surrogateescape"))
+                offset = end + 1
+            return (kind, values)
+        return (kind, [])
+
+
+class Header(object):
+    """Read-only RPM header supporting ``h[tag]`` lookups like ``rpm.hdr``.
+
+    Tag values are only decoded when they are accessed.
+    """
+
+    def __init__(self, main, sig=None):
+        self._main = main
+        self._sig = sig
+
+    def _raw(self, tag):
+        val = self._main.get(tag)
+        if val is None and self._sig is not None:
+            for sigTag, hdrTag in _SIGTAG_MAP.items():
+                if hdrTag == tag:
+                    return self._sig.get(sigTag)
+            if 256 < tag < 1000:
+                return self._sig.get(tag)
+        return val
+
+    def _values(self, tag):
+        raw = self._raw(tag)
+        if raw is None:
+            return None
+        return raw[1]
+
+    def __contains__(self, tag):
+        return self[tag] not in (None, [])
+
+    def __getitem__(self, tag):
+        ext = _EXTENSIONS.get(tag)
+        if ext is not None:
+            return ext(self)
+        raw = self._raw(tag)
+        if raw is None:
+            return [] if tag in _ARRAY_TAGS else None
+        (kind, val) = raw
+        if kind == RPM_BIN_TYPE:
+            return val
+        if kind == RPM_STRING_ARRAY_TYPE or tag in _ARRAY_TAGS:
+            return val
+        if len(val) == 0:
+            return None
+        return val[0]
+
+    def sprintf(self, fmt):
+        """Formats header data (only the signature query is supported).
+
+        Args:
+          fmt (str): Query format, must be ``SIGINFO_QUERY``.
+
+        Returns:
+          str: Signature information or "(none)" for unsigned packages.
+        """
+        if fmt != SIGINFO_QUERY:
+            raise RpmHeaderError("Unsupported query format: {fmt}".format(fmt=fmt))
+        for tag in (RPMTAG_DSAHEADER, RPMTAG_RSAHEADER, RPMTAG_SIGGPG, RPMTAG_SIGPGP):
+            sig = self[tag]
+            if sig:
+                return formatPgpSig(sig)
+        return "(none)"
+
+
+def _fileNames(h):
+    baseNames = h._values(RPMTAG_BASENAMES)
+    if baseNames is None:
+        return h._values(RPMTAG_OLDFILENAMES) or []
+    dirNames = h._values(RPMTAG_DIRNAMES)
+    dirIndexes = h._values(RPMTAG_DIRINDEXES)
+    return [dirNames[d] + b for d, b in zip(dirIndexes, baseNames)]
+
+
+def _fileSizes(h):
+    sizes = h._values(RPMTAG_FILESIZES)
+    if sizes is None:
+        sizes = h._values(RPMTAG_LONGFILESIZES) or []
+    return sizes
+
+
+def _longFileSizes(h):
+    sizes = h._values(RPMTAG_LONGFILESIZES)
+    if sizes is None:
+        sizes = h._values(RPMTAG_FILESIZES) or []
+    return sizes
+
+
+def _epochNum(h):
+    epoch = h._values(RPMTAG_EPOCH)
+    return epoch[0] if epoch else 0
+
+
+def _longSize(h):
+    size = h._values(RPMTAG_LONGSIZE)
+    if size is None:
+        size = h._values(RPMTAG_SIZE)
+    return size[0] if size else None
+
+
+def _longArchiveSize(h):
+    size = h._values(RPMTAG_LONGARCHIVESIZE)
+    if size is None:
+        size = h._values(RPMTAG_ARCHIVESIZE)
+    return size[0] if size else None
+
+
+def _depFlags(flags):
+    op = ""
+    if flags & 2:
+        op += "<"
+    if flags & 4:
+        op += ">"
+    if flags & 8:
+        op += "="
+    return op
+
+
+def _triggerConds(h):
+    scripts = h._values(RPMTAG_TRIGGERSCRIPTS) or []
+    names = h._values(RPMTAG_TRIGGERNAME) or []
+    indexes = h._values(RPMTAG_TRIGGERINDEX) or []
+    flags = h._values(RPMTAG_TRIGGERFLAGS) or []
+    versions = h._values(RPMTAG_TRIGGERVERSION) or []
+    conds = []
+    for i in range(len(scripts)):
+        items = []
+        for j in range(len(names)):
+            if indexes[j] == i:
+                items.append("{name} {op} {ver}".format(
+                    name=names[j], op=_depFlags(flags[j]), ver=versions[j]))
+        conds.append(", ".join(items))
+    return conds
+
+
+def _triggerType(h):
+    scripts = h._values(RPMTAG_TRIGGERSCRIPTS) or []
+    indexes = h._values(RPMTAG_TRIGGERINDEX) or []
+    flags = h._values(RPMTAG_TRIGGERFLAGS) or []
+    types = []
+    for i in range(len(scripts)):
+        kind = ""
+        for j in range(len(indexes)):
+            if indexes[j] == i:
+                for mask, name in _TRIGGER_TYPES:
+                    if flags[j] & mask:
+                        kind = name
+                        break
+                break
+        types.append(kind)
+    return types
+
+
+# Tags librpm computes from other tags rather than reading them directly
+_EXTENSIONS = {
+    RPMTAG_FILENAMES: _fileNames,
+    RPMTAG_FILESIZES: _fileSizes,
+    RPMTAG_LONGFILESIZES: _longFileSizes,
+    RPMTAG_EPOCHNUM: _epochNum,
+    RPMTAG_LONGSIZE: _longSize,
+    RPMTAG_LONGARCHIVESIZE: _longArchiveSize,
+    RPMTAG_TRIGGERCONDS: _triggerConds,
+    RPMTAG_TRIGGERTYPE: _triggerType,
+}
+
+
+def _pgpLength(buf, pos):
+    """Decodes a new format OpenPGP (sub)packet length.
+
+    Returns:
+      :obj:`tuple`: (length, position of data following the length)
+    """
+    first = buf[pos]
+    if first < 192:
+        return (first, pos + 1)
+    if first < 224:
+        return (((first - 192) << 8) + buf[pos + 1] + 192, pos + 2)
+    return (struct.unpack_from(">I", buf, pos + 1)[0], pos + 5)
+
+
+def _pgpSubpackets(buf, pos, end, params):
+    while pos < end:
+        (length, pos) = _pgpLength(buf, pos)
+        kind = buf[pos] & 0x7f
+        data = buf[pos + 1:pos + length]
+        if kind == 2 and "time" not in params:
+            params["time"] = struct.unpack(">I", data[:4])[0]
+        elif kind == 16:
+            params["keyid"] = data[:8]
+        elif kind == 33 and "keyid" not in params:
+            params["keyid"] = data[-8:]
+        pos += length
+
+
+def parsePgpSig(pkt):
+    """Extracts the interesting fields from an OpenPGP signature packet.
+
+    Args:
+      pkt (bytes): Signature packet as stored in the RPM signature header.
+
+    Returns:
+      :{}: Dictionary with "version", "pubkeyAlgo", "hashAlgo", "time" and
+      "keyid" entries.
+
+    Raises:
+      RpmHeaderError: If the data is not an OpenPGP signature.
+    """
+    try:
+        tagByte = pkt[0]
+        if not tagByte & 0x80:
+            raise RpmHeaderError("Not an OpenPGP packet")
+        if tagByte & 0x40:
+            tag = tagByte & 0x3f
+            (length, pos) = _pgpLength(pkt, 1)
+        else:
+            tag = (tagByte >> 2) & 0x0f
+            lenSize = {0: 1, 1: 2, 2: 4}.get(tagByte & 0x03, 0)
+            length = int.from_bytes(pkt[1:1 + lenSize], "big") if lenSize else len(pkt) - 1
+            pos = 1 + lenSize
+        if tag != 2:
+            raise RpmHeaderError("Not an OpenPGP signature")
+        body = pkt[pos:pos + length]
+        params = {"version": body[0]}
+        if body[0] == 3:
+            params["time"] = struct.unpack_from(">I", body, 3)[0]
+            params["keyid"] = body[7:15]
+            params["pubkeyAlgo"] = body[15]
+            params["hashAlgo"] = body[16]
+        elif body[0] in (4, 5):
+            params["pubkeyAlgo"] = body[2]
+            params["hashAlgo"] = body[3]
+            hashedLen = struct.unpack_from(">H", body, 4)[0]
+            _pgpSubpackets(body, 6, 6 + hashedLen, params)
+            pos = 6 + hashedLen
+            unhashedLen = struct.unpack_from(">H", body, pos)[0]
+            unhashed = {}
+            _pgpSubpackets(body, pos + 2, pos + 2 + unhashedLen, unhashed)
+            if "keyid" not in params and "keyid" in unhashed:
+                params["keyid"] = unhashed["keyid"]
+        else:
+            raise RpmHeaderError("Unsupported signature version {ver}".format(ver=body[0]))
+    except (IndexError, struct.error):
+        raise RpmHeaderError("Truncated OpenPGP signature")
+    params.setdefault("time", 0)
+    params.setdefault("keyid", b"\0" * 8)
+    return params
+
+
+def formatPgpSig(pkt):
+    """Formats a signature the same way the ``:pgpsig`` query format does.
+
+    Args:
+      pkt (bytes): Signature packet as stored in the RPM signature header.
+
+    Returns:
+      str: Text like "RSA/SHA256, Mon 01 Jan 2020 ..., Key ID 0123456789abcdef".
+    """
+    try:
+        params = parsePgpSig(pkt)
+    except RpmHeaderError:
+        return "(not an OpenPGP signature)"
+    return "{pubkey}/{hash}, {date}, Key ID {keyid}".format(
+        pubkey=_PUBKEY_ALGOS.get(params["pubkeyAlgo"], "Unknown public key algorithm"),
+        hash=_HASH_ALGOS.get(params["hashAlgo"], "Unknown hash algorithm"),
+        date=time.strftime("%c", time.localtime(params["time"])),
+        keyid=params["keyid"].hex())
+
+
+def readHeader(buf):
+    """Parses the headers of an RPM package.
+
+    Args:
+      buf (bytes): Buffer (or memory map) starting with the RPM lead.
+
+    Returns:
+      Header: Header object for the package.
+
+    Raises:
+      RpmHeaderError: If the buffer does not hold a valid RPM package.
+    """
+    return _readHeaders(buf)[0]
+
+
+def _readHeaders(buf):
+    if len(buf) < _LEAD_SIZE + _INTRO_SIZE or buf[0:4] != LEAD_MAGIC:
+        raise RpmHeaderError("Not an RPM package (bad lead)")
+    sig = _HeaderBlob(buf, _LEAD_SIZE)
+    # Signature header is padded to an 8 byte boundary
+    offset = _LEAD_SIZE + sig.size
+    offset += (8 - (sig.size % 8)) % 8
+    main = _HeaderBlob(buf, offset)
+    return (Header(main, sig), offset + main.size)
+
+
+def hdrFromFdno(fd):
+    """Reads the RPM headers from an open file descriptor.
+
+    The file is memory mapped so only the pages holding the lead and
+    headers are ever read from disk. Like rpm, the file offset is left at
+    the start of the payload.
+
+    Args:
+      fd (int): File descriptor opened for reading.
+
+    Returns:
+      Header: Header object for the package.
+
+    Raises:
+      RpmHeaderError: If the file is not an RPM package.
+    """
+    size = os.fstat(fd).st_size
+    if size < _LEAD_SIZE + _INTRO_SIZE:
+        raise RpmHeaderError("File too small to be an RPM package")
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as buf:
+        (h, end) = _readHeaders(buf)
+    os.lseek(fd, end, os.SEEK_SET)
+    return h
+
+
+def versionCompare(ha, hb):
+    """Compares the epoch, version and release of two headers.
+
+    Args:
+      ha (Header): Header "a" in the comparison.
+      hb (Header): Header "b" in the comparison.
+
+    Returns:
+      0 - If equal, -1 if ha < hb, +1 if ha > hb.
+    """
+    return labelCompare(
+        (ha[RPMTAG_EPOCHNUM], ha[RPMTAG_VERSION], ha[RPMTAG_RELEASE]),
+        (hb[RPMTAG_EPOCHNUM], hb[RPMTAG_VERSION], hb[RPMTAG_RELEASE]))
+
+
+class TransactionSet(object):
+    """Minimal stand in for ``rpm.TransactionSet`` (header reading only)."""
+
+    def hdrFromFdno(self, fd):
+        """Reads the RPM headers from an open file descriptor.
+
+        Args:
+          fd (int): File descriptor opened for reading.
+
+        Returns:
+          Header: Header object for the package.
+        """
+        return hdrFromFdno(fd)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Directory scanner used to find the candidate RPM files in a repository.
+
+Directories are read with ``os.scandir`` (so file types come from the
+directory listing) and the subdirectories are scanned concurrently in a
+thread pool. On network file systems, where every ``readdir``/``stat``
+round trip is slow, this keeps many requests in flight instead of one.
+"""
+
+import collections
+import concurrent.futures
+import logging
+import os
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Information about a file found by scanTree(): path relative to the top
+#: directory, full path, size in bytes, modification time in nanoseconds,
+#: inode number and device number.
+FileRecord = collections.namedtuple("FileRecord", ["relPath", "path", "size", "mtime", "ino", "dev"])
+
+
+def _dirIds(dirs):
+    ids = set()
+    for d in dirs:
+        try:
+            st = os.stat(d)
+        except OSError:
+            continue
+        ids.add((st.st_dev, st.st_ino))
+    return ids
+
+
+def _scanDir(path, relDir, skipIds):
+    """Lists a single directory.
+
+    Returns:
+      :obj:`tuple`: (files, subdirs) where files is a list of FileRecord
+      and subdirs is a list of (path, relPath) tuples to scan next.
+    """
+    files = []
+    subdirs = []
+    # Inode numbers are available from the listing without a stat() call
+    skipInodes = set(ino for dev, ino in skipIds)
+    try:
+        it = os.scandir(path)
+    except OSError as msg:
+        _logger.debug("Unable to read directory {dir}: {msg}".format(dir=path, msg=msg))
+        return (files, subdirs)
+    with it:
+        for entry in it:
+            relPath = os.path.join(relDir, entry.name) if relDir else entry.name
+            try:
+                if entry.is_dir():
+                    # Like os.walk(), symbolic links to directories are not followed
+                    if entry.is_symlink():
+                        continue
+                    if entry.inode() in skipInodes:
+                        st = entry.stat(follow_symlinks=False)
+                        if (st.st_dev, st.st_ino) in skipIds:
+                            _logger.debug("Skipping directory {dir}".format(dir=entry.path))
+                            continue
+                    subdirs.append((entry.path, relPath))
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append(FileRecord(relPath, entry.path, st.st_size, st.st_mtime_ns, st.st_ino,
+                                    st.st_dev))
+    return (files, subdirs)
+
+
+def scanTree(topdir, threads=8, skipDirs=()):
+    """Recursively finds all files under a directory.
+
+    Args:
+      topdir (str): Directory to search.
+      threads (int): Number of directories to scan concurrently (the scan
+        is done in the calling thread if 1 or less).
+      skipDirs ([str]): Directories not to descend into (for example the
+        JSON output directory).
+
+    Returns:
+      :[FileRecord]: Records for all files found, sorted by relative path
+      (the same order as sorting the full paths).
+    """
+    skipIds = _dirIds(skipDirs)
+    records = []
+    if threads <= 1:
+        todo = [(topdir, "")]
+        while todo:
+            (path, relDir) = todo.pop()
+            (files, subdirs) = _scanDir(path, relDir, skipIds)
+            records.extend(files)
+            todo.extend(subdirs)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+            pending = set([pool.submit(_scanDir, topdir, "", skipIds)])
+            while pending:
+                (done, pending) = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    (files, subdirs) = future.result()
+                    records.extend(files)
+                    for path, relPath in subdirs:
+                        pending.add(pool.submit(_scanDir, path, relPath, skipIds))
+    records.sort(key=lambda r: r.relPath)
+    _logger.debug("Found {cnt} files under {dir}".format(cnt=len(records), dir=topdir))
+    return records
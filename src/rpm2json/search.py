@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Static inverted indexes a browser can search without fetching every
+information file.
+
+The indexes are written under ``<jsonDir>/search``:
+
+- ``names``: trigrams of the lower cased package names and summaries
+  mapped to the ids of the packages containing them (a search for a
+  string of three or more characters fetches the shards of its trigrams
+  and intersects the id lists).
+- ``provides``: provided capabilities mapped to package ids.
+- ``requires``: required capabilities mapped to package ids.
+- ``files``: file paths mapped to the ids of the packages owning them.
+
+Each index is split into up to 256 ``<index>/<xx>.json`` shards holding a
+JSON object that maps keys to lists of ids (in rpmlist.json order), where
+xx are the first two hex digits of the SHA256 of the UTF-8 encoded key
+(so looking up a provide or file takes a single fetch). The
+``manifest.json`` file lists the shards of each index with their number
+of keys and ETag.
+
+The provides, requires and files indexes can only be built from the
+information fields selected for the run (see rpm2json.FIELD_PRESETS).
+"""
+
+import hashlib
+import logging
+import os
+
+from rpm2json.serialize import encodeText
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Indexes that can be built (see rpm2json.rpmList()).
+SEARCH_INDEXES = ("names", "provides", "requires", "files")
+
+#: Name of the directory (under the JSON output directory) holding the indexes.
+SEARCH_DIR = "search"
+
+#: Number of hex digits of the key digest used to pick a shard.
+SHARD_DIGITS = 2
+
+# Information fields each index (other than names) is built from
+_INDEX_FIELDS = {
+    "provides": "provides",
+    "requires": "requires",
+    "files": "fileNames",
+}
+
+
+def resolveIndexes(indexes):
+    """Converts the indexes requested into a tuple of index names.
+
+    Args:
+      indexes: None (no indexes), "all", a comma separated string or a list
+        of names from SEARCH_INDEXES.
+
+    Returns:
+      :obj:`tuple`: Requested index names in SEARCH_INDEXES order.
+
+    Raises:
+      ValueError: If an index name is unknown.
+    """
+    if not indexes:
+        return ()
+    if isinstance(indexes, str):
+        indexes = indexes.split(",")
+    names = set()
+    for name in indexes:
+        name = name.strip()
+        if name == "all":
+            names.update(SEARCH_INDEXES)
+        elif name in SEARCH_INDEXES:
+            names.add(name)
+        elif name:
+            raise ValueError("Unknown search index: {name}".format(name=name))
+    return tuple(n for n in SEARCH_INDEXES if n in names)
+
+
+def checkIndexFields(indexes, fields):
+    """Checks that the information fields the indexes are built from are
+    selected.
+
+    Args:
+      indexes ([str]): Names of the indexes to build (see SEARCH_INDEXES).
+      fields ([str]): Information field names selected for the run.
+
+    Raises:
+      ValueError: If an index needs a field that is not selected.
+    """
+    missing = [_INDEX_FIELDS[name] for name in indexes
+               if name in _INDEX_FIELDS and _INDEX_FIELDS[name] not in fields]
+    if missing:
+        raise ValueError("The search indexes need the information fields: {fields}".format(
+            fields=", ".join(missing)))
+
+
+def shardKey(key):
+    """Returns the shard a key is stored in."""
+    return hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()[:SHARD_DIGITS]
+
+
+def trigrams(text):
+    """Returns the set of trigrams of a lower cased string."""
+    text = text.lower()
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class SearchIndexBuilder(object):
+    """Collects the keys of each package as entries are read and writes the
+    indexes once the package ids are known."""
+
+    def __init__(self, indexes):
+        """
+        Args:
+          indexes ([str]): Names of the indexes to build (see SEARCH_INDEXES).
+        """
+        self.indexes = tuple(indexes)
+        self._relPaths = []
+        self._postings = dict((name, { }) for name in self.indexes)
+
+    def add(self, entry):
+        """Adds the keys of a package.
+
+        Args:
+          entry ({}): Entry for the package (see rpm2json._createEntry()).
+        """
+        seq = len(self._relPaths)
+        self._relPaths.append(entry["f"])
+        info = entry["info"]
+        for name in self.indexes:
+            if name == "names":
+                keys = trigrams(entry["index"]["name"] or "")
+                keys.update(trigrams(info.get("summary") or ""))
+            else:
+                keys = set(info.get(_INDEX_FIELDS[name]) or ())
+            postings = self._postings[name]
+            for key in keys:
+                ids = postings.get(key)
+                if ids == None:
+                    postings[key] = [seq]
+                else:
+                    ids.append(seq)
+
+    def write(self, searchDir, ids, writer, encoder):
+        """Writes the index shards and manifest.
+
+        Args:
+          searchDir (str): Directory to write the indexes to.
+          ids ([(str, object)]): (relative path, id) of each package in
+            rpmlist.json order.
+          writer (rpm2json.output.OutputWriter): Writes the files.
+          encoder (rpm2json.serialize.JsonEncoder): Encoder for the files.
+
+        Returns:
+          :{}: The manifest.
+        """
+        # Translate the add() order into (rpmlist.json position, id)
+        positions = dict((relPath, (pos, id)) for pos, (relPath, id) in enumerate(ids))
+        seqIds = [positions.get(relPath) for relPath in self._relPaths]
+        manifest = { "hash": "sha256", "shardDigits": SHARD_DIGITS, "indexes": { } }
+        for name in self.indexes:
+            indexDir = os.path.join(searchDir, name)
+            os.makedirs(indexDir, exist_ok=True)
+            shards = { }
+            for key, seqs in self._postings[name].items():
+                shards.setdefault(shardKey(key), { })[key] = [seqIds[s] for s in seqs if seqIds[s] != None]
+            shardInfo = { }
+            for shard in sorted(shards):
+                keys = shards[shard]
+                data = dict((k, [id for pos, id in sorted(keys[k])]) for k in sorted(keys))
+                text = encoder.dumps(data)
+                relPath = "{name}/{shard}.json".format(name=name, shard=shard)
+                writer.write(os.path.join(searchDir, relPath), text)
+                shardInfo[shard] = { "file": relPath, "count": len(data), "etag": _textEtag(text) }
+            _logger.debug("Wrote {keys} keys to {shards} shards of the {name} search index".format(
+                keys=len(self._postings[name]), shards=len(shardInfo), name=name))
+            manifest["indexes"][name] = { "keys": len(self._postings[name]), "shards": shardInfo }
+        writer.write(os.path.join(searchDir, "manifest.json"), encoder.dumps(manifest))
+        return manifest
+
+
+def _textEtag(text):
+    # Same value as rpm2json.pages.fileEtag() of the file written
+    return hashlib.sha256(encodeText(text)).hexdigest()[:16]
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+JSON serialization used for all of the files rpm2json writes.
+
+The standard library encoder is always available and produces the
+original output format (``", "`` and ``": "`` separators, non-ASCII
+characters escaped). When compact output is requested the faster orjson
+or ujson encoders are used if installed; they produce exactly the same
+bytes as the standard library encoder in compact mode.
+"""
+
+import json
+import logging
+import re
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+#: Names of the encoders that can be requested ("auto" picks the fastest
+#: one installed that supports the requested output format).
+ENCODERS = ("auto", "json", "orjson", "ujson")
+
+#: Error handler used when JSON text is written out as UTF-8. Compact output
+#: does not escape non-ASCII characters, so strings holding undecodable
+#: header bytes (lone surrogates) can not be encoded as they are. Inside a
+#: JSON string "backslashreplace" turns them into the same ``\udcXX``
+#: escape the standard encoder writes in its default format.
+TEXT_ERRORS = "backslashreplace"
+
+_NON_ASCII = re.compile("[^\x00-\x7f]")
+
+
+class JsonEncoder(object):
+    """Standard library JSON encoder."""
+
+    name = "json"
+
+    def __init__(self, compact=False):
+        """
+        Args:
+          compact (bool): Omit all optional whitespace (and write non-ASCII
+            characters as UTF-8 instead of escaping them).
+        """
+        self.compact = compact
+        if compact:
+            self.itemSeparator = ","
+            self.keySeparator = ":"
+        else:
+            self.itemSeparator = ", "
+            self.keySeparator = ": "
+        self._encoder = json.JSONEncoder(separators=(self.itemSeparator, self.keySeparator),
+                                         ensure_ascii=not compact)
+
+    def dumps(self, obj):
+        """Serializes an object.
+
+        Args:
+          obj (:obj:): Object to serialize.
+
+        Returns:
+          str: JSON text.
+        """
+        return self._encoder.encode(obj)
+
+
+class OrjsonEncoder(JsonEncoder):
+    """orjson based encoder (compact output only)."""
+
+    name = "orjson"
+
+    def dumps(self, obj):
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            # Strings holding undecodable bytes (lone surrogates) are
+            # rejected by orjson
+            return JsonEncoder.dumps(self, obj)
+
+
+class UjsonEncoder(JsonEncoder):
+    """ujson based encoder (compact output only)."""
+
+    name = "ujson"
+
+    def dumps(self, obj):
+        try:
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+        except (TypeError, UnicodeEncodeError, OverflowError):
+            return JsonEncoder.dumps(self, obj)
+
+
+def createEncoder(name="auto", compact=False):
+    """Creates the JSON encoder used to write the output files.
+
+    Args:
+      name (str): One of ENCODERS (None is the same as "auto").
+      compact (bool): Omit all optional whitespace from the output.
+
+    Returns:
+      JsonEncoder: Encoder object.
+
+    Raises:
+      ValueError: If the encoder is unknown, not installed or can not
+        produce the requested format.
+    """
+    if name == None or name == "auto":
+        if compact and orjson != None:
+            name = "orjson"
+        elif compact and ujson != None:
+            name = "ujson"
+        else:
+            name = "json"
+    if name == "json":
+        return JsonEncoder(compact)
+    if name not in ENCODERS:
+        raise ValueError("Unknown JSON encoder: {name}".format(name=name))
+    if not compact:
+        raise ValueError("The {name} encoder only supports compact output".format(name=name))
+    if name == "orjson":
+        if orjson == None:
+            raise ValueError("The orjson module is not installed")
+        return OrjsonEncoder(compact)
+    if ujson == None:
+        raise ValueError("The ujson module is not installed")
+    return UjsonEncoder(compact)
+
+
+def encodeText(text):
+    """Encodes JSON text as UTF-8 (see TEXT_ERRORS).
+
+    Args:
+      text (str): JSON text.
+
+    Returns:
+      bytes: Encoded text.
+    """
+    return text.encode("utf-8", TEXT_ERRORS)
+
+
+def _escapeChar(match):
+    code = ord(match.group())
+    if code > 0xffff:
+        code -= 0x10000
+        return "\\u{hi:04x}\\u{lo:04x}".format(hi=0xd800 | (code >> 10), lo=0xdc00 | (code & 0x3ff))
+    return "\\u{code:04x}".format(code=code)
+
+
+def escapeNonAscii(text):
+    """Escapes the non-ASCII characters of JSON text (as the standard
+    encoder does in its default format) so it can be written to a stream
+    of any encoding.
+
+    Args:
+      text (str): JSON text (non-ASCII characters only appear in strings).
+
+    Returns:
+      str: ASCII JSON text.
+    """
+    return _NON_ASCII.sub(_escapeChar, text)
+
+
+class JsonArrayWriter(object):
+    """Writes a JSON array to a file one element at a time so the text for
+    the whole array never needs to be held in memory. The file content is
+    identical to ``encoder.dumps(list)``.
+    """
+
+    def __init__(self, path, encoder):
+        """
+        Args:
+          path (str): File to write.
+          encoder (JsonEncoder): Encoder used for each element.
+        """
+        self.path = path
+        self.encoder = encoder
+        self.count = 0
+        self._f = open(path, "w", encoding="utf-8", errors=TEXT_ERRORS)
+        self._f.write("[")
+
+    def append(self, obj):
+        """Adds an element to the array."""
+        if self.count:
+            self._f.write(self.encoder.itemSeparator)
+        self._f.write(self.encoder.dumps(obj))
+        self.count += 1
+
+    def close(self):
+        """Terminates the array and closes the file."""
+        self._f.write("]")
+        self._f.close()
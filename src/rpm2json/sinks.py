@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+"""
+Destinations for the package entries produced by rpm2json.iterPackageRecords().
+
+A sink is handed each entry with add() and finished with close() (or
+abort() if producing the entries failed):
+
+- JsonDirSink writes the JSON directory tree (rpmlist.json, the
+  information files and the optional pages, search indexes, blobs and
+  SQLite database), rpm2json.rpmList() is a thin wrapper around it.
+- NdjsonSink writes the information of each package as one line of a
+  text stream, so consumers get the data without a round trip through
+  the file system. When sorting, packages are sorted in runs of runSize
+  that are spilled to temporary files and merged at the end, so memory
+  use does not grow with the size of the repository.
+- CallbackSink hands each entry to a function (for example to push it to
+  a search cluster).
+
+For example::
+
+    files = rpm2json.iterRpmFiles(topdir)
+    sink = rpm2json.sinks.NdjsonSink(sys.stdout)
+    rpm2json.sinks.writeEntries(rpm2json.iterPackageRecords(files, fields="minimal"), sink)
+"""
+
+import heapq
+import json
+import logging
+import os
+import tempfile
+import time
+
+from rpm2json.columnar import FILE_ENCODINGS
+from rpm2json.dedup import BLOB_DIR, BlobStore
+from rpm2json.ids import ID_SCHEMES, assignIds
+from rpm2json.layout import createLayout
+from rpm2json.output import OutputWriter
+from rpm2json.pages import INDEX_DIR, IndexPager, fileEtag
+from rpm2json.search import SEARCH_DIR, SearchIndexBuilder, checkIndexFields, resolveIndexes
+from rpm2json.serialize import JsonArrayWriter, createEncoder, encodeText, escapeNonAscii
+from rpm2json.sqlite import SqliteOutput
+from rpm2json.stats import RunStats, clock
+from rpm2json.vercmp import versionKey
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+#: Number of packages NdjsonSink sorts in memory before spilling them to a
+#: temporary file.
+DEFAULT_RUN_SIZE = 10000
+
+
+def _sortKey(key, relPath):
+    (name, src, epoch, version, release) = key
+    return (name, src, epoch, versionKey(version), versionKey(release), relPath)
+
+
+def _entrySortKey(entry):
+    """Converts the sort key stored in an entry into a key for sorted().
+
+    Packages end up ordered the same way rpm2json.compareNameVersion()
+    orders their headers, but without needing the headers (or the rpm
+    bindings) and without a comparison function call for every pair
+    compared. Ties (duplicate packages) are broken by path so the order
+    does not depend on the order the entries arrived in.
+    """
+    return _sortKey(entry["key"], entry["f"])
+
+
+def writeEntries(entries, sink):
+    """Hands entries to a sink and closes it (aborting it if producing the
+    entries fails).
+
+    Args:
+      entries: Iterable of entries (see rpm2json.iterPackageRecords()).
+      sink: JsonDirSink, NdjsonSink, CallbackSink or any object with the
+        same add(), close() and abort() methods.
+
+    Returns:
+      Value returned by the sink's close().
+    """
+    try:
+        for entry in entries:
+            sink.add(entry)
+    except BaseException:
+        sink.abort()
+        raise
+    return sink.close()
+
+
+class JsonDirSink(object):
+    """Writes the JSON directory tree read by the repository browser."""
+
+    def __init__(self, jsonDir, layout="flat", compress=None, bundleSize=1000, compact=False, encoder=None,
+                 fields=None, ids="sequential", fsync=False, pageSize=0, search=None, sqlite=None, dedup=False,
+                 fileEncoding="expanded", stream=False, stats=None):
+        """Validates the options and creates the output directories.
+
+        Args:
+          jsonDir (str): Directory to write JSON output files to.
+          stats (rpm2json.stats.RunStats): Statistics to add the sort,
+            write and index phases to (a new object if None).
+          Others: See the arguments of the same name of rpm2json.rpmList().
+
+        Raises:
+          ValueError: If an option is not valid.
+        """
+        # Deferred import, rpm2json imports this module
+        from rpm2json import _InfoStager, _makeDir, resolveFields
+
+        fields = resolveFields(fields)
+        if ids == None:
+            ids = "sequential"
+        if ids not in ID_SCHEMES:
+            raise ValueError("Unknown id scheme: {name}".format(name=ids))
+        searchIndexes = resolveIndexes(search)
+        checkIndexFields(searchIndexes, fields)
+        if fileEncoding == None:
+            fileEncoding = "expanded"
+        if fileEncoding not in FILE_ENCODINGS:
+            raise ValueError("Unknown file list encoding: {name}".format(name=fileEncoding))
+        if fileEncoding == "columnar" and dedup:
+            # The blobs would get the file lists the columnar encoding replaced
+            raise ValueError("The columnar file list encoding can not be used with dedup")
+        self.encoder = createEncoder(encoder, compact)
+        _logger.debug("Using the {name} JSON encoder".format(name=self.encoder.name))
+        self.ids = ids
+        self.pageSize = pageSize
+        self.columnar = (fileEncoding == "columnar")
+        self.stats = stats if stats != None else RunStats()
+
+        # Make sure that output directories exist
+        self.jsonDir = _makeDir(jsonDir)
+        self.jsonRpmDir = _makeDir(os.path.join(jsonDir, 'info'))
+        self.writer = OutputWriter(True, compress, fsync)
+        self.layout = createLayout(layout, self.jsonRpmDir, self.writer, bundleSize, self.encoder)
+
+        self.stager = None
+        if stream:
+            self.stager = _InfoStager(jsonDir, self.encoder)
+
+        self.search = None
+        if searchIndexes:
+            self.search = SearchIndexBuilder(searchIndexes)
+
+        self.database = None
+        if sqlite != None:
+            self.database = SqliteOutput(sqlite, fields)
+
+        self.blobs = None
+        if dedup:
+            self.blobs = BlobStore(_makeDir(os.path.join(jsonDir, BLOB_DIR)), self.writer, self.encoder)
+        self._entries = [ ]
+
+    def add(self, entry):
+        """Adds a package (in any order, they are sorted by close()).
+
+        Args:
+          entry ({}): Entry for the package (see rpm2json._createEntry(),
+            it is not modified).
+        """
+        # Deferred import, rpm2json imports this module
+        from rpm2json import _collectEntry
+
+        self._entries.append(_collectEntry(entry, self.stager, self.search, self.database, self.blobs,
+                                           self.columnar))
+
+    def abort(self):
+        """Discards the run (the SQLite database is rolled back)."""
+        if self.database != None:
+            self.database.abort()
+        self._cleanup()
+
+    def _cleanup(self):
+        if self.stager != None:
+            self.stager.cleanup()
+
+    def close(self):
+        """Sorts the packages, assigns their ids and writes the files.
+
+        Returns:
+          rpm2json.stats.RunStats: Statistics of the run.
+        """
+        try:
+            self._write()
+        except BaseException:
+            if self.database != None:
+                self.database.abort()
+            raise
+        finally:
+            self._cleanup()
+        return self.stats
+
+    def _write(self):
+        # Deferred import, rpm2json imports this module
+        from rpm2json import _makeDir
+
+        stats = self.stats
+        jsonDir = self.jsonDir
+        jsonRpmDir = self.jsonRpmDir
+        layout = self.layout
+        encoder = self.encoder
+        stager = self.stager
+        search = self.search
+        database = self.database
+        blobs = self.blobs
+
+        with stats.phase("sort"):
+            sortedList = sorted(self._entries, key=_entrySortKey)
+            self._entries = None
+            idList = assignIds(sortedList, self.ids)
+
+        # The index is streamed to a temporary file as the records are produced
+        ofile = os.path.join(jsonDir, "rpmlist.json")
+        _logger.debug("Writing JSON file with list of all {rpmCnt} RPMs to {outFile}".format(
+            rpmCnt=len(sortedList), outFile=ofile))
+        index = JsonArrayWriter(ofile + ".tmp", encoder)
+        pager = None
+        if self.pageSize:
+            indexDir = _makeDir(os.path.join(jsonDir, INDEX_DIR))
+            pager = IndexPager(indexDir, layout.writer, encoder, self.pageSize)
+        writeStart = clock()
+        indexTime = 0.0
+        indexCpu = 0.0
+
+        for entry, id in zip(sortedList, idList):
+            record = { "id": id }
+            record.update(entry["index"])
+
+            _logger.debug("Writing JSON info file {file} for {name}-{epoch}:{version}-{release}.{arch}".format(
+                file=os.path.join(jsonRpmDir, layout.relPath(id)), name=record["name"], epoch=record["e"],
+                version=record["v"], release=record["r"], arch=record["arch"]))
+            if stager != None:
+                record.update(stager.finish(entry, layout, id))
+            else:
+                # Copy as cached entries must not pick up the id
+                info = dict(entry["info"])
+                info["id"] = id
+                record.update(layout.write(id, encoder.dumps(info)))
+            appendStart = (time.perf_counter(), time.process_time())
+            index.append(record)
+            if pager != None:
+                pager.append(record)
+            indexTime += time.perf_counter() - appendStart[0]
+            indexCpu += time.process_time() - appendStart[1]
+        layout.close()
+        writeEnd = clock()
+        stats.add("write", writeEnd[0] - writeStart[0] - indexTime, writeEnd[1] - writeStart[1] - indexCpu)
+        stats.add("index", indexTime, indexCpu)
+
+        writer = layout.writer
+        _logger.info("Rewrote {written} of {rpmCnt} JSON info files".format(written=writer.written,
+                                                                           rpmCnt=index.count))
+
+        # Move main index file into place (after the files it refers to)
+        with stats.phase("index"):
+            index.close()
+            etag = fileEtag(index.path) if pager != None else None
+            writer.commit(index.path, ofile)
+            if pager != None:
+                pager.close(etag)
+            if search != None:
+                search.write(_makeDir(os.path.join(jsonDir, SEARCH_DIR)),
+                             [(entry["f"], id) for entry, id in zip(sortedList, idList)], writer, encoder)
+            writer.close()
+            if database != None:
+                database.finish([(entry["f"], id) for entry, id in zip(sortedList, idList)])
+        with stats.phase("write"):
+            removed = writer.removeOrphans(jsonRpmDir)
+            # Optional outputs turned off since an earlier run are removed altogether
+            for subDir, enabled in ((INDEX_DIR, pager != None), (SEARCH_DIR, search != None),
+                                    (BLOB_DIR, blobs != None)):
+                path = os.path.join(jsonDir, subDir)
+                if not os.path.isdir(path):
+                    continue
+                writer.removeOrphans(path)
+                if not enabled:
+                    try:
+                        os.rmdir(path)
+                    except OSError:
+                        pass
+            if blobs != None:
+                _logger.info("Stored {chunks} change log and file list chunks in {blobs} blobs".format(
+                    chunks=blobs.chunks, blobs=blobs.blobs))
+        if removed:
+            _logger.info("Removed {cnt} orphaned JSON info files".format(cnt=removed))
+        stats.bytesWritten = writer.bytesWritten
+        stats.filesWritten = writer.written
+        stats.filesSkipped = writer.skipped
+        stats.filesRemoved = writer.removed
+
+
+class NdjsonSink(object):
+    """Writes the information of each package as a line of JSON."""
+
+    def __init__(self, out, encoder=None, compact=True, sort=False, runSize=DEFAULT_RUN_SIZE, tmpDir=None):
+        """
+        Args:
+          out: Text stream to write to (for example sys.stdout).
+          encoder (str): JSON encoder (see rpm2json.serialize.ENCODERS).
+          compact (bool): Write JSON without any optional whitespace.
+          sort (bool): Write the packages in rpmlist.json order once all of
+            them have been added instead of as they arrive.
+          runSize (int): Number of packages sorted in memory before they
+            are spilled to a temporary file.
+          tmpDir (str): Directory for the temporary files (the system
+            default if None).
+        """
+        self.out = out
+        self.encoder = createEncoder(encoder, compact)
+        self.sort = sort
+        self.runSize = max(1, runSize)
+        self.tmpDir = tmpDir
+        #: Number of lines written.
+        self.count = 0
+        # (key, relPath, line) of the packages not spilled yet
+        self._held = [ ]
+        # Temporary files holding sorted runs
+        self._runs = [ ]
+
+    def add(self, entry):
+        """Writes (or, when sorting, holds on to) the information of a package."""
+        line = self.encoder.dumps(entry["info"])
+        if not self.sort:
+            self._writeLine(line)
+            return
+        self._held.append((entry["key"], entry["f"], line))
+        if len(self._held) >= self.runSize:
+            self._spill()
+
+    def _writeLine(self, line):
+        try:
+            line.encode("utf-8")
+        except UnicodeEncodeError:
+            # Undecodable header bytes (lone surrogates), escaped rather than
+            # left to the error handler of the stream
+            line = encodeText(line).decode("utf-8")
+        try:
+            self.out.write(line + "\n")
+        except UnicodeEncodeError:
+            # Stream encoding without some of the characters
+            self.out.write(escapeNonAscii(line) + "\n")
+        self.count += 1
+
+    def _sortHeld(self):
+        held = sorted(self._held, key=lambda item: _sortKey(item[0], item[1]))
+        self._held = [ ]
+        return held
+
+    def _spill(self):
+        run = tempfile.TemporaryFile("w+", encoding="utf-8", errors="surrogatepass", dir=self.tmpDir,
+                                     prefix="rpm2json-run-")
+        self._runs.append(run)
+        for item in self._sortHeld():
+            run.write(json.dumps(item))
+            run.write("\n")
+        run.seek(0)
+        _logger.debug("Spilled sorted run {num} to a temporary file".format(num=len(self._runs)))
+
+    def _merged(self):
+        """Merges the sorted runs (and the packages still held)."""
+        runs = [(json.loads(line) for line in run) for run in self._runs]
+        runs.append(iter(self._sortHeld()))
+        return heapq.merge(*runs, key=lambda item: _sortKey(item[0], item[1]))
+
+    def _cleanup(self):
+        for run in self._runs:
+            run.close()
+        self._runs = [ ]
+        self._held = [ ]
+
+    def abort(self):
+        """Drops the packages held for sorting."""
+        self._cleanup()
+        self.out.flush()
+
+    def close(self):
+        """Writes the packages held for sorting and flushes the stream.
+
+        Returns:
+          int: Number of lines written.
+        """
+        try:
+            for (key, relPath, line) in self._merged():
+                self._writeLine(line)
+        finally:
+            self._cleanup()
+        self.out.flush()
+        return self.count
+
+
+class CallbackSink(object):
+    """Hands each package entry to a function."""
+
+    def __init__(self, callback):
+        """
+        Args:
+          callback (callable): Called with each entry (see
+            rpm2json._createEntry()) as it arrives.
+        """
+        self.callback = callback
+        #: Number of entries handed to the callback.
+        self.count = 0
+
+    def add(self, entry):
+        self.callback(entry)
+        self.count += 1
+
+    def abort(self):
+        pass
+
+    def close(self):
+        """Returns the number of entries handed to the callback."""
+        return self.count
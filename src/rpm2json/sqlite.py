@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite output backend.
+
+Stores the rpmlist.json records and the information of each RPM in a
+SQLite database (alongside the JSON tree) so it can be queried with SQL,
+for example to audit dependencies or report licenses::
+
+    SELECT p.name, p.version FROM files f JOIN packages p USING (pkgKey)
+      WHERE f.path = '/usr/bin/foo';
+
+Tables:
+
+- ``packages``: one row per RPM with the index fields, the common
+  information fields as columns and the complete information as JSON.
+- ``files``: path, size, mode and digest of each file in each package.
+- ``provides``, ``requires``, ``conflicts`` and ``obsoletes``: name, flags
+  and version of each dependency (flags and version are only filled in
+  when the "full" information fields are selected).
+- ``changelog``: time, author and text of each change log entry.
+- ``meta``: schema format and the information fields stored.
+
+Packages are indexed on name and files on path. Everything is written in
+a single transaction. When the database already exists (with the same
+schema and information fields) only packages that are new or whose header
+digest changed are inserted and packages that are gone are deleted.
+"""
+
+import json
+import logging
+import sqlite3
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the schema changes (the database is then rebuilt)
+_SCHEMA_FORMAT = 1
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE packages (
+  pkgKey INTEGER PRIMARY KEY,
+  id,
+  f TEXT UNIQUE NOT NULL,
+  stamp TEXT,
+  name TEXT, epoch INTEGER, version TEXT, release TEXT, arch TEXT, src INTEGER, buildTime INTEGER,
+  summary TEXT, description TEXT, license TEXT, url TEXT, rpmGroup TEXT, size INTEGER,
+  sourceRpm TEXT, vendor TEXT, packager TEXT, buildHost TEXT,
+  info TEXT);
+CREATE INDEX packagesName ON packages (name);
+CREATE INDEX packagesId ON packages (id);
+CREATE TABLE files (
+  pkgKey INTEGER REFERENCES packages ON DELETE CASCADE,
+  path TEXT, size INTEGER, mode INTEGER, digest TEXT);
+CREATE INDEX filesPath ON files (path);
+CREATE INDEX filesPkg ON files (pkgKey);
+CREATE TABLE changelog (
+  pkgKey INTEGER REFERENCES packages ON DELETE CASCADE,
+  time INTEGER, author TEXT, text TEXT);
+CREATE INDEX changelogPkg ON changelog (pkgKey);
+"""
+
+#: Dependency tables and the information fields they are filled from
+#: (names, flags, versions).
+DEPENDENCY_TABLES = (
+    ("provides", "provides", "provideFlags", "provideVersions"),
+    ("requires", "requires", "requireFlags", "requireVersions"),
+    ("conflicts", "conflicts", "conflictFlags", "conflictVersions"),
+    ("obsoletes", "obsoletes", "obsoleteFlags", "obsoleteVersions"),
+)
+
+_DEPENDENCY_SCHEMA = """
+CREATE TABLE {table} (
+  pkgKey INTEGER REFERENCES packages ON DELETE CASCADE,
+  name TEXT, flags INTEGER, version TEXT);
+CREATE INDEX {table}Name ON {table} (name);
+CREATE INDEX {table}Pkg ON {table} (pkgKey);
+"""
+
+# Tables created by _SCHEMA and _DEPENDENCY_SCHEMA (referencing ones first)
+_SCHEMA_TABLES = tuple(t[0] for t in DEPENDENCY_TABLES) + ("changelog", "files", "packages", "meta")
+
+_PACKAGE_COLUMNS = ("id", "f", "stamp", "name", "epoch", "version", "release", "arch", "src", "buildTime",
+                    "summary", "description", "license", "url", "rpmGroup", "size", "sourceRpm", "vendor",
+                    "packager", "buildHost", "info")
+
+_INSERT_PACKAGE = "INSERT INTO packages ({cols}) VALUES ({marks})".format(
+    cols=", ".join(_PACKAGE_COLUMNS), marks=", ".join("?" * len(_PACKAGE_COLUMNS)))
+
+
+def _text(value):
+    """Makes a value safe to bind as a parameter.
+
+    Header strings holding bytes that are not UTF-8 are decoded to lone
+    surrogates (see rpm2json._safeDecode()) which sqlite3 can not encode,
+    they are replaced with U+FFFD. Other values are returned unchanged.
+    """
+    if isinstance(value, str):
+        try:
+            value.encode("utf-8")
+        except UnicodeEncodeError:
+            return "".join("\ufffd" if "\ud800" <= c <= "\udfff" else c for c in value)
+    return value
+
+
+def _column(info, key, i):
+    values = info.get(key)
+    if values == None or i >= len(values):
+        return None
+    return _text(values[i])
+
+
+class SqliteOutput(object):
+    """Writes the packages of a run to a SQLite database."""
+
+    def __init__(self, path, fields):
+        """Opens (creating if needed) the database and starts a transaction.
+
+        Args:
+          path (str): Database file.
+          fields ([str]): Information fields extracted for each RPM.
+        """
+        self.path = path
+        self.fields = list(fields)
+        #: Number of packages inserted (new or changed).
+        self.inserted = 0
+        #: Number of packages deleted (gone or changed).
+        self.deleted = 0
+        #: Number of packages that were already up to date.
+        self.unchanged = 0
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("BEGIN")
+        self._existing = self._open()
+        self._seen = set()
+
+    def _open(self):
+        """Checks the schema and returns {relPath: (pkgKey, stamp)} of the
+        packages already stored."""
+        db = self._db
+        tables = set(r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        if "meta" in tables:
+            meta = dict(db.execute("SELECT key, value FROM meta"))
+            if meta.get("format") == str(_SCHEMA_FORMAT) and meta.get("fields") == json.dumps(self.fields):
+                return dict((f, (pkgKey, stamp)) for pkgKey, f, stamp in
+                            db.execute("SELECT pkgKey, f, stamp FROM packages"))
+            _logger.info("Rebuilding {file} as its schema or information fields differ".format(file=self.path))
+        for table in _SCHEMA_TABLES:
+            db.execute("DROP TABLE IF EXISTS \"{table}\"".format(table=table))
+        # Not executescript() as that would commit the transaction
+        schema = _SCHEMA + "".join(_DEPENDENCY_SCHEMA.format(table=t[0]) for t in DEPENDENCY_TABLES)
+        for statement in schema.split(";"):
+            if statement.strip():
+                db.execute(statement)
+        db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                       [("format", str(_SCHEMA_FORMAT)), ("fields", json.dumps(self.fields))])
+        return { }
+
+    def add(self, entry):
+        """Stores a package unless the database already holds it.
+
+        Args:
+          entry ({}): Entry for the package (see rpm2json._createEntry()).
+        """
+        relPath = _text(entry["f"])
+        info = entry["info"]
+        stamp = entry.get("digest")
+        if stamp == None:
+            stamp = json.dumps(info, sort_keys=True)
+        self._seen.add(relPath)
+        old = self._existing.get(relPath)
+        if old != None:
+            if old[1] == stamp:
+                self.unchanged += 1
+                return
+            self._db.execute("DELETE FROM packages WHERE pkgKey = ?", (old[0],))
+            self.deleted += 1
+        self._insert(relPath, stamp, entry["index"], info)
+        self.inserted += 1
+
+    def _insert(self, relPath, stamp, index, info):
+        db = self._db
+        row = (None, relPath, stamp, _text(index["name"]), index["e"], _text(index["v"]), _text(index["r"]),
+               _text(index["arch"]), int(index["src"]), index["buildTime"], _text(info.get("summary")),
+               _text(info.get("description")), _text(info.get("license")), _text(info.get("url")),
+               _text(info.get("group")), info.get("size"), _text(info.get("sourceRpm")), _text(info.get("vendor")),
+               _text(info.get("packager")), _text(info.get("buildHost")), json.dumps(info))
+        pkgKey = db.execute(_INSERT_PACKAGE, row).lastrowid
+        names = info.get("fileNames") or ()
+        if names:
+            db.executemany("INSERT INTO files (pkgKey, path, size, mode, digest) VALUES (?, ?, ?, ?, ?)",
+                           [(pkgKey, _text(name), _column(info, "fileSizes", i), _column(info, "fileModes", i),
+                             _column(info, "fileDigests", i)) for i, name in enumerate(names)])
+        for table, namesKey, flagsKey, versionsKey in DEPENDENCY_TABLES:
+            names = info.get(namesKey) or ()
+            if names:
+                db.executemany("INSERT INTO {table} (pkgKey, name, flags, version) VALUES (?, ?, ?, ?)".format(
+                    table=table), [(pkgKey, _text(name), _column(info, flagsKey, i), _column(info, versionsKey, i))
+                                   for i, name in enumerate(names)])
+        times = info.get("changeLogTime") or ()
+        if times:
+            db.executemany("INSERT INTO changelog (pkgKey, time, author, text) VALUES (?, ?, ?, ?)",
+                           [(pkgKey, t, _column(info, "changeLogName", i), _column(info, "changeLogText", i))
+                            for i, t in enumerate(times)])
+
+    def finish(self, ids):
+        """Deletes packages that are gone, records the ids and commits.
+
+        Args:
+          ids ([(str, object)]): (relative path, id) of each package.
+        """
+        db = self._db
+        gone = [(pkgKey,) for relPath, (pkgKey, stamp) in self._existing.items() if relPath not in self._seen]
+        db.executemany("DELETE FROM packages WHERE pkgKey = ?", gone)
+        self.deleted += len(gone)
+        db.executemany("UPDATE packages SET id = ? WHERE f = ? AND id IS NOT ?",
+                       [(id, _text(f), id) for f, id in ids])
+        db.execute("COMMIT")
+        _logger.info("Updated {file}: {inserted} packages inserted, {deleted} deleted, {unchanged} unchanged".format(
+            file=self.path, inserted=self.inserted, deleted=self.deleted, unchanged=self.unchanged))
+        self.close()
+
+    def abort(self):
+        """Rolls back the transaction (the database is left as it was)."""
+        if self._db != None:
+            self._db.execute("ROLLBACK")
+            self.close()
+
+    def close(self):
+        """Closes the database (without committing)."""
+        if self._db != None:
+            self._db.close()
+            self._db = None
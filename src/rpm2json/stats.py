@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Statistics collected while rpmList() runs.
+
+The run is split into phases which are timed separately (wall clock and
+CPU time, the CPU time includes worker processes once they have exited):
+
+- ``walk``: searching the repository directory for files.
+- ``read``: cache lookups, RPM magic checks and reading the headers.
+- ``sort``: sorting the packages.
+- ``write``: writing the per RPM information files (and removing orphaned
+  ones).
+- ``index``: writing rpmlist.json.
+
+Along with the phase times the time taken to parse each header is kept
+in a histogram (and the slowest packages are remembered), and the files
+rejected, bytes read and bytes written are counted. The statistics can be
+formatted as JSON or in the Prometheus text format (for the node_exporter
+textfile collector).
+"""
+
+import bisect
+import contextlib
+import heapq
+import json
+import os
+import time
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+#: Phases of a rpmList() run in the order they happen.
+PHASES = ("walk", "read", "sort", "write", "index")
+
+#: Formats accepted by formatStats().
+STATS_FORMATS = ("json", "prometheus-textfile")
+
+#: Upper bounds (in seconds) of the header parse latency histogram buckets.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def clock():
+    """Reads the clocks used to time phases.
+
+    Returns:
+      :obj:`tuple`: (wall, cpu) seconds where cpu includes the CPU time of
+      child processes that have been waited for.
+    """
+    t = os.times()
+    return (time.perf_counter(), time.process_time() + t.children_user + t.children_system)
+
+
+class Histogram(object):
+    """Histogram with fixed bucket boundaries (like a Prometheus histogram)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+          buckets ([float]): Sorted upper bounds of the buckets (values
+            above the last bound are only counted in the +Inf bucket).
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Adds a value to the histogram."""
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Returns a list of (upper bound, number of values <= bound) tuples."""
+        result = []
+        total = 0
+        for le, cnt in zip(self.buckets, self.counts):
+            total += cnt
+            result.append((le, total))
+        return result
+
+
+class RunStats(object):
+    """Timings and counts for one rpmList() run (returned by rpmList())."""
+
+    def __init__(self, slowest=10):
+        """
+        Args:
+          slowest (int): Number of slowest packages to remember.
+        """
+        #: Wall clock seconds spent in each phase (keyed by phase name).
+        self.phases = dict((name, 0.0) for name in PHASES)
+        #: CPU seconds spent in each phase (keyed by phase name).
+        self.cpu = dict((name, 0.0) for name in PHASES)
+        #: Time taken to read and parse each RPM header.
+        self.latency = Histogram()
+        #: Number of files found under the repository directory.
+        self.files = 0
+        #: Number of valid RPM files.
+        self.rpms = 0
+        #: Number of files whose entry came from the incremental cache (or, in a
+        #: batch, was already read for another repository).
+        self.cached = 0
+        #: Number of files skipped by the include/exclude patterns.
+        self.excluded = 0
+        #: Number of files without the RPM magic bytes.
+        self.badMagic = 0
+        #: Number of files with the RPM magic bytes whose header could not be read.
+        self.unreadable = 0
+        #: Number of bytes read from the RPM files (headers and magic checks).
+        self.bytesRead = 0
+        #: Number of JSON bytes written (not counting compressed copies).
+        self.bytesWritten = 0
+        #: Number of output files written.
+        self.filesWritten = 0
+        #: Number of output files left untouched as their content was unchanged.
+        self.filesSkipped = 0
+        #: Number of information files removed as their RPM is gone.
+        self.filesRemoved = 0
+        self._slowestCnt = slowest
+        self._slowest = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager adding the time spent in its body to a phase."""
+        start = clock()
+        try:
+            yield
+        finally:
+            self.addSince(name, start)
+
+    def add(self, name, seconds, cpuSeconds=0.0):
+        """Adds time to a phase.
+
+        Args:
+          name (str): Phase name (see PHASES).
+          seconds (float): Wall clock seconds to add.
+          cpuSeconds (float): CPU seconds to add.
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.cpu[name] = self.cpu.get(name, 0.0) + cpuSeconds
+
+    def addSince(self, name, start):
+        """Adds the time since a clock() reading to a phase."""
+        now = clock()
+        self.add(name, now[0] - start[0], now[1] - start[1])
+
+    def addRead(self, relPath, seconds, bytesRead):
+        """Records the reading of a RPM header.
+
+        Args:
+          relPath (str): Path of the file relative to the repository directory.
+          seconds (float): Time taken to read and parse the header.
+          bytesRead (int): Number of bytes read from the file.
+        """
+        self.latency.observe(seconds)
+        self.bytesRead += bytesRead
+        if len(self._slowest) < self._slowestCnt:
+            heapq.heappush(self._slowest, (seconds, relPath))
+        elif self._slowestCnt > 0:
+            heapq.heappushpop(self._slowest, (seconds, relPath))
+
+    @property
+    def slowest(self):
+        """List of (seconds, relPath) tuples of the slowest headers to read
+        (slowest first)."""
+        return sorted(self._slowest, reverse=True)
+
+    @property
+    def total(self):
+        """Wall clock seconds spent in all phases."""
+        return sum(self.phases.values())
+
+    def asDict(self):
+        """Returns the statistics as a dictionary that can be serialized."""
+        return {
+            "files": self.files, "rpms": self.rpms, "cached": self.cached,
+            "rejected": { "excluded": self.excluded, "badMagic": self.badMagic, "unreadable": self.unreadable },
+            "bytesRead": self.bytesRead, "bytesWritten": self.bytesWritten, "filesWritten": self.filesWritten,
+            "filesSkipped": self.filesSkipped, "filesRemoved": self.filesRemoved,
+            "total": self.total, "phases": dict(self.phases), "cpu": dict(self.cpu),
+            "latency": { "buckets": self.latency.cumulative(), "count": self.latency.count, "sum": self.latency.sum },
+            "slowest": [ { "f": relPath, "seconds": secs } for secs, relPath in self.slowest ],
+        }
+
+
+def _prometheusMetric(lines, name, kind, help, samples):
+    lines.append("# HELP {name} {help}".format(name=name, help=help))
+    lines.append("# TYPE {name} {kind}".format(name=name, kind=kind))
+    for labels, value in samples:
+        if labels:
+            labels = "{" + ",".join("{k}=\"{v}\"".format(k=k, v=v) for k, v in labels) + "}"
+        lines.append("{name}{labels} {value}".format(name=name, labels=labels or "", value=repr(value)))
+
+
+def formatPrometheus(stats, timestamp=None):
+    """Formats statistics in the Prometheus text exposition format.
+
+    Args:
+      stats (RunStats): Statistics to format.
+      timestamp (float): Time the run finished (defaults to now).
+
+    Returns:
+      str: Text for a node_exporter textfile collector ``.prom`` file.
+    """
+    lines = []
+    _prometheusMetric(lines, "rpm2json_phase_seconds", "gauge",
+                      "Wall clock time spent in each phase of the last run.",
+                      [((("phase", p),), stats.phases[p]) for p in PHASES])
+    _prometheusMetric(lines, "rpm2json_phase_cpu_seconds", "gauge",
+                      "CPU time spent in each phase of the last run.",
+                      [((("phase", p),), stats.cpu[p]) for p in PHASES])
+    _prometheusMetric(lines, "rpm2json_files", "gauge", "Files found in the repository directory.",
+                      [((), stats.files)])
+    _prometheusMetric(lines, "rpm2json_rpms", "gauge", "Valid RPM files found.", [((), stats.rpms)])
+    _prometheusMetric(lines, "rpm2json_cached_rpms", "gauge", "Files whose header information came from the cache.",
+                      [((), stats.cached)])
+    _prometheusMetric(lines, "rpm2json_rejected_files", "gauge", "Files that were not processed by reason.",
+                      [((("reason", "excluded"),), stats.excluded), ((("reason", "bad_magic"),), stats.badMagic),
+                       ((("reason", "unreadable"),), stats.unreadable)])
+    _prometheusMetric(lines, "rpm2json_read_bytes", "gauge", "Bytes read from RPM files.", [((), stats.bytesRead)])
+    _prometheusMetric(lines, "rpm2json_written_bytes", "gauge", "JSON bytes written.", [((), stats.bytesWritten)])
+    _prometheusMetric(lines, "rpm2json_written_files", "gauge", "JSON files written.", [((), stats.filesWritten)])
+    _prometheusMetric(lines, "rpm2json_skipped_files", "gauge", "JSON files left untouched as they were unchanged.",
+                      [((), stats.filesSkipped)])
+    _prometheusMetric(lines, "rpm2json_removed_files", "gauge", "Orphaned JSON files removed.",
+                      [((), stats.filesRemoved)])
+    name = "rpm2json_header_read_seconds"
+    _prometheusMetric(lines, name, "histogram", "Time taken to read and parse each RPM header.", [])
+    buckets = [(repr(le), cnt) for le, cnt in stats.latency.cumulative()] + [("+Inf", stats.latency.count)]
+    for le, cnt in buckets:
+        lines.append("{name}_bucket{{le=\"{le}\"}} {cnt}".format(name=name, le=le, cnt=cnt))
+    lines.append("{name}_sum {value}".format(name=name, value=repr(stats.latency.sum)))
+    lines.append("{name}_count {value}".format(name=name, value=stats.latency.count))
+    _prometheusMetric(lines, "rpm2json_last_run_timestamp_seconds", "gauge",
+                      "Time the last run finished.", [((), time.time() if timestamp == None else timestamp)])
+    return "\n".join(lines) + "\n"
+
+
+def formatStats(stats, fmt):
+    """Formats statistics.
+
+    Args:
+      stats (RunStats): Statistics to format.
+      fmt (str): One of STATS_FORMATS.
+
+    Returns:
+      str: Formatted statistics.
+    """
+    if fmt == "json":
+        return json.dumps(stats.asDict(), indent=2) + "\n"
+    if fmt == "prometheus-textfile":
+        return formatPrometheus(stats)
+    raise ValueError("Unknown statistics format: {fmt}".format(fmt=fmt))
+
+
+def writeStats(stats, fmt, path):
+    """Writes formatted statistics to a file.
+
+    The file is written under a temporary name and renamed into place so a
+    textfile collector never sees a partially written file.
+
+    Args:
+      stats (RunStats): Statistics to write.
+      fmt (str): One of STATS_FORMATS.
+      path (str): File to write.
+    """
+    text = formatStats(stats, fmt)
+    tmpFile = path + ".tmp"
+    with open(tmpFile, "w") as f:
+        f.write(text)
+    os.replace(tmpFile, path)
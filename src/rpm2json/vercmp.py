@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Pure Python implementation of the RPM version comparison algorithm.
+
+The :func:`rpmvercmp` function mirrors ``rpmvercmp()`` from librpm while
+:func:`versionKey` turns a version (or release) string into a tuple whose
+natural ordering matches :func:`rpmvercmp`. The tuple form allows large
+lists of packages to be sorted with a plain ``key=`` function instead of
+going through ``functools.cmp_to_key`` and the RPM bindings on every
+comparison.
+"""
+
+import functools
+import re
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+# Token ranks, ordered the same way rpmvercmp() orders them: a tilde sorts
+# before everything (even the end of the string), a caret sorts after the
+# end of the string but before any other segment and numeric segments are
+# always newer than alphabetic ones.
+_TILDE = (0,)
+_END = (1,)
+_CARET = (2,)
+_ALPHA = 3
+_DIGIT = 4
+
+_SPECIAL = {"~": _TILDE, "^": _CARET}
+
+# rpmvercmp() only treats ASCII letters and digits as segment characters,
+# everything else (apart from ~ and ^) is a separator.
+_tokenPattern = re.compile(r"~|\^|[0-9]+|[A-Za-z]+")
+
+
+@functools.lru_cache(maxsize=65536)
+def _versionKey(ver):
+    key = [(_DIGIT, int(token)) if token.isdigit() else _SPECIAL.get(token) or (_ALPHA, token)
+           for token in _tokenPattern.findall(ver)]
+    key.append(_END)
+    return tuple(key)
+
+
+def versionKey(ver):
+    """Converts a version or release string into a sort key.
+
+    Keys for recently seen strings are cached as repositories tend to
+    repeat the same versions and releases many times.
+
+    Args:
+      ver (str): Version or release string (``None`` is treated as empty).
+
+    Returns:
+      tuple: Key where ``versionKey(a) < versionKey(b)`` if and only if
+      ``rpmvercmp(a, b) < 0``.
+    """
+    if ver is None:
+        ver = ""
+    elif isinstance(ver, bytes):
+        ver = ver.decode()
+    return _versionKey(ver)
+
+
+def rpmvercmp(a, b):
+    """Compares two version (or release) strings the same way RPM does.
+
+    Args:
+      a (str): Version string "a" in the comparison.
+      b (str): Version string "b" in the comparison.
+
+    Returns:
+      0 - If equal, -1 if a < b, +1 if a > b.
+    """
+    ka = versionKey(a)
+    kb = versionKey(b)
+    if ka < kb:
+        return -1
+    if ka > kb:
+        return 1
+    return 0
+
+
+def evrKey(epoch, version, release):
+    """Builds a sort key for an epoch, version and release triple.
+
+    Args:
+      epoch (int): Package epoch (``None`` is treated as 0).
+      version (str): Package version.
+      release (str): Package release.
+
+    Returns:
+      tuple: Key ordering packages the same way ``rpm.versionCompare`` does.
+    """
+    if epoch is None:
+        epoch = 0
+    return (int(epoch), versionKey(version), versionKey(release))
+
+
+def labelCompare(a, b):
+    """Compares two (epoch, version, release) tuples.
+
+    Args:
+      a (tuple): (epoch, version, release) "a" in the comparison.
+      b (tuple): (epoch, version, release) "b" in the comparison.
+
+    Returns:
+      0 - If equal, -1 if a < b, +1 if a > b.
+    """
+    ka = evrKey(*a)
+    kb = evrKey(*b)
+    if ka < kb:
+        return -1
+    if ka > kb:
+        return 1
+    return 0
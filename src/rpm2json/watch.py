@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Watch mode: keeps the JSON output up to date as the repository changes.
+
+The repository directory tree is watched with inotify (through ctypes, no
+extra modules are needed) or, where inotify is not available (or not
+wanted, it does not see changes made on other hosts of a network file
+system), by periodically comparing directory scans. Bursts of changes are
+debounced and then rpmList() is rerun in incremental mode with the header
+cache kept in memory, so only added or modified RPMs are read, removed
+RPMs drop out and only the JSON files whose content changed are rewritten
+(each through a temporary file renamed into place).
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+from rpm2json.cache import DEFAULT_CACHE_FILE, HeaderCache
+from rpm2json.scan import scanTree
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+               IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _loadLibc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class InotifyWatcher(object):
+    """Watches a directory tree for changes using inotify."""
+
+    def __init__(self, topdir, skipDirs=(), patterns=None):
+        """
+        Args:
+          topdir (str): Directory tree to watch.
+          skipDirs ([str]): Directories not to watch (for example the JSON
+            output directory).
+          patterns (rpm2json._FileFilter): Object whose accepts(relPath)
+            method decides if a changed file matters (None for all files).
+
+        Raises:
+          OSError: If inotify is not available or the tree can not be watched
+            (for example because the watch limit was reached).
+        """
+        self._libc = _loadLibc()
+        if self._libc == None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.topdir = topdir
+        self._skip = set(os.path.realpath(d) for d in skipDirs)
+        self._patterns = patterns
+        self._dirs = { }
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        try:
+            self._addTree(topdir, "")
+        except OSError:
+            self.close()
+            raise
+
+    def _addTree(self, path, relDir):
+        if os.path.realpath(path) in self._skip:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, "Unable to watch {dir}: {msg}".format(dir=path, msg=os.strerror(err)))
+        self._dirs[wd] = (path, relDir)
+        try:
+            it = os.scandir(path)
+        except OSError:
+            return
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    self._addTree(entry.path, os.path.join(relDir, entry.name) if relDir else entry.name)
+
+    def _matters(self, relPath):
+        return self._patterns == None or self._patterns.accepts(relPath)
+
+    def wait(self, timeout):
+        """Waits for changes.
+
+        Args:
+          timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+          True if a relevant change was seen (all pending events are consumed).
+        """
+        changed = False
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(0.0, deadline - time.monotonic())
+            (ready, w, x) = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return changed
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                continue
+            if self._handle(data):
+                changed = True
+                # Drain whatever else is queued but do not wait any longer
+                deadline = time.monotonic()
+
+    def _handle(self, data):
+        changed = False
+        pos = 0
+        while pos < len(data):
+            (wd, mask, cookie, nameLen) = _EVENT_HEADER.unpack_from(data, pos)
+            name = os.fsdecode(data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + nameLen].rstrip(b"\0"))
+            pos += _EVENT_HEADER.size + nameLen
+            if mask & IN_Q_OVERFLOW:
+                _logger.debug("inotify event queue overflowed")
+                changed = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if wd not in self._dirs:
+                continue
+            (path, relDir) = self._dirs[wd]
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed = True
+                continue
+            relPath = os.path.join(relDir, name) if relDir else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._addTree(os.path.join(path, name), relPath)
+                changed = True
+            elif self._matters(relPath):
+                _logger.debug("Change to {file}".format(file=relPath))
+                changed = True
+        return changed
+
+    def close(self):
+        """Stops watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(object):
+    """Detects changes in a directory tree by comparing periodic scans."""
+
+    def __init__(self, topdir, skipDirs=(), patterns=None, interval=5.0, scanThreads=8):
+        """
+        Args:
+          topdir (str): Directory tree to watch.
+          skipDirs ([str]): Directories not to scan.
+          patterns (rpm2json._FileFilter): Object whose accepts(relPath)
+            method decides if a changed file matters (None for all files).
+          interval (float): Seconds between scans.
+          scanThreads (int): Number of directories scanned concurrently.
+        """
+        self.topdir = topdir
+        self.interval = interval
+        self._skipDirs = list(skipDirs)
+        self._patterns = patterns
+        self._scanThreads = scanThreads
+        self._snapshot = self._scan()
+        self._nextScan = time.monotonic() + interval
+
+    def _scan(self):
+        snapshot = { }
+        for rec in scanTree(self.topdir, self._scanThreads, self._skipDirs):
+            if self._patterns == None or self._patterns.accepts(rec.relPath):
+                snapshot[rec.relPath] = (rec.size, rec.mtime, rec.ino)
+        return snapshot
+
+    def wait(self, timeout):
+        """Waits for changes (see InotifyWatcher.wait())."""
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if now < self._nextScan:
+                if self._nextScan > deadline:
+                    time.sleep(max(0.0, deadline - now))
+                    return False
+                time.sleep(self._nextScan - now)
+            snapshot = self._scan()
+            self._nextScan = time.monotonic() + self.interval
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return True
+
+    def close(self):
+        pass
+
+
+def createWatcher(topdir, skipDirs=(), patterns=None, poll=False, interval=5.0, scanThreads=8):
+    """Creates the object used to detect changes under a directory.
+
+    Args:
+      topdir (str): Directory tree to watch.
+      skipDirs ([str]): Directories to ignore.
+      patterns (rpm2json._FileFilter): Object whose accepts(relPath) method
+        decides if a changed file matters (None for all files).
+      poll (bool): Always use polling rather than inotify.
+      interval (float): Seconds between scans when polling.
+      scanThreads (int): Number of directories scanned concurrently when
+        polling.
+
+    Returns:
+      InotifyWatcher or PollingWatcher (if inotify can not be used).
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(topdir, skipDirs, patterns)
+        except OSError as msg:
+            _logger.warning("Falling back to polling every {secs}s: {msg}".format(secs=interval, msg=msg))
+    return PollingWatcher(topdir, skipDirs, patterns, interval, scanThreads)
+
+
+def _waitForChanges(watcher, debounce, maxDelay, stop):
+    """Blocks until a burst of changes is over.
+
+    Returns:
+      True once changes have been seen and no further changes happened for
+      debounce seconds (or maxDelay seconds passed since the first one),
+      False if stop was set first.
+    """
+    while not watcher.wait(0.5):
+        if stop.is_set():
+            return False
+    first = time.monotonic()
+    while not stop.is_set():
+        remaining = min(debounce, first + maxDelay - time.monotonic())
+        if remaining <= 0 or not watcher.wait(remaining):
+            return True
+    return False
+
+
+def watch(topdir, jsonDir, debounce=2.0, maxDelay=60.0, poll=False, pollInterval=5.0, stop=None,
+          onRun=None, **options):
+    """Generates the JSON files and keeps them up to date until stopped.
+
+    Args:
+      topdir (str): Directory to recursively search for RPM files.
+      jsonDir (str): Directory to write JSON output files to.
+      debounce (float): Seconds without further changes to wait before
+        updating the output.
+      maxDelay (float): Maximum seconds to delay an update while changes
+        keep coming in.
+      poll (bool): Detect changes by scanning every pollInterval seconds
+        instead of using inotify (used anyway if inotify is unavailable).
+      pollInterval (float): Seconds between scans when polling.
+      stop (threading.Event): Set to stop watching (runs until interrupted
+        if None).
+      onRun (callable): Called with the rpm2json.stats.RunStats of each run.
+      options: Other keyword arguments for rpmList() (incremental mode is
+        always used).
+    """
+    # Deferred import, rpm2json imports this module
+    from rpm2json import _FileFilter, _makeDir, resolveFields, rpmList
+
+    if stop == None:
+        stop = threading.Event()
+    _makeDir(jsonDir)
+    cacheFile = options.pop("cacheFile", None) or os.path.join(jsonDir, DEFAULT_CACHE_FILE)
+    cache = HeaderCache(cacheFile, resolveFields(options.get("fields")))
+    cache.load()
+    options["incremental"] = True
+    # Saving the cache must not look like a change to the repository
+    exclude = list(options.get("exclude") or [])
+    relCache = os.path.relpath(os.path.abspath(cacheFile), os.path.abspath(topdir))
+    if not relCache.startswith(os.pardir):
+        exclude += [relCache, relCache + ".tmp"]
+    patterns = _FileFilter(options.get("include"), exclude)
+
+    # Watch before the first run so changes made during it are not missed
+    watcher = createWatcher(topdir, [jsonDir], patterns, poll, pollInterval, options.get("scanThreads", 8))
+    try:
+        while not stop.is_set():
+            stats = rpmList(topdir, jsonDir, cache=cache, **options)
+            _logger.info("Updated JSON for {rpms} RPMs in {secs:.2f}s ({written} files written)".format(
+                rpms=stats.rpms, secs=stats.total, written=stats.filesWritten))
+            if onRun != None:
+                onRun(stats)
+            if not _waitForChanges(watcher, debounce, maxDelay, stop):
+                break
+    finally:
+        watcher.close()
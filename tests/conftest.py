@@ -7,4 +7,29 @@
     https://pytest.org/latest/plugins.html
 """
 
-# import pytest
+import pytest
+import os
+import shutil
+
+#: Build host of the test RPMs with a byte that is not valid UTF-8 (0xE9
+#: in place of the "e"), as read back through surrogateescape.
+BAD_BUILD_HOST = "r\udce9fritos.attlocal.net"
+
+@pytest.fixture
+def badBuildHost():
+    """Build host read back from the RPMs of the badHostRepo fixture."""
+    return BAD_BUILD_HOST
+
+@pytest.fixture
+def badHostRepo(tmp_path):
+    """Copy of tests/repo whose RPMs have a build host that is not UTF-8."""
+    repoDir = str(tmp_path / "badhost")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    for dirPath, dirNames, fileNames in os.walk(repoDir):
+        for name in fileNames:
+            path = os.path.join(dirPath, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            with open(path, "wb") as f:
+                f.write(data.replace(b"refritos.attlocal.net\0", b"r\xe9fritos.attlocal.net\0"))
+    return repoDir
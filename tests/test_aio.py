@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import asyncio
+import filecmp
+import os
+import rpm2json
+from rpm2json import rpmList
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+repoDir = os.path.join(os.getcwd(), "tests", "repo")
+
+def test_arpmList(tmp_path):
+    expDir = str(tmp_path / "exp")
+    gotDir = str(tmp_path / "got")
+    rpmList(repoDir, expDir, reader="native")
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def run():
+        task = asyncio.ensure_future(ticker())
+        stats = await rpm2json.arpmList(repoDir, gotDir, reader="native")
+        task.cancel()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats.rpms == 3
+    assert ticks
+    files = ["rpmlist.json"] + [os.path.join("info", f) for f in os.listdir(os.path.join(expDir, "info"))]
+    assert filecmp.cmpfiles(expDir, gotDir, files, shallow=False)[0] == files
+
+@pytest.mark.parametrize("jobs,maxPending", [(1, 1), (2, 64)])
+def test_aiterPackages(jobs, maxPending):
+    async def collect():
+        return [entry async for entry in rpm2json.aiterPackages(repoDir, fields="minimal", reader="native",
+                                                                 jobs=jobs, maxPending=maxPending)]
+
+    entries = asyncio.run(collect())
+    assert [e["f"] for e in entries] == ["SRPMS/virtualbox-repo-32-10.nst32.src.rpm",
+                                         "noarch/RandomUUID-1.0.0-6.nst32.noarch.rpm",
+                                         "noarch/virtualbox-repo-32-10.nst32.noarch.rpm"]
+    assert entries[1]["info"]["name"] == "RandomUUID"
+    assert entries[1]["index"]["v"] == "1.0.0"
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_aiterPackagesStop(jobs):
+    async def first():
+        async for entry in rpm2json.aiterPackages(repoDir, reader="native", exclude=["SRPMS/*"], jobs=jobs):
+            return entry
+
+    assert asyncio.run(first())["index"]["name"] == "RandomUUID"
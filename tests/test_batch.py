@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+import shutil
+from rpm2json.batch import loadBatchConfig, runBatch
+from rpm2json.main import main
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def readList(outDir):
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        return json.load(f)
+
+def linkedRepos(tmp_path):
+    repoA = str(tmp_path / "a")
+    repoB = str(tmp_path / "b")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoA)
+    shutil.copytree(repoA, os.path.join(repoB, "mirror"), copy_function=os.link)
+    return (repoA, repoB)
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_runBatch(tmp_path, jobs):
+    (repoA, repoB) = linkedRepos(tmp_path)
+    outA = str(tmp_path / "outA")
+    outB = str(tmp_path / "outB")
+    runs = []
+    results = runBatch([{ "dir": repoA, "outdir": outA }, { "dir": repoB, "outdir": outB, "ids": "nevra" }],
+                       jobs=jobs, onRun=lambda repo, stats: runs.append(repo["dir"]), reader="native")
+    assert runs == [repoA, repoB]
+    # The hardlinked RPMs are only read for the first repository
+    assert [(s.rpms, s.cached) for s in results] == [(3, 0), (3, 3)]
+    gotA = readList(outA)
+    gotB = readList(outB)
+    assert [r["f"] for r in gotB] == ["mirror/" + r["f"] for r in gotA]
+    assert [r["id"] for r in gotA] == [100000, 100001, 100002]
+    # Per repository settings override the shared ones
+    assert all(isinstance(r["id"], str) for r in gotB)
+
+def test_runBatchConflict(tmp_path):
+    (repoA, repoB) = linkedRepos(tmp_path)
+    with pytest.raises(ValueError):
+        runBatch([{ "dir": repoA, "outdir": str(tmp_path / "out") }, { "dir": repoB, "outdir": str(tmp_path / "out") }])
+
+def test_batchMain(tmp_path):
+    (repoA, repoB) = linkedRepos(tmp_path)
+    config = str(tmp_path / "batch.json")
+    with open(config, "w") as f:
+        json.dump({ "defaults": { "compact": True }, "repos": [{ "dir": repoA }, { "dir": repoB, "layout": "sharded" }] }, f)
+    main(["--batch", config, "--reader", "native", "--incremental"])
+    assert len(readList(os.path.join(repoA, "json"))) == 3
+    assert os.path.isfile(os.path.join(repoB, "json", ".rpm2json-cache.json"))
+    assert not os.path.isfile(os.path.join(repoB, "json", "info", "100000.json"))
+
+    with open(config, "w") as f:
+        json.dump({ "repos": [{ "dir": repoA, "jobs": 4 }] }, f)
+    with pytest.raises(ValueError):
+        loadBatchConfig(config)
+    with open(config, "w") as f:
+        json.dump({ "repos": [{ "dir": repoA, "colour": "blue" }] }, f)
+    with pytest.raises(ValueError):
+        loadBatchConfig(config)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+from rpm2json import rpmList
+from rpm2json.columnar import decodeFiles, deltaDecode, deltaEncode, encodeFiles
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def test_delta():
+    assert deltaEncode([5, 5, 7, 3]) == [5, 0, 2, -4]
+    assert deltaDecode(deltaEncode([5, 5, 7, 3])) == [5, 5, 7, 3]
+    assert deltaEncode([]) == []
+
+def test_encodeFiles():
+    info = { "name": "foo", "fileNames": ["/usr/share/foo", "/usr/share/foo/class", "/usr/share/foo/class/Foo.class"],
+             "fileModes": [16877, 16877, 33188], "fileSizes": [0, 0, 726] }
+    encoded = encodeFiles(info)
+    assert encoded == { "name": "foo", "files": {
+        "dirNames": ["/usr/share/", "/usr/share/foo/", "/usr/share/foo/class/"],
+        "baseNames": ["foo", "class", "Foo.class"], "dirIndexes": [0, 1, 1],
+        "modes": [16877, 0, 16311], "sizes": [0, 0, 726] } }
+    assert decodeFiles(encoded) == info
+    assert encodeFiles({ "name": "foo" }) == { "name": "foo" }
+
+def test_rpmListColumnar(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, fileEncoding="columnar")
+    for name in os.listdir(os.path.join(os.getcwd(), "tests", "expect", "info")):
+        with open(os.path.join(os.getcwd(), "tests", "expect", "info", name), "r") as f:
+            expected = json.load(f)
+        with open(os.path.join(outDir, "info", name), "r") as f:
+            info = json.load(f)
+        assert "fileNames" not in info
+        assert decodeFiles(info) == expected
+    with pytest.raises(ValueError):
+        rpmList(inDir, outDir, fileEncoding="nosuchencoding")
+    # The blobs would take the file lists the columnar encoding replaces
+    with pytest.raises(ValueError):
+        rpmList(inDir, outDir, fileEncoding="columnar", dedup=True)
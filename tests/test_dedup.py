@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+from rpm2json import rpmList
+from rpm2json.dedup import BLOB_DIR, BlobStore, blobPath, expandInfo
+from rpm2json.output import OutputWriter
+from rpm2json.serialize import JsonEncoder
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def loader(blobDir):
+    def loadBlob(blobHash):
+        with open(blobPath(blobDir, blobHash), "r") as f:
+            return json.load(f)
+    return loadBlob
+
+def makeInfo(release, files):
+    return {
+        "name": "foo", "release": str(release),
+        "changeLogTime": list(range(release + 100, 0, -1)),
+        "changeLogName": ["Packager - {i}".format(i=i) for i in range(release + 100, 0, -1)],
+        "changeLogText": ["- change {i}".format(i=i) for i in range(release + 100, 0, -1)],
+        "fileNames": ["/usr/share/foo/file{i}".format(i=i) for i in range(files)],
+        "fileSizes": list(range(files)),
+        "fileModes": [0o100644] * files,
+    }
+
+def test_blobStore(tmp_path):
+    blobDir = str(tmp_path)
+    store = BlobStore(blobDir, OutputWriter(), JsonEncoder())
+    first = store.dedup(makeInfo(1, 200))
+    blobs = store.blobs
+    second = store.dedup(makeInfo(2, 201))
+    assert "fileNames" not in second and "changeLogText" not in second
+    # Only the chunks around the changes are new
+    assert store.blobs - blobs <= 2
+    assert expandInfo(first, loader(blobDir)) == makeInfo(1, 200)
+    assert expandInfo(second, loader(blobDir)) == makeInfo(2, 201)
+    # Empty arrays are left alone
+    assert store.dedup(makeInfo(0, 0))["fileNames"] == []
+
+def test_rpmListDedup(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, dedup=True, stream=True)
+    for name in os.listdir(os.path.join(os.getcwd(), "tests", "expect", "info")):
+        with open(os.path.join(os.getcwd(), "tests", "expect", "info", name), "r") as f:
+            expected = json.load(f)
+        with open(os.path.join(outDir, "info", name), "r") as f:
+            info = json.load(f)
+        assert "blobs" in info
+        assert expandInfo(info, loader(os.path.join(outDir, BLOB_DIR))) == expected
+
+def test_rpmListDedupTurnedOff(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, dedup=True, pageSize=2, search="all")
+    assert os.path.isdir(os.path.join(outDir, BLOB_DIR))
+    stats = rpmList(inDir, outDir)
+    assert sorted(os.listdir(outDir)) == ["info", "rpmlist.json"]
+    assert stats.filesRemoved > 0
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+import rpm2json
+from rpm2json import FIELD_PRESETS, createRpmInfo, resolveFields, rpmList
+from rpm2json import rpmheader
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def readHeader(relPath):
+    with open(os.path.join(os.getcwd(), "tests", "repo", relPath), "rb") as f:
+        return rpmheader.readHeader(f.read())
+
+def test_resolveFields():
+    assert resolveFields() == FIELD_PRESETS["default"]
+    assert resolveFields("minimal") == FIELD_PRESETS["minimal"]
+    assert resolveFields("version, name,sigInfo") == ("name", "sigInfo", "version")
+    assert set(FIELD_PRESETS["default"]) < set(FIELD_PRESETS["full"])
+    assert resolveFields(["minimal", "fileNames"]) == tuple(sorted(FIELD_PRESETS["minimal"] + ("fileNames",)))
+    with pytest.raises(ValueError):
+        resolveFields("name,nosuchfield")
+
+def test_defaultFields():
+    with open(os.path.join(os.getcwd(), "tests", "expect", "info", "100000.json"), "r") as f:
+        expected = json.load(f)
+    info = createRpmInfo(readHeader("noarch/RandomUUID-1.0.0-6.nst32.noarch.rpm"))
+    assert list(info) == [k for k in expected if k not in ("src", "id")]
+
+def test_unselectedTagsNotRead(monkeypatch):
+    fetched = set()
+    getItem = rpmheader.Header.__getitem__
+    def recordGet(self, tag):
+        fetched.add(tag)
+        return getItem(self, tag)
+    def failSprintf(self, fmt):
+        pytest.fail("Unexpected signature query")
+    monkeypatch.setattr(rpmheader.Header, "__getitem__", recordGet)
+    monkeypatch.setattr(rpmheader.Header, "sprintf", failSprintf)
+
+    info = createRpmInfo(readHeader("noarch/RandomUUID-1.0.0-6.nst32.noarch.rpm"), "name,summary")
+    assert info == { "name": "RandomUUID", "summary": "Generates random Universal Unique IDentifiers (UUID)" }
+    assert fetched == set([rpmheader.RPMTAG_NAME, rpmheader.RPMTAG_SUMMARY])
+
+def test_rpmListFieldsCache(monkeypatch, tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, incremental=True, reader="native")
+
+    # Cached entries hold the default fields so they must not be reused
+    readFiles = [ ]
+    readRpmEntry = rpm2json._readRpmEntry
+    def recordRead(ts, path, relPath, fields=None):
+        readFiles.append(relPath)
+        return readRpmEntry(ts, path, relPath, fields)
+    monkeypatch.setattr(rpm2json, "_readRpmEntry", recordRead)
+    rpmList(inDir, outDir, incremental=True, reader="native", fields="minimal")
+    assert len(readFiles) == 3
+
+    with open(os.path.join(outDir, "info", "100000.json"), "r") as f:
+        info = json.load(f)
+    assert list(info) == list(FIELD_PRESETS["minimal"]) + ["src", "id"]
+    with open(os.path.join(os.getcwd(), "tests", "expect", "rpmlist.json"), "r") as f:
+        expected = json.load(f)
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        assert json.load(f) == expected
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+import shutil
+from rpm2json import rpmList
+from rpm2json.ids import FIRST_ID, assignIds, nevraIdentity
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def makeEntry(relPath, name, src=False, digest=None):
+    index = { "name": name, "e": 0, "v": "1.0", "r": "1", "arch": "noarch", "src": src, "f": relPath }
+    return { "f": relPath, "index": index, "digest": digest }
+
+def test_nevraIdentity():
+    assert nevraIdentity(makeEntry("a.rpm", "a")["index"]) == "a-0:1.0-1.noarch"
+    assert nevraIdentity(makeEntry("a.src.rpm", "a", src=True)["index"]) == "a-0:1.0-1.noarch.src"
+
+def test_assignIds():
+    entries = [makeEntry("b.rpm", "b"), makeEntry("c.rpm", "c")]
+    assert assignIds(entries) == [FIRST_ID, FIRST_ID + 1]
+    ids = assignIds(entries, "nevra")
+    # Ids do not depend on the other packages present
+    assert assignIds([makeEntry("a.rpm", "a")] + entries, "nevra")[1:] == ids
+    assert assignIds(entries, "digest") == ids
+    assert assignIds([makeEntry("b.rpm", "b", digest="ab" * 32)], "digest") == ["ab" * 8]
+    with pytest.raises(ValueError):
+        assignIds(entries, "nosuchscheme")
+
+def test_assignIdsCollision():
+    copies = [makeEntry("y/b.rpm", "b"), makeEntry("x/b.rpm", "b")]
+    ids = assignIds(copies, "nevra")
+    assert len(set(ids)) == 2
+    # The first path keeps the plain NEVRA id
+    assert ids[1] == assignIds([copies[0]], "nevra")[0]
+
+def test_rpmListStableIds(tmp_path):
+    repoDir = str(tmp_path / "repo")
+    outDir = str(tmp_path / "out")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    rpmList(repoDir, outDir, incremental=True, reader="native", ids="digest")
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        before = dict((r["f"], r["id"]) for r in json.load(f))
+
+    # A second copy of a RPM gets its own id without changing the other ids
+    # or rewriting their files
+    shutil.copy(os.path.join(repoDir, "noarch", "RandomUUID-1.0.0-6.nst32.noarch.rpm"),
+                os.path.join(repoDir, "zzz.rpm"))
+    stats = rpmList(repoDir, outDir, incremental=True, reader="native", ids="digest")
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        after = dict((r["f"], r["id"]) for r in json.load(f))
+    assert len(after) == 4
+    assert dict((f, after[f]) for f in before) == before
+    assert stats.filesWritten == 2
+    for relPath, id in after.items():
+        with open(os.path.join(outDir, "info", id + ".json"), "r") as f:
+            assert json.load(f)["id"] == id
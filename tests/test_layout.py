@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import gzip
+import json
+import os
+from rpm2json import rpmList
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def loadExpected(id):
+    with open(os.path.join(os.getcwd(), "tests", "expect", "info", str(id) + ".json"), "r") as f:
+        return json.load(f)
+
+def test_shardedCompressed(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, layout="sharded", compress=["gz"])
+
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        rpms = json.load(f)
+    with gzip.open(os.path.join(outDir, "rpmlist.json.gz"), "rt") as f:
+        assert json.load(f) == rpms
+    assert len(rpms) == 3
+    for rec in rpms:
+        shard, name = rec["p"].split("/")
+        assert len(shard) == 2 and name == str(rec["id"]) + ".json"
+        path = os.path.join(outDir, "info", rec["p"])
+        with open(path, "r") as f:
+            assert json.load(f) == loadExpected(rec["id"])
+        with gzip.open(path + ".gz", "rt") as f:
+            assert json.load(f) == loadExpected(rec["id"])
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_bundled(tmp_path, stream):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, layout="bundled", bundleSize=2, stream=stream)
+
+    infoDir = os.path.join(outDir, "info")
+    assert sorted(os.listdir(infoDir)) == ["bundle-000000.ndjson", "bundle-000001.ndjson", "bundles.json"]
+    with open(os.path.join(infoDir, "bundles.json"), "r") as f:
+        offsets = json.load(f)["offsets"]
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        rpms = json.load(f)
+    for rec in rpms:
+        assert offsets[str(rec["id"])] == [rec["p"], rec["o"], rec["l"]]
+        with open(os.path.join(infoDir, rec["p"]), "rb") as f:
+            f.seek(rec["o"])
+            assert json.loads(f.read(rec["l"])) == loadExpected(rec["id"])
@@ -3,6 +3,8 @@
 import pytest
 import json
 import os
+import shutil
+import rpm2json
 from rpm2json import _makeDir
 from rpm2json import rpmList
 
@@ -74,3 +76,84 @@ def test_rpmList():
     assertJsonEqual(expDirInfo, outDirInfo, "100002.json")
 
     
+def test_rpmListIncremental(monkeypatch):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = needDir("jsonincr")
+    cacheFile = os.path.join(outDir, ".rpm2json-cache.json")
+    if os.path.isfile(cacheFile):
+        os.remove(cacheFile)
+    rpmList(inDir, outDir, incremental=True)
+    assert os.path.isfile(cacheFile)
+
+    outDirInfo = os.path.join(outDir, "info")
+    mtimes = { }
+    for f in os.listdir(outDirInfo):
+        mtimes[f] = os.stat(os.path.join(outDirInfo, f)).st_mtime_ns
+
+    # Second run must not need to read any RPM headers or rewrite any files
+    def failRead(ts, path, relPath, fields=None):
+        pytest.fail("Unexpected read of {path}".format(path=path))
+    monkeypatch.setattr(rpm2json, "_readRpmEntry", failRead)
+    rpmList(inDir, outDir, incremental=True)
+
+    for f in mtimes.keys():
+        assert os.stat(os.path.join(outDirInfo, f)).st_mtime_ns == mtimes[f]
+
+    expDir = os.path.join(os.getcwd(), "tests", "expect")
+    expDirInfo = os.path.join(expDir, "info")
+    assertJsonArraysEqual(expDir, outDir, "rpmlist.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100000.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100001.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100002.json")
+
+def test_rpmListJobs():
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = needDir("jsonjobs")
+    rpmList(inDir, outDir, jobs=2)
+
+    expDir = os.path.join(os.getcwd(), "tests", "expect")
+    expDirInfo = os.path.join(expDir, "info")
+    outDirInfo = os.path.join(outDir, "info")
+    assertJsonArraysEqual(expDir, outDir, "rpmlist.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100000.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100001.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100002.json")
+
+def test_rpmListStream():
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = needDir("jsonstream")
+    rpmList(inDir, outDir, stream=True)
+
+    expDir = os.path.join(os.getcwd(), "tests", "expect")
+    expDirInfo = os.path.join(expDir, "info")
+    outDirInfo = os.path.join(outDir, "info")
+    assertJsonArraysEqual(expDir, outDir, "rpmlist.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100000.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100001.json")
+    assertJsonEqual(expDirInfo, outDirInfo, "100002.json")
+    # Staging files must have been cleaned up
+    assert sorted(os.listdir(outDir)) == ["info", "rpmlist.json"]
+
+def test_rpmListFilters(monkeypatch, tmp_path):
+    srcDir = os.path.join(os.getcwd(), "tests", "repo")
+    inDir = tmp_path / "repo"
+    shutil.copytree(srcDir, str(inDir))
+    (inDir / "repodata").mkdir()
+    (inDir / "repodata" / "repomd.xml").write_text("<repomd/>")
+    (inDir / "noarch" / "broken.rpm").write_bytes(b"not really an RPM")
+    # Output from a previous run under the repository directory
+    outDir = str(inDir / "json")
+    rpmList(str(inDir), outDir)
+
+    readFiles = [ ]
+    readRpmEntry = rpm2json._readRpmEntry
+    def recordRead(ts, path, relPath, fields=None):
+        readFiles.append(relPath)
+        return readRpmEntry(ts, path, relPath, fields)
+    monkeypatch.setattr(rpm2json, "_readRpmEntry", recordRead)
+    rpmList(str(inDir), outDir, exclude=["SRPMS/*"])
+
+    assert sorted(readFiles) == ["noarch/RandomUUID-1.0.0-6.nst32.noarch.rpm",
+                                 "noarch/virtualbox-repo-32-10.nst32.noarch.rpm"]
+    rpms = readJson(outDir, "rpmlist.json")
+    assert [r["f"] for r in rpms] == readFiles
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+import shutil
+from rpm2json import rpmList
+from rpm2json.output import OutputWriter
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def test_writerSkipsUnchanged(tmp_path):
+    ofile = str(tmp_path / "a.json")
+    assert OutputWriter().write(ofile, "[1]")
+    os.utime(ofile, (1, 1))
+    writer = OutputWriter()
+    assert not writer.write(ofile, "[1]")
+    assert os.path.getmtime(ofile) == 1
+    assert writer.write(ofile, "[2]")
+    assert (writer.written, writer.skipped, writer.bytesWritten) == (1, 1, 3)
+    assert sorted(os.listdir(str(tmp_path))) == ["a.json"]
+
+def test_writerFsync(tmp_path):
+    writer = OutputWriter(compress=["gz"], fsync=True)
+    ofile = str(tmp_path / "a.json")
+    writer.write(ofile, "[1]")
+    # Renames are held back until close()
+    assert not os.path.exists(ofile)
+    writer.close()
+    assert sorted(os.listdir(str(tmp_path))) == ["a.json", "a.json.gz"]
+
+def test_rpmListRemovesOrphans(tmp_path):
+    repoDir = str(tmp_path / "repo")
+    outDir = str(tmp_path / "out")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    infoDir = os.path.join(outDir, "info")
+    rpmList(repoDir, outDir, ids="nevra", compress=["gz"])
+    mtimes = dict((name, os.path.getmtime(os.path.join(infoDir, name))) for name in os.listdir(infoDir))
+    assert len(mtimes) == 6
+
+    shutil.rmtree(os.path.join(repoDir, "SRPMS"))
+    stats = rpmList(repoDir, outDir, ids="nevra")
+    assert (stats.filesWritten, stats.filesSkipped, stats.filesRemoved) == (1, 2, 4)
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        names = sorted(str(r["id"]) + ".json" for r in json.load(f))
+    assert sorted(os.listdir(infoDir)) == names
+    assert all(os.path.getmtime(os.path.join(infoDir, name)) == mtimes[name] for name in names)
+    assert not os.path.exists(os.path.join(outDir, "rpmlist.json.gz"))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+from rpm2json import rpmList
+from rpm2json.pages import archKey, fileEtag, letterKey
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def test_shardKeys():
+    assert letterKey("RandomUUID") == "r"
+    assert letterKey("389-ds") == "3"
+    assert letterKey("_tool") == "_"
+    assert archKey({ "arch": "x86_64", "src": False }) == "x86_64"
+    assert archKey({ "arch": "noarch", "src": True }) == "src"
+    assert archKey({ "arch": "../x86/64", "src": False }) == ".._x86_64"
+    assert archKey({ "arch": "..", "src": False }) == "_"
+    assert archKey({ "arch": ".", "src": False }) == "_"
+    assert archKey({ "arch": "", "src": False }) == "_"
+
+def test_rpmListPages(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, pageSize=2)
+
+    indexDir = os.path.join(outDir, "index")
+    def load(relPath):
+        with open(os.path.join(indexDir, relPath), "r") as f:
+            return json.load(f)
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        rpms = json.load(f)
+    manifest = load("manifest.json")
+    assert manifest["count"] == 3
+    assert manifest["rpmlist"]["etag"] == fileEtag(os.path.join(outDir, "rpmlist.json"))
+    assert [p["count"] for p in manifest["pages"]] == [2, 1]
+    assert sum((load(p["file"]) for p in manifest["pages"]), []) == rpms
+    assert manifest["pages"][0]["first"] == "RandomUUID"
+    for shards, key in ((manifest["letters"], lambda r: letterKey(r["name"])), (manifest["arches"], archKey)):
+        for k, shard in shards.items():
+            assert load(shard["file"]) == [r for r in rpms if key(r) == k]
+            assert shard["etag"] == fileEtag(os.path.join(indexDir, shard["file"]))
+    assert sorted(manifest["arches"]) == ["noarch", "src"]
+
+    # Shards that are no longer needed are removed
+    rpmList(inDir, outDir, pageSize=2, exclude=["SRPMS/*"])
+    assert sorted(load("manifest.json")["arches"]) == ["noarch"]
+    assert os.listdir(os.path.join(indexDir, "arch")) == ["noarch.json"]
+    assert not os.path.exists(os.path.join(indexDir, "page-000001.json"))
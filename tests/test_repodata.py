@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import filecmp
+import gzip
+import os
+import shutil
+from rpm2json import resolveFields, rpmList
+from rpm2json.main import main
+from rpm2json.repodata import RepodataSource, findMetadata
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def makeRepo(tmp_path):
+    repoDir = str(tmp_path / "repo")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repodata", "repodata"), os.path.join(repoDir, "repodata"))
+    return repoDir
+
+def assertSameOutput(expDir, gotDir):
+    cmp = filecmp.dircmp(expDir, gotDir)
+    assert cmp.left_only == [] and cmp.right_only == []
+    (match, mismatch, errors) = filecmp.cmpfiles(expDir, gotDir, ["rpmlist.json"] +
+                                                 [os.path.join("info", f) for f in os.listdir(os.path.join(expDir, "info"))],
+                                                 shallow=False)
+    assert mismatch == [] and errors == []
+
+@pytest.mark.parametrize("fields", ["minimal", "default", "full", "fileNames,changeLogText,provides,summary"])
+def test_fromRepodata(tmp_path, fields):
+    repoDir = makeRepo(tmp_path)
+    expDir = str(tmp_path / "exp")
+    gotDir = str(tmp_path / "got")
+    rpmList(repoDir, expDir, reader="native", fields=fields)
+    stats = rpmList(repoDir, gotDir, reader="native", fields=fields, fromRepodata=True)
+    assertSameOutput(expDir, gotDir)
+    assert stats.rpms == 3
+    if RepodataSource(repoDir, resolveFields(fields)).missing:
+        assert stats.latency.count == 3
+    else:
+        # Only the source RPM (whose arch repodata does not record) is read
+        assert stats.latency.count == 1
+
+def test_fromRepodataDigestIds(tmp_path):
+    repoDir = makeRepo(tmp_path)
+    expDir = str(tmp_path / "exp")
+    gotDir = str(tmp_path / "got")
+    rpmList(repoDir, expDir, reader="native", fields="minimal", ids="digest")
+    rpmList(repoDir, gotDir, reader="native", fields="minimal", ids="digest", fromRepodata=True)
+    assertSameOutput(expDir, gotDir)
+
+def test_noRepodata(tmp_path, capsys):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    with pytest.raises(ValueError):
+        rpmList(inDir, str(tmp_path / "out"), fromRepodata=True)
+    with pytest.raises(SystemExit):
+        main(["--dir", inDir, "--format", "ndjson", "--from-repodata"])
+    assert "has no repodata/repomd.xml" in capsys.readouterr().err
+
+def test_fromRepodataSourceOrder(tmp_path):
+    # Source RPMs under a directory that sorts after the binary ones, so
+    # the order can not come from the paths
+    repoDir = makeRepo(tmp_path)
+    os.rename(os.path.join(repoDir, "SRPMS"), os.path.join(repoDir, "zsrc"))
+    primary = findMetadata(repoDir)["primary"]
+    with gzip.open(primary, "rb") as f:
+        data = f.read()
+    with gzip.open(primary, "wb") as f:
+        f.write(data.replace(b'href="SRPMS/', b'href="zsrc/'))
+    expDir = str(tmp_path / "exp")
+    gotDir = str(tmp_path / "got")
+    rpmList(repoDir, expDir, reader="native", fields="minimal")
+    rpmList(repoDir, gotDir, reader="native", fields="minimal", fromRepodata=True)
+    assertSameOutput(expDir, gotDir)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import os
+import shutil
+import struct
+import time
+from rpm2json import rpmheader
+from rpm2json.rpmheader import RpmHeaderError
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def readHeader(relPath):
+    fd = os.open(os.path.join(os.getcwd(), "tests", "repo", relPath), os.O_RDONLY)
+    try:
+        return rpmheader.TransactionSet().hdrFromFdno(fd)
+    finally:
+        os.close(fd)
+
+def test_binaryHeader():
+    h = readHeader(os.path.join("noarch", "RandomUUID-1.0.0-6.nst32.noarch.rpm"))
+    assert h[rpmheader.RPMTAG_NAME] == "RandomUUID"
+    assert h[rpmheader.RPMTAG_EPOCH] == None
+    assert h[rpmheader.RPMTAG_EPOCHNUM] == 0
+    assert h[rpmheader.RPMTAG_FILENAMES] == ["/usr/share/RandomUUID", "/usr/share/RandomUUID/class",
+                                             "/usr/share/RandomUUID/class/RandomUUID.class"]
+    # Comes from the signature header
+    assert h[rpmheader.RPMTAG_ARCHIVESIZE] == 1284
+    assert h[rpmheader.RPMTAG_CONFLICTS] == []
+    assert h[rpmheader.RPMTAG_SOURCERPM] == "RandomUUID-1.0.0-6.nst32.src.rpm"
+    assert h.sprintf(rpmheader.SIGINFO_QUERY) == "(none)"
+
+def test_sourceHeader():
+    h = readHeader(os.path.join("SRPMS", "virtualbox-repo-32-10.nst32.src.rpm"))
+    assert h[rpmheader.RPMTAG_NAME] == "virtualbox-repo"
+    assert h[rpmheader.RPMTAG_SOURCERPM] == None
+    assert h[rpmheader.RPMTAG_FILENAMES] == ["virtualbox-repo.spec", "virtualbox.repo"]
+
+def test_notAnRpm(tmp_path):
+    bad = tmp_path / "bad.rpm"
+    bad.write_bytes(b"Not an RPM file" * 20)
+    fd = os.open(str(bad), os.O_RDONLY)
+    try:
+        with pytest.raises(RpmHeaderError):
+            rpmheader.hdrFromFdno(fd)
+    finally:
+        os.close(fd)
+
+def test_formatPgpSig():
+    created = 1594492663
+    hashed = bytes([5, 2]) + struct.pack(">I", created)
+    unhashed = bytes([9, 16]) + bytes.fromhex("0123456789abcdef")
+    body = bytes([4, 0, 1, 8]) + struct.pack(">H", len(hashed)) + hashed + \
+        struct.pack(">H", len(unhashed)) + unhashed + b"\0\0"
+    pkt = bytes([0x89]) + struct.pack(">H", len(body)) + body
+    expected = "RSA/SHA256, {date}, Key ID 0123456789abcdef".format(
+        date=time.strftime("%c", time.localtime(created)))
+    assert rpmheader.formatPgpSig(pkt) == expected
+    assert rpmheader.formatPgpSig(b"\0\0\0") == "(not an OpenPGP signature)"
+
+def corruptEntry(path, tag, where):
+    """Points an entry of the main header past the end of the store
+    ("range"), at an unterminated string at its end ("string") or gives it
+    the INT32 type ("type")."""
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    (sigCnt, sigSize) = struct.unpack_from(">II", data, 96 + 8)
+    sigLen = 16 + sigCnt * 16 + sigSize
+    offset = 96 + sigLen + (8 - (sigLen % 8)) % 8
+    (indexCnt, storeSize) = struct.unpack_from(">II", data, offset + 8)
+    storeStart = offset + 16 + indexCnt * 16
+    for i in range(indexCnt):
+        pos = offset + 16 + i * 16
+        if struct.unpack_from(">I", data, pos)[0] == tag:
+            if where == "range":
+                struct.pack_into(">i", data, pos + 8, storeSize + 100)
+            elif where == "string":
+                struct.pack_into(">i", data, pos + 8, storeSize - 1)
+                data[storeStart + storeSize - 1] = ord("x")
+            else:
+                struct.pack_into(">I", data, pos + 4, rpmheader.RPM_INT32_TYPE)
+                struct.pack_into(">i", data, pos + 8, 0)
+    with open(path, "wb") as f:
+        f.write(data)
+
+@pytest.mark.parametrize("tag, where", [
+    (rpmheader.RPMTAG_NAME, "range"),
+    (rpmheader.RPMTAG_NAME, "string"),
+    # dirNames[d] + b in _fileNames() with ints in place of strings
+    (rpmheader.RPMTAG_DIRNAMES, "type"),
+])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_corruptHeader(tmp_path, tag, where, jobs):
+    from rpm2json import rpmList
+    repoDir = str(tmp_path / "repo")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    corruptEntry(os.path.join(repoDir, "noarch", "RandomUUID-1.0.0-6.nst32.noarch.rpm"), tag, where)
+    stats = rpmList(repoDir, str(tmp_path / "out"), reader="native", jobs=jobs)
+    assert (stats.rpms, stats.unreadable) == (2, 1)
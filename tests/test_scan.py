@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import os
+from rpm2json.scan import scanTree
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def makeTree(root):
+    for d in ["a/b/c", "a-b", "json/info", "z"]:
+        os.makedirs(os.path.join(root, d))
+    for f in ["top.rpm", "a/one.rpm", "a/b/two.rpm", "a/b/c/three.rpm", "a-b/four.rpm",
+              "json/rpmlist.json", "json/info/100000.json", "z/five.rpm"]:
+        with open(os.path.join(root, f), "w") as out:
+            out.write(f)
+    os.symlink(os.path.join(root, "a"), os.path.join(root, "link"))
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_scanTree(tmp_path, threads):
+    root = str(tmp_path)
+    makeTree(root)
+    expected = sorted(os.path.join(r, f) for r, d, files in os.walk(root) for f in files
+                      if not r.startswith(os.path.join(root, "json")))
+
+    records = scanTree(root, threads, [os.path.join(root, "json")])
+    assert [r.path for r in records] == expected
+    assert [r.relPath for r in records] == [p[len(root) + 1:] for p in expected]
+    rec = records[0]
+    st = os.stat(rec.path)
+    assert (rec.size, rec.mtime, rec.ino) == (st.st_size, st.st_mtime_ns, st.st_ino)
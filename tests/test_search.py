@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+from rpm2json import rpmList
+from rpm2json.main import main
+from rpm2json.search import SEARCH_INDEXES, checkIndexFields, resolveIndexes, shardKey, trigrams
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def test_resolveIndexes():
+    assert resolveIndexes(None) == ()
+    assert resolveIndexes("all") == SEARCH_INDEXES
+    assert resolveIndexes("files, names") == ("names", "files")
+    with pytest.raises(ValueError):
+        resolveIndexes("names,nosuchindex")
+
+def test_checkIndexFields(tmp_path, capsys):
+    checkIndexFields(SEARCH_INDEXES, ("name", "provides", "requires", "fileNames"))
+    checkIndexFields(("names",), ("name",))
+    with pytest.raises(ValueError, match="provides, fileNames"):
+        checkIndexFields(("provides", "files"), ("name", "requires"))
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    with pytest.raises(ValueError):
+        rpmList(inDir, str(tmp_path), fields="minimal", search="files")
+    with pytest.raises(SystemExit):
+        main(["--dir", inDir, "--outdir", str(tmp_path), "--fields", "minimal", "--search"])
+    assert "provides, requires, fileNames" in capsys.readouterr().err
+
+def test_trigrams():
+    assert trigrams("UUID") == set(["uui", "uid"])
+    assert trigrams("ab") == set()
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_rpmListSearch(tmp_path, stream):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, search="all", stream=stream)
+
+    searchDir = os.path.join(outDir, "search")
+    def lookup(index, key):
+        with open(os.path.join(searchDir, index, shardKey(key) + ".json"), "r") as f:
+            return json.load(f).get(key, [])
+    with open(os.path.join(searchDir, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    assert sorted(manifest["indexes"]) == sorted(SEARCH_INDEXES)
+
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        rpms = json.load(f)
+    for rec in rpms:
+        with open(os.path.join(outDir, "info", str(rec["id"]) + ".json"), "r") as f:
+            info = json.load(f)
+        for index, field in (("provides", "provides"), ("requires", "requires"), ("files", "fileNames")):
+            for key in info[field]:
+                assert rec["id"] in lookup(index, key)
+    assert lookup("files", "/usr/share/RandomUUID/class/RandomUUID.class") == [100000]
+
+    # A name search intersects the ids of each trigram
+    found = set.intersection(*[set(lookup("names", t)) for t in trigrams("irtualbox")])
+    assert sorted(found) == [100001, 100002]
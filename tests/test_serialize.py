@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import gzip
+import json
+import os
+from rpm2json import rpmList
+from rpm2json import serialize
+from rpm2json.serialize import JsonArrayWriter, createEncoder
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+SAMPLE = {"name": "café", "path": "/usr/bin/x", "n": [1, 2, None], "ok": True,
+          "bad": "a\udcffb", "big": 2 ** 40}
+
+def availableEncoders():
+    names = ["json"]
+    if serialize.orjson != None:
+        names.append("orjson")
+    if serialize.ujson != None:
+        names.append("ujson")
+    return names
+
+@pytest.mark.parametrize("name", availableEncoders())
+def test_compactIdentical(name):
+    enc = createEncoder(name, compact=True)
+    assert enc.dumps(SAMPLE) == json.dumps(SAMPLE, separators=(",", ":"), ensure_ascii=False)
+
+def test_defaultFormat():
+    enc = createEncoder()
+    assert enc.name == "json"
+    assert enc.dumps(SAMPLE) == json.dumps(SAMPLE)
+    with pytest.raises(ValueError):
+        createEncoder("orjson", compact=False)
+    with pytest.raises(ValueError):
+        createEncoder("simplejson", compact=True)
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_arrayWriter(tmp_path, compact):
+    enc = createEncoder(compact=compact)
+    path = str(tmp_path / "a.json")
+    w = JsonArrayWriter(path, enc)
+    for i in range(3):
+        w.append({"id": i, "s": "x"})
+    w.close()
+    with open(path, "r", encoding="utf-8") as f:
+        assert f.read() == enc.dumps([{"id": i, "s": "x"} for i in range(3)])
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_rpmListCompact(tmp_path, stream):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    expDir = os.path.join(os.getcwd(), "tests", "expect")
+    outDir = str(tmp_path)
+    rpmList(inDir, outDir, compact=True, stream=stream, compress=["gz"])
+
+    with open(os.path.join(expDir, "rpmlist.json"), "r") as f:
+        expected = json.load(f)
+    with open(os.path.join(outDir, "rpmlist.json"), "rb") as f:
+        data = f.read()
+    assert json.loads(data) == expected
+    assert data.decode() == createEncoder("json", compact=True).dumps(expected)
+    assert gzip.decompress(open(os.path.join(outDir, "rpmlist.json.gz"), "rb").read()) == data
+    for rec in expected:
+        name = str(rec["id"]) + ".json"
+        with open(os.path.join(expDir, "info", name), "r") as f:
+            info = json.load(f)
+        with open(os.path.join(outDir, "info", name), "r", encoding="utf-8") as f:
+            assert json.load(f) == info
+
+@pytest.mark.parametrize("compact,stream,layout", [(False, False, "flat"), (True, False, "flat"),
+                                                   (True, True, "flat"), (True, True, "bundled")])
+def test_rpmListUndecodable(tmp_path, badHostRepo, badBuildHost, compact, stream, layout):
+    outDir = str(tmp_path / "out")
+    stats = rpmList(badHostRepo, outDir, compact=compact, stream=stream, layout=layout, search="all")
+    assert stats.rpms == 3
+    with open(os.path.join(outDir, "rpmlist.json"), "r", encoding="utf-8") as f:
+        assert len(json.load(f)) == 3
+    infoDir = os.path.join(outDir, "info")
+    hosts = []
+    for name in os.listdir(infoDir):
+        with open(os.path.join(infoDir, name), "r", encoding="utf-8") as f:
+            if layout == "bundled":
+                hosts += [json.loads(line)["buildHost"] for line in f if name.endswith(".ndjson")]
+            else:
+                hosts.append(json.load(f)["buildHost"])
+    assert badBuildHost in hosts
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import filecmp
+import io
+import json
+import os
+import sys
+import time
+import rpm2json
+from rpm2json import iterHeaders, iterPackageRecords, iterRpmFiles, rpmList, rpmNdjson
+from rpm2json.main import main
+from rpm2json.sinks import CallbackSink, JsonDirSink, NdjsonSink, writeEntries
+from rpm2json.stats import RunStats
+
+sys.path.insert(0, os.path.join(os.getcwd(), "benchmarks"))
+from synthrepo import makeRepo
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+repoDir = os.path.join(os.getcwd(), "tests", "repo")
+
+def test_iterRpmFiles():
+    stats = RunStats()
+    files = list(iterRpmFiles(repoDir, exclude=["SRPMS/*"], stats=stats))
+    assert [rec.relPath for rec in files] == sorted(rec.relPath for rec in files)
+    assert not any(rec.relPath.startswith("SRPMS/") for rec in files)
+    assert stats.excluded == 1
+    assert len(list(iterHeaders(files, reader="native"))) == 2
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_jsonDirSink(tmp_path, jobs):
+    expDir = str(tmp_path / "exp")
+    gotDir = str(tmp_path / "got")
+    rpmList(repoDir, expDir, reader="native", fields="minimal", search="names")
+    stats = RunStats()
+    entries = iterPackageRecords(iterRpmFiles(repoDir), fields="minimal", jobs=jobs, reader="native", stats=stats)
+    writeEntries(entries, JsonDirSink(gotDir, fields="minimal", search="names", stats=stats))
+    assert stats.rpms == 3
+    files = ["rpmlist.json"] + [os.path.join("info", f) for f in os.listdir(os.path.join(expDir, "info"))]
+    assert filecmp.cmpfiles(expDir, gotDir, files, shallow=False)[0] == files
+
+@pytest.mark.parametrize("sort", [False, True])
+def test_ndjsonSink(sort):
+    out = io.StringIO()
+    count = writeEntries(iterPackageRecords(iterRpmFiles(repoDir), reader="native"), NdjsonSink(out, sort=sort))
+    lines = out.getvalue().splitlines()
+    assert count == len(lines) == 3
+    infos = [json.loads(line) for line in lines]
+    assert all("id" not in info for info in infos)
+    with open(os.path.join(os.getcwd(), "tests", "expect", "rpmlist.json"), "r") as f:
+        expNames = [r["name"] for r in json.load(f)]
+    if sort:
+        assert [info["name"] for info in infos] == expNames
+    else:
+        assert sorted(info["name"] for info in infos) == sorted(expNames)
+
+def test_callbackSink():
+    got = []
+    sink = CallbackSink(got.append)
+    assert writeEntries(rpm2json.iterPackageRecords(iterRpmFiles(repoDir), fields="minimal", reader="native"),
+                        sink) == 3
+    assert sorted(entry["f"] for entry in got) == sorted(rec.relPath for rec in iterRpmFiles(repoDir))
+
+def test_writeEntriesAbort(tmp_path):
+    def failing():
+        yield from iterPackageRecords(iterRpmFiles(repoDir), reader="native")
+        raise RuntimeError("read failed")
+
+    out = io.StringIO()
+    with pytest.raises(RuntimeError):
+        writeEntries(failing(), NdjsonSink(out, sort=True))
+    assert out.getvalue() == ""
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_rpmNdjsonSortedRuns(tmp_path, jobs):
+    # One package per run forces every package through a temporary file
+    expected = io.StringIO()
+    rpmNdjson(repoDir, expected, sort=True, reader="native")
+    got = io.StringIO()
+    stats = rpmNdjson(repoDir, got, sort=True, jobs=jobs, reader="native", runSize=1)
+    assert stats.rpms == 3
+    assert got.getvalue() == expected.getvalue()
+    with open(os.path.join(os.getcwd(), "tests", "expect", "rpmlist.json"), "r") as f:
+        assert [json.loads(line)["name"] for line in got.getvalue().splitlines()] == [r["name"] for r in json.load(f)]
+
+def test_ndjsonMain(tmp_path, capsys):
+    main(["--dir", repoDir, "--format", "ndjson", "--sorted", "--reader", "native", "--fields", "minimal"])
+    captured = capsys.readouterr()
+    assert len([json.loads(line) for line in captured.out.splitlines()]) == 3
+
+    outFile = str(tmp_path / "rpms.ndjson")
+    main(["--dir", repoDir, "--format", "ndjson", "--output", outFile, "--reader", "native"])
+    with open(outFile, "r") as f:
+        assert len(f.readlines()) == 3
+    with pytest.raises(SystemExit):
+        main(["--dir", repoDir, "--sorted"])
+
+def test_iterPackageRecordsStreams(tmp_path):
+    repo = str(tmp_path / "repo")
+    counts = makeRepo(repo, packages=rpm2json._READ_BATCH * 3, files=2, changelog=1)
+    files = list(iterRpmFiles(repo))
+    consumed = []
+
+    def slowFiles():
+        for rec in files:
+            consumed.append(rec)
+            if len(consumed) > rpm2json._READ_BATCH:
+                time.sleep(0.05)
+            yield rec
+
+    entries = iterPackageRecords(slowFiles(), fields="minimal", jobs=2, reader="native")
+    next(entries)
+    # The first batches are handed back while the rest are still coming in
+    assert len(consumed) < len(files)
+    assert len(list(entries)) == counts["rpms"] - 1
+
+@pytest.mark.parametrize("sort", [False, True])
+def test_rpmNdjsonUndecodable(tmp_path, badHostRepo, badBuildHost, sort):
+    raw = io.BytesIO()
+    out = io.TextIOWrapper(raw, encoding="utf-8")
+    assert rpmNdjson(badHostRepo, out, sort=sort, reader="native").rpms == 3
+    hosts = [json.loads(line)["buildHost"] for line in raw.getvalue().decode("utf-8").splitlines()]
+    assert badBuildHost in hosts
+
+    outFile = str(tmp_path / "rpms.ndjson")
+    main(["--dir", badHostRepo, "--format", "ndjson", "--output", outFile, "--reader", "native"])
+    with open(outFile, "r", encoding="utf-8") as f:
+        assert badBuildHost in [json.loads(line)["buildHost"] for line in f]
+
+@pytest.mark.parametrize("option", [["--layout", "sharded"], ["--sqlite", "x.db"], ["--incremental"],
+                                    ["--stream"], ["--page-size", "10"], ["--search"], ["--dedup"],
+                                    ["--compact"]])
+def test_ndjsonRejectsJsonDirOptions(option):
+    with pytest.raises(SystemExit):
+        main(["--dir", repoDir, "--format", "ndjson"] + option)
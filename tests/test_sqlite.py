@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+import shutil
+import sqlite3
+from rpm2json import rpmList
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def query(dbFile, sql, args=()):
+    db = sqlite3.connect(dbFile)
+    try:
+        return db.execute(sql, args).fetchall()
+    finally:
+        db.close()
+
+def test_rpmListSqlite(tmp_path):
+    repoDir = str(tmp_path / "repo")
+    outDir = str(tmp_path / "out")
+    dbFile = str(tmp_path / "rpms.db")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    rpmList(repoDir, outDir, sqlite=dbFile, stream=True)
+
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        rpms = json.load(f)
+    assert query(dbFile, "SELECT id, name, f FROM packages ORDER BY id") == [
+        (r["id"], r["name"], r["f"]) for r in rpms]
+    for rec in rpms:
+        with open(os.path.join(outDir, "info", str(rec["id"]) + ".json"), "r") as f:
+            info = json.load(f)
+        sql = "SELECT t.{col} FROM {table} t JOIN packages USING (pkgKey) WHERE id = ?"
+        assert query(dbFile, sql.format(col="path", table="files"), (rec["id"],)) == [(p,) for p in info["fileNames"]]
+        assert query(dbFile, sql.format(col="name", table="requires"), (rec["id"],)) == [(p,) for p in info["requires"]]
+        assert query(dbFile, sql.format(col="text", table="changelog"), (rec["id"],)) == \
+            [(t,) for t in info["changeLogText"]]
+    assert query(dbFile, "SELECT p.name FROM files JOIN packages p USING (pkgKey) WHERE path = ?",
+                 ("/usr/share/RandomUUID/class/RandomUUID.class",)) == [("RandomUUID",)]
+
+    # Packages that are gone are deleted along with their files
+    shutil.rmtree(os.path.join(repoDir, "SRPMS"))
+    pkgKeys = query(dbFile, "SELECT pkgKey FROM packages WHERE src = 0 ORDER BY pkgKey")
+    rpmList(repoDir, outDir, sqlite=dbFile)
+    assert query(dbFile, "SELECT pkgKey FROM packages ORDER BY pkgKey") == pkgKeys
+    assert query(dbFile, "SELECT count(*) FROM files WHERE pkgKey NOT IN (SELECT pkgKey FROM packages)") == [(0,)]
+
+    # Different information fields rebuild the database (but leave tables
+    # added by others alone)
+    db = sqlite3.connect(dbFile)
+    with db:
+        db.execute("CREATE TABLE notes (name TEXT)")
+        db.execute("INSERT INTO notes (name) VALUES ('RandomUUID')")
+    db.close()
+    rpmList(repoDir, outDir, sqlite=dbFile, fields="minimal")
+    assert query(dbFile, "SELECT count(*) FROM packages") == [(2,)]
+    assert query(dbFile, "SELECT count(*) FROM files") == [(0,)]
+    assert query(dbFile, "SELECT name FROM notes") == [("RandomUUID",)]
+
+def test_rpmListSqliteUndecodable(tmp_path, badHostRepo, badBuildHost):
+    dbFile = str(tmp_path / "rpms.db")
+    stats = rpmList(badHostRepo, str(tmp_path / "out"), sqlite=dbFile)
+    assert stats.rpms == 3
+    assert ("r\ufffdfritos.attlocal.net",) in query(dbFile, "SELECT buildHost FROM packages")
+    # The complete information keeps the original (escaped) string
+    infos = [json.loads(r[0]) for r in query(dbFile, "SELECT info FROM packages")]
+    assert badBuildHost in [info["buildHost"] for info in infos]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+from rpm2json import rpmList
+from rpm2json.main import main
+from rpm2json.stats import Histogram, PHASES, RunStats, formatPrometheus
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def test_histogram():
+    h = Histogram([0.1, 1.0])
+    for v in (0.05, 0.1, 0.5, 2.0):
+        h.observe(v)
+    assert h.cumulative() == [(0.1, 2), (1.0, 3)]
+    assert h.count == 4
+    assert h.sum == pytest.approx(2.65)
+
+def test_slowest():
+    stats = RunStats(slowest=2)
+    for i, secs in enumerate([0.3, 0.1, 0.5, 0.2]):
+        stats.addRead("f{i}".format(i=i), secs, 100)
+    assert stats.slowest == [(0.5, "f2"), (0.3, "f0")]
+    assert stats.bytesRead == 400
+
+def test_rpmListStats(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    outDir = str(tmp_path)
+    stats = rpmList(inDir, outDir, exclude=["SRPMS/*"])
+
+    assert stats.rpms == 2
+    assert stats.excluded == 1
+    assert stats.latency.count == 2
+    assert [f for secs, f in stats.slowest] != []
+    assert all(stats.phases[p] >= 0 and stats.cpu[p] >= 0 for p in PHASES)
+    assert stats.bytesRead > 0
+    outBytes = 0
+    for dirPath, dirNames, fileNames in os.walk(outDir):
+        outBytes += sum(os.path.getsize(os.path.join(dirPath, f)) for f in fileNames)
+    assert stats.bytesWritten == outBytes
+    assert stats.filesWritten == 3
+
+    text = formatPrometheus(stats, timestamp=1)
+    assert 'rpm2json_rejected_files{reason="excluded"} 1\n' in text
+    assert 'rpm2json_header_read_seconds_bucket{le="+Inf"} 2\n' in text
+    assert text.endswith("rpm2json_last_run_timestamp_seconds 1\n")
+
+def test_mainStatsFile(tmp_path):
+    inDir = os.path.join(os.getcwd(), "tests", "repo")
+    statsFile = str(tmp_path / "rpm2json.json")
+    main(["--dir", inDir, "--outdir", str(tmp_path / "out"), "--stats", "json", "--stats-file", statsFile])
+    with open(statsFile, "r") as f:
+        stats = json.load(f)
+    assert stats["rpms"] == 3
+    assert sorted(stats["phases"]) == sorted(PHASES)
+    assert len(stats["slowest"]) == 3
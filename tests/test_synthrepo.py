@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import random
+import sys
+from rpm2json import rpmList
+from rpm2json import rpmheader
+from rpm2json.stats import PHASES
+
+sys.path.insert(0, os.path.join(os.getcwd(), "benchmarks"))
+from synthrepo import buildRpm, makePackage, makeRepo
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def test_buildRpm():
+    pkg = makePackage(random.Random(1), 7, files=3, changelog=2)
+    data = buildRpm(pkg, b"payload")
+    h = rpmheader.readHeader(data)
+    assert h[rpmheader.RPMTAG_NAME] == pkg["name"]
+    assert h[rpmheader.RPMTAG_SOURCERPM] == pkg["sourceRpm"]
+    assert h[rpmheader.RPMTAG_FILENAMES] == [f[0] + f[1] for f in pkg["files"]]
+    assert h[rpmheader.RPMTAG_FILESIZES] == [f[2] for f in pkg["files"]]
+    assert h[rpmheader.RPMTAG_CHANGELOGTEXT] == [c[2] for c in pkg["changelog"]]
+    # Size of the main header plus payload
+    sigSize = h._sig.size + (8 - h._sig.size % 8) % 8
+    assert h[rpmheader.RPMTAG_SIGSIZE] == len(data) - 96 - sigSize
+
+def test_rpmListStats(tmp_path):
+    repoDir = str(tmp_path / "repo")
+    outDir = str(tmp_path / "out")
+    counts = makeRepo(repoDir, packages=40, files=2, changelog=1, noise=10)
+    stats = rpmList(repoDir, outDir, reader="native")
+
+    assert stats.files == counts["rpms"] + counts["noise"]
+    assert stats.rpms == counts["rpms"]
+    assert sorted(stats.phases) == sorted(PHASES)
+    assert stats.total > 0
+    with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+        assert len(json.load(f)) == counts["rpms"]
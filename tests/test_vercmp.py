@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from rpm2json.vercmp import evrKey
+from rpm2json.vercmp import rpmvercmp
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+# Cases taken from the rpmvercmp tests in the RPM source tree
+@pytest.mark.parametrize("a, b, expected", [
+    ("1.0", "1.0", 0),
+    ("1.0", "2.0", -1),
+    ("2.0", "1.0", 1),
+    ("2.0.1", "2.0.1", 0),
+    ("2.0", "2.0.1", -1),
+    ("2.0.1a", "2.0.1", 1),
+    ("5.5p1", "5.5p2", -1),
+    ("5.5p10", "5.5p1", 1),
+    ("10xyz", "10.1xyz", -1),
+    ("xyz10", "xyz10.1", -1),
+    ("xyz.4", "8", -1),
+    ("5.6p1", "6.5p1", -1),
+    ("6.0.rc1", "6.0", 1),
+    ("10b2", "10a1", 1),
+    ("1.0aa", "1.0a", 1),
+    ("10.0001", "10.1", 0),
+    ("10.0001", "10.0039", -1),
+    ("4.999.9", "5.0", -1),
+    ("20101121", "20101122", -1),
+    ("2.0", "2_0", 0),
+    ("a+", "a_", 0),
+    ("+", "_", 0),
+    ("1.0~rc1", "1.0", -1),
+    ("1.0~rc1", "1.0~rc2", -1),
+    ("1.0~rc1~git123", "1.0~rc1", -1),
+    ("1.0^", "1.0", 1),
+    ("1.0^git1", "1.0", 1),
+    ("1.0^git1", "1.01", -1),
+    ("1.0^20160101", "1.0.1", -1),
+    ("1.0~rc1^git1", "1.0~rc1", 1),
+    ("1.0^git1~pre", "1.0^git1", -1),
+])
+def test_rpmvercmp(a, b, expected):
+    assert rpmvercmp(a, b) == expected
+    assert rpmvercmp(b, a) == -expected
+
+def test_evrKey():
+    assert evrKey(None, "1.0", "1") == evrKey(0, "1.0", "1")
+    assert evrKey(1, "1.0", "1") > evrKey(0, "9.0", "1")
+    assert evrKey(0, "1.0", "10") > evrKey(0, "1.0", "9")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import os
+import shutil
+import threading
+import time
+from rpm2json.watch import PollingWatcher, watch
+
+__author__ = "Paul Blankenbaker"
+__copyright__ = "Paul Blankenbaker"
+__license__ = "mit"
+
+def readList(outDir):
+    try:
+        with open(os.path.join(outDir, "rpmlist.json"), "r") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+def waitFor(check, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.05)
+    return False
+
+@pytest.mark.parametrize("poll", [True, False])
+def test_watch(tmp_path, poll):
+    repoDir = str(tmp_path / "repo")
+    outDir = str(tmp_path / "out")
+    shutil.copytree(os.path.join(os.getcwd(), "tests", "repo"), repoDir)
+    runs = []
+    stop = threading.Event()
+    thread = threading.Thread(target=watch, args=(repoDir, outDir),
+                              kwargs=dict(debounce=0.1, poll=poll, pollInterval=0.1, stop=stop,
+                                          onRun=runs.append, reader="native"))
+    thread.start()
+    try:
+        assert waitFor(lambda: len(runs) == 1)
+        assert len(readList(outDir)) == 3
+
+        # Adding a RPM only reads the new file
+        os.makedirs(os.path.join(repoDir, "extra"))
+        shutil.copy(os.path.join(repoDir, "noarch", "RandomUUID-1.0.0-6.nst32.noarch.rpm"),
+                    os.path.join(repoDir, "extra", "RandomUUID.rpm"))
+        assert waitFor(lambda: len(runs) >= 2 and len(readList(outDir)) == 4)
+        assert runs[-1].cached == 3
+
+        os.remove(os.path.join(repoDir, "extra", "RandomUUID.rpm"))
+        assert waitFor(lambda: len(readList(outDir)) == 3)
+        assert runs[-1].cached == 3
+    finally:
+        stop.set()
+        thread.join(10)
+    assert not thread.is_alive()
+
+def test_pollingWatcher(tmp_path):
+    (tmp_path / "a.rpm").write_bytes(b"a")
+    watcher = PollingWatcher(str(tmp_path), interval=0.01)
+    assert not watcher.wait(0.05)
+    (tmp_path / "b.rpm").write_bytes(b"b")
+    assert watcher.wait(1.0)
+    assert not watcher.wait(0.05)